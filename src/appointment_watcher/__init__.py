@@ -0,0 +1 @@
+"""Reusable building blocks for the US visa appointment watcher scripts."""
@@ -0,0 +1,5 @@
+import sys
+
+from appointment_watcher.watcher import main
+
+sys.exit(main())
@@ -0,0 +1,137 @@
+"""Direct JSON access to the AIS appointment endpoints.
+
+The appointment page fills its datepicker from two small JSON endpoints
+(``days/<facility>.json`` and ``times/<facility>.json``). Once the browser
+is logged in we can copy its cookies and CSRF token into a pooled
+``requests.Session`` and poll those endpoints directly, leaving the driver
+idle until there is something worth booking.
+
+``AISClient.sign_in`` logs in over plain HTTP, so a session can be renewed
+in the background without touching the browser.
+"""
+import logging
+import re
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# -------- Errors --------
+class SessionExpired(Exception):
+    """The AIS session is no longer valid and a fresh login() is needed."""
+
+
+class SystemBusy(Exception):
+    """AIS answered with its throttling / "System is busy" response."""
+
+
+_CSRF_RE = re.compile(r'<meta\s+name="csrf-token"\s+content="([^"]*)"')
+
+
+# -------- Client --------
+class AISClient:
+    def __init__(self, appointment_url, session=None, csrf_token=None, timeout=10):
+        self.appointment_url = appointment_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json, text/javascript, */*; q=0.01",
+            "X-Requested-With": "XMLHttpRequest",
+            "Referer": self.appointment_url,
+        })
+        if csrf_token:
+            self.session.headers["X-CSRF-Token"] = csrf_token
+
+    @classmethod
+    def from_driver(cls, driver, appointment_url, timeout=10):
+        """Build a client that rides on the browser's logged-in session.
+
+        The driver must currently be on the appointment page so the CSRF
+        meta tag can be read.
+        """
+        csrf_token = driver.execute_script(
+            "var m = document.querySelector('meta[name=\"csrf-token\"]'); return m ? m.content : null;")
+        if not csrf_token:
+            logging.warning("No CSRF token found on appointment page; JSON polling may be rejected.")
+        return cls.from_cookies(driver.get_cookies(), appointment_url, csrf_token=csrf_token,
+                                user_agent=driver.execute_script("return navigator.userAgent;"), timeout=timeout)
+
+    @classmethod
+    def from_cookies(cls, cookies, appointment_url, csrf_token=None, user_agent=None, timeout=10):
+        """Build a client from WebDriver-style cookie dicts (``name``, ``value``, ``domain``, ``path``)."""
+        session = requests.Session()
+        for cookie in cookies:
+            session.cookies.set(cookie["name"], cookie["value"],
+                                domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        if user_agent:
+            session.headers["User-Agent"] = user_agent
+        return cls(appointment_url, session=session, csrf_token=csrf_token, timeout=timeout)
+
+    @classmethod
+    def sign_in(cls, login_url, email, password, appointment_url, user_agent=None, timeout=10):
+        """Log in with the sign-in form over HTTP and return a client on the new session.
+
+        Raises ``SessionExpired`` if AIS does not accept the login.
+        """
+        client = cls(appointment_url, timeout=timeout)
+        if user_agent:
+            client.session.headers["User-Agent"] = user_agent
+        try:
+            page = client.session.get(login_url, timeout=timeout)
+            page.raise_for_status()
+            token = _CSRF_RE.search(page.text)
+            headers = {"X-CSRF-Token": token.group(1)} if token else {}
+            client.session.post(login_url, timeout=timeout, allow_redirects=False, headers=headers, data={
+                "utf8": "✓", "user[email]": email, "user[password]": password,
+                "policy_confirmed": "1", "commit": "Sign In"})
+            # The JSON endpoints want the CSRF token of the appointment page, which also proves the login worked
+            page = client.session.get(client.appointment_url, timeout=timeout, allow_redirects=False)
+            if page.status_code != 200:
+                raise SessionExpired(f"Login rejected ({page.status_code} from the appointment page)")
+            token = _CSRF_RE.search(page.text)
+            if token:
+                client.session.headers["X-CSRF-Token"] = token.group(1)
+        except BaseException:
+            client.close()
+            raise
+        return client
+
+    def cookie_dicts(self):
+        """The session cookies as WebDriver-style dicts, as stored by ``SessionCache``."""
+        return [{"name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+                 **({"expiry": c.expires} if c.expires else {})} for c in self.session.cookies]
+
+    @property
+    def csrf_token(self):
+        return self.session.headers.get("X-CSRF-Token")
+
+    def _get_json(self, path, params=None):
+        url = f"{self.appointment_url}/{path}"
+        response = self.session.get(url, params=params, timeout=self.timeout, allow_redirects=False)
+        if response.status_code in (401, 403) or response.is_redirect or "sign_in" in response.url:
+            raise SessionExpired(f"{response.status_code} from {url}")
+        if response.status_code in (429, 502, 503):
+            raise SystemBusy(f"{response.status_code} from {url}")
+        response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            # AIS serves its "System is busy" HTML page with a 200
+            raise SystemBusy(f"Non-JSON response from {url}")
+
+    def get_available_days(self, facility_id):
+        """Return the bookable dates for a facility as ``YYYY-MM-DD`` strings."""
+        days = self._get_json(f"days/{facility_id}.json", {"appointments[expedite]": "false"})
+        return [day["date"] for day in days]
+
+    def get_available_times(self, facility_id, date):
+        """Return the open time slots (``HH:MM``) for a facility on ``date``."""
+        data = self._get_json(f"times/{facility_id}.json",
+                              {"date": date, "appointments[expedite]": "false"})
+        return [t for t in data.get("available_times") or [] if t]
+
+    def close(self):
+        self.session.close()
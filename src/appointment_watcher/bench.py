@@ -0,0 +1,168 @@
+"""End-to-end benchmark of the watcher scripts against ``mock_ais``.
+
+Each target runs as its own subprocess with headless Chrome pointed at a
+fresh mock server playing the same scenario, so runs need no network::
+
+    python -m appointment_watcher.bench visa_checker.py visa_checker_2.py \\
+        "visa_checker.py:POLL_MODE=http" --scenario scenario.json --duration 300
+
+A target is a script under ``src/`` optionally followed by ``:KEY=VALUE,...``
+environment overrides. Reported per target:
+
+* ``detect_s``  - first slot release -> first ``times`` fetch for a released date
+* ``confirm_s`` - first slot release -> booking POST accepted by the mock
+* ``req_per_hour`` - requests served by the mock, scaled to an hour
+* ``peak_rss_mb`` - peak RSS of the script and its chromedriver/Chrome children
+  (needs ``psutil``)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from appointment_watcher.metrics import process_rss_bytes
+from appointment_watcher.mock_ais import MockAIS, resolve_date
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SCENARIO = {
+    "releases": [{"at": 20, "facility": "94", "date": "+20", "times": ["08:15", "08:30"]}],
+}
+
+EMAIL = "bench@example.com"
+PASSWORD = "bench-password"
+
+
+def parse_target(spec):
+    script, _, overrides = spec.partition(":")
+    env = dict(item.split("=", 1) for item in overrides.split(",") if item)
+    return script, env
+
+
+def scenario_window(scenario):
+    """``DATE_WINDOWS`` value covering every date the scenario offers, or None if it offers none."""
+    dates = [resolve_date(day) for days in scenario.get("slots", {}).values() for day in days]
+    dates += [resolve_date(r["date"]) for r in scenario.get("releases", [])]
+    return f"{min(dates)}..{max(dates)}" if dates else None
+
+
+def run_target(spec, scenario, duration=300, retry_delay=5, grace=2.0, extra_env=None):
+    script, overrides = parse_target(spec)
+    mock = MockAIS(scenario=scenario, email=EMAIL, password=PASSWORD).start()
+    workdir = tempfile.mkdtemp(prefix="visa-bench-")
+    env = dict(os.environ)
+    env.update({
+        "AIS_BASE_URL": mock.base_url,
+        "COUNTRY_CODE": "en-ca",
+        "SCHEDULE_ID": "1",
+        "EMAIL": EMAIL,
+        "PASSWORD": PASSWORD,
+        "TELEGRAM_API_URL": mock.base_url,
+        "TELEGRAM_BOT_TOKEN": "bench",
+        "TELEGRAM_CHAT_ID": "1",
+        "HEADLESS": "1",
+        "RETRY_DELAY": str(retry_delay),
+        "SESSION_CACHE_PATH": os.path.join(workdir, "session_cache.json"),
+        "HIBERNATE_AFTER_BUSY": "0",
+        "PYTHONPATH": SRC_DIR + os.pathsep + env.get("PYTHONPATH", ""),
+    })
+    window = scenario_window(scenario)
+    if window:
+        # Otherwise the default VALID_MONTHS/VALID_YEARS decide, and "+N" dates drift out of them
+        env["DATE_WINDOWS"] = window
+    env.update(extra_env or {})
+    env.update(overrides)
+
+    started = time.monotonic()
+    stderr = open(os.path.join(workdir, "stderr.log"), "wb")
+    proc = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, script)], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=stderr)
+    peak_rss = None
+    booked_at = None
+    try:
+        while time.monotonic() - started < duration and proc.poll() is None:
+            rss = process_rss_bytes(proc.pid)
+            if rss is not None:
+                peak_rss = max(peak_rss or 0, rss)
+            if mock.bookings and booked_at is None:
+                booked_at = time.monotonic()
+            if booked_at and time.monotonic() - booked_at > grace:
+                break
+            time.sleep(0.5)
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        elapsed = time.monotonic() - started
+        stderr.close()
+        mock.stop()
+
+    return summarize(spec, mock, elapsed, peak_rss, proc.returncode)
+
+
+def summarize(spec, mock, elapsed, peak_rss=None, returncode=None):
+    events = sorted(mock.events, key=lambda e: e[0])
+    releases = [e for e in events if e[1] == "release"]
+    released_dates = {d for e in releases for d in e[2]["dates"]}
+    first_release = releases[0][0] if releases else None
+    detect = next((e[0] for e in events
+                   if e[1] == "times" and e[2]["date"] in released_dates and first_release is not None
+                   and e[0] >= first_release), None)
+    booked = next((e[0] for e in events if e[1] == "booked"), None)
+    return {
+        "target": spec,
+        "elapsed_s": round(elapsed, 1),
+        "requests": mock.requests_served,
+        "req_per_hour": round(mock.requests_served / elapsed * 3600) if elapsed else None,
+        "logins": sum(1 for e in events if e[1] == "login"),
+        "busy_hits": sum(1 for e in events if e[1] == "busy"),
+        "detect_s": round(detect - first_release, 3) if detect is not None else None,
+        "confirm_s": round(booked - first_release, 3) if booked is not None and first_release is not None else None,
+        "booked": mock.bookings[0] if mock.bookings else None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+        "exit_code": returncode,
+    }
+
+
+def print_table(results):
+    columns = ["target", "elapsed_s", "requests", "req_per_hour", "logins", "busy_hits",
+               "detect_s", "confirm_s", "peak_rss_mb"]
+    rows = [[str(r.get(c)) for c in columns] for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark watcher scripts against the local AIS stand-in.")
+    parser.add_argument("targets", nargs="+", help="script[:KEY=VALUE,...] relative to src/")
+    parser.add_argument("--scenario", help="mock_ais scenario JSON (default: one release after 20 s)")
+    parser.add_argument("--duration", type=float, default=300, help="max seconds per target")
+    parser.add_argument("--retry-delay", type=float, default=5)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    scenario = DEFAULT_SCENARIO
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as f:
+            scenario = json.load(f)
+
+    results = []
+    for target in args.targets:
+        print(f"Running {target} ...", file=sys.stderr)
+        results.append(run_target(target, scenario, args.duration, args.retry_delay))
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
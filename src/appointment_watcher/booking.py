@@ -0,0 +1,196 @@
+"""Book the best slot still available out of everything a scan found.
+
+``BookingEngine`` walks the candidate dates in the order the scan strategy
+produced and, for each date, the times the page offers, earliest first.
+Every (date, time) attempt has its own deadline, capped by the check's
+latency budget, so a slot that vanishes under us costs at most
+``attempt_timeout`` seconds before the next candidate is tried instead of
+ending the check.
+
+With ``times_for`` (typically ``AISClient.get_available_times``) the
+time list of the *next* date is fetched over HTTP in the background while
+the current date is being confirmed. A date whose prefetched list comes
+back empty is skipped without touching the page.
+
+A run that ended on a timeout leaves a screenshot and the page source in
+``diagnostics`` (see ``diagnostics.Diagnostics``); only the grab itself
+happens on the booking thread. A date whose time list loads empty is not a
+timeout. With ``on_failure`` the caller hears why each date failed
+(``unselectable``, ``no_times``, ``timeout`` or ``taken``) and decides
+whether a timeout is new enough to capture and alert again.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support.ui import WebDriverWait
+
+from appointment_watcher.calendar_reader import select_day
+from appointment_watcher.diagnostics import default_diagnostics
+from appointment_watcher.latency import LatencyBudget
+
+TIME_SELECT_ID = "appointments_consulate_appointment_time"
+CONFIRM_TEXT = "Reschedule"
+
+# All real options of the time dropdown in one round trip: [[value, text], ...];
+# null while the page is still loading them (the select stays disabled until then)
+_TIME_OPTIONS_JS = """
+var select = document.getElementById(arguments[0]);
+if (!select || select.disabled) return null;
+var out = [];
+for (var i = 0; i < select.options.length; i++) {
+    if (select.options[i].value) out.push([select.options[i].value, select.options[i].text]);
+}
+return out;
+"""
+
+
+def _no_notify(message):
+    pass
+
+
+def _loaded_time_options(driver):
+    # Wrapped so that a loaded but empty list still ends the wait
+    options = driver.execute_script(_TIME_OPTIONS_JS, TIME_SELECT_ID)
+    return options is not None and (options,)
+
+
+class BookingEngine:
+    def __init__(self, driver, notify=_no_notify, budget=None, confirm=True, times_for=None,
+                 attempt_timeout=4.0, max_attempts=8, diagnostics=None, on_failure=None):
+        self.driver = driver
+        self.notify = notify
+        self.budget = budget or LatencyBudget()
+        self.confirm = confirm                  # False: dry run, never click the confirm button
+        self.times_for = times_for              # date -> ["HH:MM", ...] over HTTP, or None
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.diagnostics = diagnostics
+        self.on_failure = on_failure            # (date, reason) -> False if that failure was already reported
+        self.attempts = 0
+        self.timed_out = False
+        self._reason = None
+        self._report_timeout = False
+
+    def book(self, dates):
+        """Try ``dates`` in order; returns the confirmed datetime or None."""
+        dates = list(dates)
+        pool = ThreadPoolExecutor(max_workers=1) if self.times_for else None
+        prefetched = None
+        try:
+            for i, day in enumerate(dates):
+                known = self._prefetched(prefetched)
+                prefetched = pool.submit(self._fetch_times, dates[i + 1]) if pool and i + 1 < len(dates) else None
+                if known is not None and not known:
+                    logging.info(f"Skipping {day:%B %d, %Y}: no time slots left")
+                    self._failed(day, "no_times")
+                    continue
+                self._reason = None
+                booked = self._book_day(day)
+                if booked:
+                    self.notify(f"Selected earliest date: {day.strftime('%B %d, %Y')}")
+                    return booked
+                self._failed(day, self._reason or "taken")
+                if self.attempts >= self.max_attempts or self.budget.remaining() <= 0:
+                    logging.warning(f"Giving up after {self.attempts} booking attempt(s) ({self.budget.report()})")
+                    break
+        finally:
+            if pool:
+                pool.shutdown(wait=False)
+        if self._report_timeout:
+            self._capture_timeout()
+        return None
+
+    def _failed(self, day, reason):
+        new = self.on_failure(day, reason) if self.on_failure else True
+        if reason == "timeout" and new is not False:
+            self._report_timeout = True
+
+    # -------- Candidates --------
+    def _fetch_times(self, day):
+        try:
+            return self.times_for(day)
+        except Exception as e:
+            logging.debug(f"Prefetching times for {day:%Y-%m-%d} failed: {e}")
+            return None
+
+    @staticmethod
+    def _prefetched(future):
+        # Only use a prefetch that has already landed; never wait on it
+        if future is None or not future.done():
+            return None
+        return future.result()
+
+    def _deadline(self, phase):
+        return min(self.budget.timeout(phase), self.attempt_timeout)
+
+    def _time_options(self):
+        with self.budget.phase("times"):
+            try:
+                return WebDriverWait(self.driver, self._deadline("times"), poll_frequency=0.1).until(
+                    _loaded_time_options)[0]
+            except TimeoutException:
+                self.timed_out = True
+                self._reason = "timeout"
+                return []
+
+    # -------- Attempts --------
+    def _book_day(self, day):
+        #  Select the date through the datepicker
+        if not select_day(self.driver, day):
+            logging.error(f"Error selecting date: {day.strftime('%B %d, %Y')} not selectable")
+            self._reason = "unselectable"
+            return None
+        logging.info(f"Selected date: {day.strftime('%B %d, %Y')}")
+
+        options = sorted(self._time_options(), key=lambda option: option[1])
+        if not options:
+            if self._reason == "timeout":
+                logging.warning(f"No time slots loaded for {day:%B %d, %Y}; trying the next date")
+            else:
+                logging.info(f"{day:%B %d, %Y} is listed without time slots; trying the next date")
+                self._reason = "no_times"
+            return None
+        for value, text in options:
+            if self.attempts >= self.max_attempts:
+                return None
+            self.attempts += 1
+            booked = self._attempt(day, value, text)
+            if booked:
+                return booked
+        return None
+
+    def _attempt(self, day, value, text):
+        """Select one time and press the confirm button within the attempt deadline."""
+        with self.budget.phase("confirm"):
+            started = time.monotonic()
+            try:
+                Select(self.driver.find_element(By.ID, TIME_SELECT_ID)).select_by_value(value)
+                logging.info(f"Time slot selected: {text}")
+                remaining = max(0.1, self._deadline("confirm") - (time.monotonic() - started))
+                confirm_button = WebDriverWait(self.driver, remaining, poll_frequency=0.1).until(EC.element_to_be_clickable(
+                    (By.XPATH, f"//input[@value='{CONFIRM_TEXT}'] | //button[contains(text(), '{CONFIRM_TEXT}')]")))
+                if self.confirm:
+                    confirm_button.click()
+                    logging.info(f"Clicked confirmation button: {CONFIRM_TEXT}")
+                else:
+                    logging.info(f"Dry run: not clicking confirmation button: {CONFIRM_TEXT}")
+            except TimeoutException:
+                self.timed_out = True
+                self._reason = "timeout"
+                logging.warning(f"⚠️ {day:%Y-%m-%d} {text}: confirm button not ready in time")
+                return None
+            except (NoSuchElementException, StaleElementReferenceException) as e:
+                logging.warning(f"⚠️ {day:%Y-%m-%d} {text} is gone: {e.__class__.__name__}")
+                return None
+        hour, minute = text.split(":")[:2]
+        return day.replace(hour=int(hour), minute=int(minute))
+
+    def _capture_timeout(self):
+        logging.warning(f"⚠️ Time slot selection timed out ({self.budget.report()}).")
+        (self.diagnostics or default_diagnostics()).capture(self.driver, "timeout")
+        self.notify("⚠️ Time slot selection timed out.")
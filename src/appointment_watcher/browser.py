@@ -0,0 +1,225 @@
+"""Selenium steps of the appointment flow, parametrised on the driver.
+
+These are the same steps the scripts run against their module-level
+``driver``; taking the driver (and a ``notify`` callable for Telegram)
+as arguments lets several schedules share one process.
+"""
+import calendar
+import logging
+
+from selenium import webdriver
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+from appointment_watcher.booking import BookingEngine
+from appointment_watcher.calendar_reader import read_calendar
+from appointment_watcher.facilities import FACILITY_SELECT_ID, FacilityIndex, read_options
+from appointment_watcher.latency import LatencyBudget
+from appointment_watcher.scan import forward
+
+
+def _no_notify(message):
+    pass
+
+
+# --- Setup Selenium ---
+# Requests the appointment flow never needs. Stylesheets are kept: the
+# visibility waits and the datepicker rely on computed layout.
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*newrelic.com*", "*nr-data.net*",
+]
+
+
+def lean_options(options=None, cache_mb=32):
+    """Chrome options for the lean profile: headless, eager page loads, no GPU/extensions, small cache."""
+    options = options or webdriver.ChromeOptions()
+    options.page_load_strategy = "eager"   # driver.get returns at DOMContentLoaded; steps wait for elements
+    for arg in ("--headless=new", "--disable-gpu", "--disable-extensions", "--disable-dev-shm-usage",
+                "--disable-background-networking", "--disable-component-update", "--no-first-run",
+                "--mute-audio", "--blink-settings=imagesEnabled=false",
+                f"--disk-cache-size={cache_mb * 1024 * 1024}", f"--media-cache-size={cache_mb * 1024 * 1024}"):
+        options.add_argument(arg)
+    return options
+
+
+def block_urls(driver, patterns=BLOCKED_URLS):
+    """Drop matching requests inside Chrome via the DevTools protocol; lasts for the driver's lifetime."""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": list(patterns)})
+
+
+def create_driver(driver_path=None, options=None, headless=False, lean=False, blocked_urls=BLOCKED_URLS):
+    if lean:
+        options = lean_options(options)
+    else:
+        options = options or webdriver.ChromeOptions()
+        if headless:
+            options.add_argument("--headless=new")
+    service = Service(executable_path=driver_path)
+    driver = webdriver.Chrome(service=service, options=options)
+    if lean and blocked_urls:
+        block_urls(driver, blocked_urls)
+    return driver
+
+
+_PAGE_STATS_JS = """
+var nav = performance.getEntriesByType('navigation')[0];
+var resources = performance.getEntriesByType('resource');
+var bytes = nav ? nav.transferSize : 0;
+resources.forEach(function (r) { bytes += r.transferSize || 0; });
+return {bytes: bytes, requests: resources.length + (nav ? 1 : 0),
+        load_ms: nav && nav.domContentLoadedEventEnd ? nav.domContentLoadedEventEnd - nav.startTime : null};
+"""
+
+
+def page_stats(driver):
+    """Bytes transferred, request count and DOMContentLoaded time (ms) of the current page.
+
+    Read from the Performance API, so cross-origin responses without
+    ``Timing-Allow-Origin`` count as 0 bytes and cache hits as their
+    (small) revalidation cost.
+    """
+    try:
+        return driver.execute_script(_PAGE_STATS_JS) or {}
+    except Exception as e:
+        logging.debug(f"Page stats unavailable: {e}")
+        return {}
+
+
+# -------- Login Session --------
+def login(driver, email, password, login_url, notify=_no_notify, budget=None):
+    budget = budget or LatencyBudget()
+    try:
+        with budget.phase("login") as timeout:
+            driver.get(login_url)
+            email_input = WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((By.ID, "user_email")))
+            password_input = driver.find_element(By.ID, "user_password")
+            email_input.send_keys(email)
+            password_input.send_keys(password)
+            checkbox_div = driver.find_element(By.CSS_SELECTOR, "div.icheckbox")
+            driver.execute_script("arguments[0].click();", checkbox_div)
+            driver.find_element(By.NAME, "commit").click() # Find the login button and click it
+            WebDriverWait(driver, timeout).until_not(EC.url_contains("sign_in"))
+        notify("🔓 Login Successful")
+    except Exception as e:
+        logging.error(f"Error during login: {e}")
+        notify("⚠️ Error during login.")
+        logging.error(f"Login failed at {driver.current_url}")
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            # page_source ships the whole document over WebDriver; only worth it when debugging
+            logging.debug(f"Page source: {driver.page_source[:500]}")
+
+
+# -------- Appointment page --------
+def open_appointment_page(driver, url, budget=None):
+    """Load the appointment page and wait for the facility dropdown.
+
+    A timeout is only logged: the next step then fails with
+    ``NoSuchElementException`` just like an unloaded page always did.
+    """
+    budget = budget or LatencyBudget()
+    with budget.phase("page") as timeout:
+        driver.get(url)
+        try:
+            WebDriverWait(driver, timeout).until(
+                EC.presence_of_element_located((By.ID, 'appointments_consulate_appointment_facility_id')))
+        except TimeoutException:
+            logging.warning(f"Appointment page not ready after {timeout:.1f}s")
+
+
+# -------Select location from dropdown-------
+def select_location(driver, name="Toronto", budget=None, index=None):
+    """Select a facility (name or id) by its option value.
+
+    ``index`` (a ``FacilityIndex``) remembers the values; it is only
+    refreshed from the page when it does not know ``name`` or its value is
+    no longer offered.
+    """
+    budget = budget or LatencyBudget()
+    index = index if index is not None else FacilityIndex()
+    with budget.phase("location") as timeout:
+        for fresh in (False, True):
+            value = None if fresh else index.value(name)
+            if value is None:
+                index.update(read_options(driver))
+                value = index.value(name)
+            if value is None:
+                raise NoSuchElementException(f"No facility option matching {name!r}")
+            try:
+                Select(driver.find_element(By.ID, FACILITY_SELECT_ID)).select_by_value(value)
+                break
+            except NoSuchElementException:
+                if fresh:
+                    raise
+        # The date field is enabled once the facility's days have been fetched
+        WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((By.ID, 'appointments_consulate_appointment_date')))
+
+
+# --------Click to open the date picker-----
+def open_calendar(driver, budget=None):
+    budget = budget or LatencyBudget()
+    with budget.phase("calendar") as timeout:
+        date_input = driver.find_element(By.ID, 'appointments_consulate_appointment_date')
+        date_input.click()
+        WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((By.ID, 'ui-datepicker-div')))
+
+
+# --------Fetch Earliest Avail date-----
+def book_earliest(driver, is_wanted_month, notify=_no_notify, months=7, budget=None, on_scan=None, skip=(), start=None,
+                  strategy=forward, confirm=True, times_for=None, is_wanted_date=None, **engine_options):
+    """Read the calendar, pick open days in wanted months and book the first selectable one.
+
+    ``on_scan`` is called with the scanned ``CalendarMonth`` list and may
+    return the candidate dates instead (possibly empty); returning None
+    keeps the open days of the wanted months that ``is_wanted_date``
+    accepts (every one without it). ``strategy`` (see ``scan``)
+    orders the candidates. ``skip`` and ``start`` are passed to
+    ``read_calendar``; ``times_for`` and ``engine_options`` to ``book_dates``.
+    """
+    # One round trip for the whole calendar instead of find_element per month
+    scanned = read_calendar(driver, months=months, skip=skip, start=start)
+    chosen = on_scan(scanned) if on_scan else None
+    if chosen is None:
+        chosen = []
+        for month in scanned:
+            # --- Skip if year or month not in valid list ---
+            if not is_wanted_month(month):
+                logging.info(f"Skipping: {calendar.month_name[month.month]} {month.year}")
+                continue
+            # A wanted month can still hold excluded days, or days past the lead time or current appointment
+            chosen.extend(d for d in month.dates() if is_wanted_date is None or is_wanted_date(d))
+
+    return book_dates(driver, strategy(chosen), notify, budget, confirm, times_for, **engine_options)
+
+
+def book_dates(driver, dates, notify=_no_notify, budget=None, confirm=True, times_for=None, **engine_options):
+    """Try ``dates`` in order on an open calendar; returns the confirmed datetime or None.
+
+    Every time slot of every date is a candidate (see ``BookingEngine``);
+    ``times_for`` enables background prefetch of the next date's times.
+    """
+    return BookingEngine(driver, notify, budget, confirm, times_for, **engine_options).book(dates)
+
+
+# -------- Session cookies --------
+def restore_cookies(driver, cookies, url=None):
+    """Load saved cookies into the driver, then open ``url`` if given.
+
+    ``cookies`` is either a ``{name: value}`` mapping or a list of
+    WebDriver cookie dicts as returned by ``driver.get_cookies()``.
+    """
+    if isinstance(cookies, dict):
+        cookies = [{"name": name, "value": value} for name, value in cookies.items()]
+    origin = (url or driver.current_url).split("/", 3)
+    driver.get(f"{origin[0]}//{origin[2]}/")
+    for cookie in cookies:
+        # WebDriver rejects a domain that differs from the current page's; let it default
+        driver.add_cookie({k: v for k, v in cookie.items() if k in ("name", "value", "path", "secure", "httpOnly", "expiry")})
+    if url:
+        driver.get(url)
@@ -0,0 +1,91 @@
+"""Diff consecutive calendar scans so the watcher only acts on changes.
+
+``SnapshotCache`` remembers the open days per (facility, month) and the
+time slots per (facility, date). Each update returns a ``CalendarDiff``
+listing days that opened, days that closed and dates whose time slots
+changed. It also tracks how long each month has stayed empty so a
+partial rescan can skip months that are unlikely to change.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+
+@dataclass
+class CalendarDiff:
+    opened: list = field(default_factory=list)          # datetimes of newly open days, earliest first
+    closed: list = field(default_factory=list)          # datetimes of days that disappeared
+    times_changed: dict = field(default_factory=dict)   # "YYYY-MM-DD" -> (old times, new times)
+
+    def __bool__(self):
+        return bool(self.opened or self.closed or self.times_changed)
+
+    def summary(self):
+        parts = []
+        if self.opened:
+            parts.append("opened " + ", ".join(d.strftime("%Y-%m-%d") for d in self.opened))
+        if self.closed:
+            parts.append("closed " + ", ".join(d.strftime("%Y-%m-%d") for d in self.closed))
+        for date, (old, new) in self.times_changed.items():
+            parts.append(f"times {date}: {list(old)} -> {list(new)}")
+        return "; ".join(parts) or "no change"
+
+
+def _month_dates(month, days):
+    year, mon = (int(part) for part in month.split("-"))
+    return [datetime(year, mon, day) for day in sorted(days)]
+
+
+class SnapshotCache:
+    def __init__(self, empty_streak=5, revisit_every=5):
+        self.empty_streak = empty_streak
+        self.revisit_every = revisit_every
+        self._days = {}
+        self._times = {}
+        self._empty = {}
+
+    def update(self, facility, months, complete=False):
+        """Apply a scan of ``{"YYYY-MM": [open days]}`` and return what changed.
+
+        With ``complete=True`` months missing from the scan are treated as
+        empty; otherwise they are left untouched (partial rescan).
+        """
+        facility = str(facility)
+        months = {month: set(days) for month, days in months.items()}
+        if complete:
+            for fac, month in list(self._days):
+                if fac == facility and month not in months:
+                    months[month] = set()
+        diff = CalendarDiff()
+        for month, days in sorted(months.items()):
+            previous = self._days.get((facility, month), set())
+            self._days[(facility, month)] = days
+            self._empty[(facility, month)] = 0 if days else self._empty.get((facility, month), 0) + 1
+            diff.opened += _month_dates(month, days - previous)
+            diff.closed += _month_dates(month, previous - days)
+            for day in previous - days:
+                self._times.pop((facility, f"{month}-{day:02d}"), None)
+        return diff
+
+    def update_times(self, facility, date, times):
+        """Apply the time slots seen for one date; returns a ``CalendarDiff`` with ``times_changed`` set if they differ."""
+        key = (str(facility), date)
+        times = tuple(sorted(times))
+        previous = self._times.get(key, ())
+        self._times[key] = times
+        diff = CalendarDiff()
+        if times != previous:
+            diff.times_changed[date] = (previous, times)
+        return diff
+
+    def open_days(self, facility):
+        facility = str(facility)
+        return sorted(d for (fac, month), days in self._days.items() if fac == facility
+                      for d in _month_dates(month, days))
+
+    def months_to_skip(self, facility, attempt):
+        """Months that have been empty for ``empty_streak`` scans, except on every ``revisit_every``-th attempt."""
+        if attempt % self.revisit_every == 0:
+            return []
+        facility = str(facility)
+        return sorted(tuple(int(p) for p in month.split("-")) for (fac, month), streak in self._empty.items()
+                      if fac == facility and streak >= self.empty_streak)
@@ -0,0 +1,152 @@
+"""Read the whole appointment datepicker in a single WebDriver round trip.
+
+Walking the calendar with ``find_element`` costs one HTTP round trip to
+chromedriver per month header, per day list and per "next" click. Instead
+we run one script that asks the jQuery UI datepicker itself which days are
+selectable (its ``beforeShowDay`` hook plus min/max dates) and returns a
+compact ``[{year, month, days}]`` list. If the page has no jQuery
+datepicker instance the same script falls back to reading the rendered
+``td[data-handler=selectDay]`` cells, paging with the datepicker buttons
+inside the browser and restoring the original month afterwards.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+
+DATE_INPUT_ID = "appointments_consulate_appointment_date"
+
+_READ_CALENDAR_JS = """
+var el = document.getElementById(arguments[0]);
+var count = arguments[1];
+var skip = arguments[2] || [];
+var from = arguments[3];
+var $ = window.jQuery;
+var out = [];
+if (el && $ && $.datepicker && $.datepicker._getInst(el)) {
+    var dp = $.datepicker, inst = dp._getInst(el);
+    var before = dp._get(inst, 'beforeShowDay');
+    var minDate = dp._getMinMaxDate(inst, 'min');
+    var maxDate = dp._getMinMaxDate(inst, 'max');
+    var start = from ? new Date(from[0], from[1] - 1, 1) : (minDate ? new Date(minDate) : new Date());
+    for (var i = 0; i < count; i++) {
+        var first = new Date(start.getFullYear(), start.getMonth() + i, 1);
+        var y = first.getFullYear(), m = first.getMonth();
+        if (skip.indexOf(y + '-' + (m + 1)) >= 0) continue;
+        var last = new Date(y, m + 1, 0).getDate();
+        var days = [];
+        for (var d = 1; d <= last; d++) {
+            var date = new Date(y, m, d);
+            if (minDate && date < minDate) continue;
+            if (maxDate && date > maxDate) continue;
+            var ok = before ? before.apply(el, [date]) : [true];
+            if (ok[0]) days.push(d);
+        }
+        out.push({year: y, month: m + 1, days: days});
+        if (maxDate && first > maxDate) break;
+    }
+    return {source: 'api', months: out};
+}
+var MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+              'August', 'September', 'October', 'November', 'December'];
+var root = document.getElementById('ui-datepicker-div') || document;
+var seen = {}, clicks = 0;
+function shown() {
+    var header = root.querySelector('.ui-datepicker-month'), year = root.querySelector('.ui-datepicker-year');
+    return header && year ? parseInt(year.textContent, 10) * 12 + MONTHS.indexOf(header.textContent.trim()) : null;
+}
+// Page forward to the first wanted month inside the browser; nothing before it is read
+while (from && shown() !== null && shown() < from[0] * 12 + from[1] - 1 && clicks < 36) {
+    var fwd = root.querySelector('.ui-datepicker-next:not(.ui-state-disabled)');
+    if (!fwd) break;
+    fwd.click();
+    clicks++;
+}
+for (var i = 0; i < count; i++) {
+    root.querySelectorAll('.ui-datepicker-calendar').forEach(function (table) {
+        var ref = table.querySelector('td[data-month][data-year]');
+        var header = table.parentNode.querySelector('.ui-datepicker-month');
+        var year, month;
+        if (ref) {
+            year = parseInt(ref.getAttribute('data-year'), 10);
+            month = parseInt(ref.getAttribute('data-month'), 10) + 1;
+        } else if (header) {
+            // Months without a selectable day carry no data-* attributes; use the title
+            year = parseInt(table.parentNode.querySelector('.ui-datepicker-year').textContent, 10);
+            month = MONTHS.indexOf(header.textContent.trim()) + 1;
+        }
+        if (!year || month < 1 || seen[year + '-' + month]) return;
+        seen[year + '-' + month] = true;
+        if (skip.indexOf(year + '-' + month) >= 0) return;
+        var days = [];
+        table.querySelectorAll('td[data-handler="selectDay"]').forEach(function (td) {
+            days.push(parseInt(td.textContent, 10));
+        });
+        out.push({year: year, month: month, days: days});
+    });
+    var next = root.querySelector('.ui-datepicker-next:not(.ui-state-disabled)');
+    if (!next || Object.keys(seen).length >= count) break;
+    next.click();
+    clicks++;
+}
+for (var j = 0; j < clicks; j++) {
+    var prev = root.querySelector('.ui-datepicker-prev');
+    if (prev) prev.click();
+}
+return {source: 'dom', months: out};
+"""
+
+_SELECT_DAY_JS = """
+var el = document.getElementById(arguments[0]);
+var y = arguments[1], m = arguments[2] - 1, d = arguments[3];
+var $ = window.jQuery;
+if (el && $ && $.datepicker && $.datepicker._getInst(el)) {
+    var dp = $.datepicker, inst = dp._getInst(el);
+    $(el).datepicker('setDate', new Date(y, m, d));
+    var onSelect = dp._get(inst, 'onSelect');
+    if (onSelect) onSelect.apply(el, [$(el).val(), inst]);
+    $(el).trigger('change');
+    dp._hideDatepicker(el);
+    return true;
+}
+var root = document.getElementById('ui-datepicker-div') || document;
+for (var i = 0; i < 24; i++) {
+    var cells = root.querySelectorAll('td[data-handler="selectDay"][data-year="' + y + '"][data-month="' + m + '"]');
+    for (var k = 0; k < cells.length; k++) {
+        if (parseInt(cells[k].textContent, 10) === d) {
+            cells[k].querySelector('a').click();
+            return true;
+        }
+    }
+    var next = root.querySelector('.ui-datepicker-next:not(.ui-state-disabled)');
+    if (!next) break;
+    next.click();
+}
+return false;
+"""
+
+
+@dataclass
+class CalendarMonth:
+    year: int
+    month: int
+    days: list = field(default_factory=list)
+
+    def dates(self):
+        return [datetime(self.year, self.month, day) for day in self.days]
+
+
+def read_calendar(driver, months=12, input_id=DATE_INPUT_ID, skip=(), start=None):
+    """Return ``CalendarMonth`` entries for ``months`` months, earliest first.
+
+    Reading begins at ``start`` (``(year, month)``) when given, otherwise at
+    the datepicker's first month. ``skip`` is a list of ``(year, month)``
+    pairs left out of the result.
+    """
+    skip = [f"{year}-{month}" for year, month in skip]
+    result = driver.execute_script(_READ_CALENDAR_JS, input_id, months, skip,
+                                   list(start) if start else None) or {"months": []}
+    return [CalendarMonth(m["year"], m["month"], sorted(m["days"])) for m in result["months"]]
+
+
+def select_day(driver, date, input_id=DATE_INPUT_ID):
+    """Pick ``date`` in the datepicker so the page loads its time slots. Returns False if not selectable."""
+    return bool(driver.execute_script(_SELECT_DAY_JS, input_id, date.year, date.month, date.day))
@@ -0,0 +1,70 @@
+"""Time source for the poll loop.
+
+Everything that decides *when* to poll (the watcher's waits, the
+scheduler's back-off and token bucket, session ages, "today" for the date
+policy) asks a ``Clock`` instead of calling ``time`` directly.
+``SYSTEM_CLOCK`` is the real one. ``SimulatedClock`` is virtual time that
+moves only when the loop sleeps, so ``simulate`` can replay days of
+polling in seconds.
+"""
+import time
+from datetime import datetime
+
+
+class SimulationOver(Exception):
+    """Raised by ``SimulatedClock.sleep`` once virtual time reaches the end of the run."""
+
+
+class Clock:
+    def time(self):
+        return time.time()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def wait(self, event, timeout):
+        """``event.wait(timeout)`` on this clock's time; returns True if the event was set."""
+        return event.wait(timeout)
+
+    def now(self, tz=None):
+        return datetime.fromtimestamp(self.time(), tz)
+
+    def today(self):
+        return self.now().date()
+
+
+SYSTEM_CLOCK = Clock()
+
+
+class SimulatedClock(Clock):
+    """Virtual time starting at ``start`` (epoch seconds); sleeping advances it instantly.
+
+    With ``end`` set, a sleep that would reach it raises ``SimulationOver``,
+    which is how a simulated run stops.
+    """
+
+    def __init__(self, start=None, end=None):
+        self._now = time.time() if start is None else start
+        self.start = self._now
+        self.end = end
+        self.slept = 0.0
+
+    def time(self):
+        return self._now
+
+    def advance(self, seconds):
+        seconds = max(0.0, seconds)
+        if self.end is not None and self._now + seconds >= self.end:
+            self._now = self.end
+            raise SimulationOver()
+        self._now += seconds
+        self.slept += seconds
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def wait(self, event, timeout):
+        # Nothing else runs in virtual time, so an unset event stays unset for the whole timeout
+        if not event.is_set():
+            self.advance(timeout)
+        return event.is_set()
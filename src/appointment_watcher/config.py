@@ -0,0 +1,158 @@
+"""Watcher settings, read from the environment (and ``.env``) in one place.
+
+Building a ``Config`` has no side effects: nothing is logged, opened or
+launched, so it can be created freely in tools and tests.
+"""
+import os
+from dataclasses import dataclass, field
+
+from appointment_watcher.latency import parse_timeouts
+from appointment_watcher.notify import TELEGRAM_API_URL
+from appointment_watcher.policy import DatePolicy, parse_dates, parse_windows, windows_from_months
+from appointment_watcher.scan import parse_month
+
+# -------- Date Window --------
+VALID_MONTHS = ["September", "October", "November", "December", "January", "February"]
+VALID_YEARS = [2025, 2026]
+
+
+@dataclass
+class Config:
+    email: str = None
+    password: str = None
+    schedule_id: str = None
+    telegram_bot_token: str = None
+    telegram_chat_id: str = None
+    chrome_driver_path: str = None
+    country_code: str = "en-ca"
+    ais_base_url: str = "https://ais.usvisa-info.com"
+    telegram_api_url: str = TELEGRAM_API_URL
+    headless: bool = False
+    browser_profile: str = "default"
+    poll_mode: str = "browser"
+    facility_id: str = "94"
+    facility_name: str = "Toronto"
+    session_cache_path: str = ".session_cache.json"
+    session_cache_key: str = None
+    retry_delay: float = 60
+    max_requests_per_hour: int = None
+    poll_profile: str = None
+    release_history_path: str = None
+    hibernate_after_busy: int = 4
+    phase_timeouts: dict = field(default_factory=dict)
+    check_budget: float = 30
+    metrics_prom_path: str = None
+    metrics_jsonl_path: str = None
+    history_db: str = "logs/availability.db"
+    partial_rescan: bool = False
+    scan_strategy: str = "forward"
+    preferred_month: tuple = None
+    dry_run: bool = False
+    booking_attempt_timeout: float = 4.0
+    booking_max_attempts: int = 8
+    prefetch_times: bool = True
+    date_windows: list = field(default_factory=list)
+    exclude_dates: set = field(default_factory=set)
+    min_lead_days: int = 0
+    max_lead_days: int = None
+    current_appointment: str = None
+    log_dir: str = "logs"
+    event_log_dir: str = "logs/events"
+    event_log_max_mb: float = 50
+    coordination_db: str = None
+    node_id: str = None
+    lease_seconds: float = 300
+    cluster_requests_per_hour: int = None
+    driver_max_checks: int = 200
+    driver_max_rss_mb: float = None
+    driver_hard_timeout: float = 90
+    session_refresh_after: float = 0
+    session_check_interval: float = 240
+    session_standby: bool = False
+    control_port: int = None
+    control_host: str = "127.0.0.1"
+    telegram_commands: bool = False
+    diagnostics_dir: str = "logs/diagnostics"
+    diagnostics_max_mb: float = 50
+    watch_reload_seconds: float = 900
+    facility_index_path: str = ".facility_index.json"
+    sweep_facilities: list = field(default_factory=list)
+
+    # -------- URLs --------
+    @property
+    def login_url(self):
+        return f"{self.ais_base_url}/{self.country_code}/niv/users/sign_in"
+
+    @property
+    def appointment_url(self):
+        return f"{self.ais_base_url}/{self.country_code}/niv/schedule/{self.schedule_id}/appointment"
+
+    def date_policy(self):
+        return DatePolicy(self.date_windows or windows_from_months(VALID_MONTHS, VALID_YEARS), self.exclude_dates,
+                          self.min_lead_days, self.max_lead_days, self.current_appointment)
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Read settings from ``environ`` (default ``os.environ``); call ``load_dotenv()`` first for ``.env``."""
+        env = os.environ if environ is None else environ
+        return cls(
+            email=env.get("EMAIL"),
+            password=env.get("PASSWORD"),
+            schedule_id=env.get("SCHEDULE_ID"),
+            telegram_bot_token=env.get("TELEGRAM_BOT_TOKEN"),
+            telegram_chat_id=env.get("TELEGRAM_CHAT_ID"),
+            chrome_driver_path=env.get("CHROME_DRIVER_PATH"),
+            country_code=env.get("COUNTRY_CODE", "en-ca"),
+            ais_base_url=env.get("AIS_BASE_URL", "https://ais.usvisa-info.com"),   # point at mock_ais for local runs
+            telegram_api_url=env.get("TELEGRAM_API_URL", TELEGRAM_API_URL),
+            headless=env.get("HEADLESS", "0") == "1",
+            browser_profile=env.get("BROWSER_PROFILE", "default"),   # "lean": headless, eager loads, images/fonts/analytics blocked
+            poll_mode=env.get("POLL_MODE", "browser"),   # "browser", "http" (JSON fast path) or "watch" (stay on the page)
+            facility_id=env.get("FACILITY_ID", "94"),    # 94 = Toronto
+            facility_name=env.get("FACILITY_NAME", "Toronto"),
+            session_cache_path=env.get("SESSION_CACHE_PATH", ".session_cache.json"),
+            session_cache_key=env.get("SESSION_CACHE_KEY"),   # optional Fernet key to encrypt the cache
+            retry_delay=float(env.get("RETRY_DELAY", "60")),
+            max_requests_per_hour=int(env.get("MAX_REQUESTS_PER_HOUR", "0")) or None,
+            poll_profile=env.get("POLL_PROFILE"),              # JSON time-of-day intensity profile
+            release_history_path=env.get("RELEASE_HISTORY_PATH"),   # learn slot-release hours if set
+            hibernate_after_busy=int(env.get("HIBERNATE_AFTER_BUSY", "4")),
+            phase_timeouts=parse_timeouts(env.get("PHASE_TIMEOUTS")),   # e.g. "page=10,times=6"
+            check_budget=float(env.get("CHECK_BUDGET", "30")),           # seconds from page load to booking click
+            metrics_prom_path=env.get("METRICS_PROM_PATH"),     # Prometheus textfile, rewritten every attempt
+            metrics_jsonl_path=env.get("METRICS_JSONL_PATH"),   # one JSON snapshot appended per attempt
+            history_db=env.get("HISTORY_DB", "logs/availability.db"),   # blank disables the history store
+            partial_rescan=env.get("PARTIAL_RESCAN", "0") == "1",   # skip months that keep coming back empty
+            scan_strategy=env.get("SCAN_STRATEGY", "forward"),     # forward, backward, bidirectional or first
+            preferred_month=parse_month(env.get("PREFERRED_MONTH")),   # YYYY-MM, centre of a bidirectional scan
+            dry_run=env.get("DRY_RUN", "0") == "1",                # pick a slot but never click Reschedule
+            booking_attempt_timeout=float(env.get("BOOKING_ATTEMPT_TIMEOUT", "4")),   # seconds per (date, time) try
+            booking_max_attempts=int(env.get("BOOKING_MAX_ATTEMPTS", "8")),
+            prefetch_times=env.get("PREFETCH_TIMES", "1") == "1",   # fetch the next date's times over HTTP while booking
+            date_windows=parse_windows(env.get("DATE_WINDOWS")),   # e.g. "2026-11-01..2027-02-28"; overrides VALID_MONTHS/YEARS
+            exclude_dates=parse_dates(env.get("EXCLUDE_DATES")),   # comma separated YYYY-MM-DD
+            min_lead_days=int(env.get("MIN_LEAD_DAYS", "0")),
+            max_lead_days=int(env.get("MAX_LEAD_DAYS", "0")) or None,
+            current_appointment=env.get("CURRENT_APPOINTMENT") or None,  # only book dates earlier than this
+            log_dir=env.get("LOG_DIR", "logs"),
+            event_log_dir=env.get("EVENT_LOG_DIR", "logs/events"),   # structured JSONL events; blank disables
+            event_log_max_mb=float(env.get("EVENT_LOG_MAX_MB", "50")),   # roll over (and gzip) past this size
+            coordination_db=env.get("COORDINATION_DB") or None,   # shared SQLite file; blank = single node
+            node_id=env.get("NODE_ID") or None,                   # default hostname-pid
+            lease_seconds=float(env.get("LEASE_SECONDS", "300")),  # length of one node's polling turn
+            cluster_requests_per_hour=int(env.get("CLUSTER_REQUESTS_PER_HOUR", "0")) or None,   # shared by all nodes
+            driver_max_checks=int(env.get("DRIVER_MAX_CHECKS", "200")),   # restart Chrome after this many checks; 0 = never
+            driver_max_rss_mb=float(env.get("DRIVER_MAX_RSS_MB", "0")) or None,   # ... or once it uses this much memory
+            driver_hard_timeout=float(env.get("DRIVER_HARD_TIMEOUT", "90")),   # kill a WebDriver call stuck this long
+            session_refresh_after=float(env.get("SESSION_REFRESH_AFTER", "0")),   # sign in again at this age; 0 = only once validation fails
+            session_check_interval=float(env.get("SESSION_CHECK_INTERVAL", "240")),  # background validity check; 0 disables the keeper
+            session_standby=env.get("SESSION_STANDBY", "0") == "1",   # keep a second session logged in for instant takeover
+            control_port=int(env.get("CONTROL_PORT", "0")) or None,   # serve /status and /metrics here
+            control_host=env.get("CONTROL_HOST", "127.0.0.1"),
+            telegram_commands=env.get("TELEGRAM_COMMANDS", "0") == "1",   # accept /status, /pause, ... from the chat
+            diagnostics_dir=env.get("DIAGNOSTICS_DIR", "logs/diagnostics"),   # screenshots + page source of failed bookings
+            diagnostics_max_mb=float(env.get("DIAGNOSTICS_MAX_MB", "50")),    # oldest captures are deleted past this
+            watch_reload_seconds=float(env.get("WATCH_RELOAD_SECONDS", "900")),   # watch mode: full page reload at least this often
+            facility_index_path=env.get("FACILITY_INDEX_PATH", ".facility_index.json"),   # cached facility name -> option value
+            sweep_facilities=[name.strip() for name in env.get("SWEEP_FACILITIES", "").split(",") if name.strip()],   # http mode: e.g. "Toronto,Ottawa,Montreal"
+        )
@@ -0,0 +1,192 @@
+"""Inspect and steer a running watcher without restarting it.
+
+Restarting costs a login and a calendar reload, so the operator talks to
+the live process instead:
+
+* ``StatusServer`` serves ``GET /status`` (JSON) and ``GET /metrics``
+  (Prometheus text) on a local port from a background thread.
+* ``TelegramCommands`` long-polls the bot's ``getUpdates`` on its own thread
+  and answers commands from the configured chat only::
+
+      /status              what the watcher is doing
+      /pause, /resume      stop / restart polling (the polling lease is given up while paused)
+      /window [SPEC|reset] show or replace the date windows, e.g. /window 2026-11-01..2027-01-31
+      /intensity [X|auto]  poll X times as often as the profile says
+      /scan_now            check right away instead of waiting (also /scan-now)
+
+  Telegram hands each update to one consumer only, so give every node its
+  own bot if several share a chat.
+
+``Control`` is the state both front ends change and the poll loop reads:
+the loop's waits go through ``Control.sleep``, which returns early on
+``scan_now`` and holds while paused.
+"""
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from appointment_watcher.clock import SYSTEM_CLOCK
+from appointment_watcher.notify import TELEGRAM_API_URL
+
+
+class Control:
+    def __init__(self, clock=SYSTEM_CLOCK):
+        self.paused = False
+        self.clock = clock
+        self._wake = threading.Event()
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        self._wake.set()
+
+    def scan_now(self):
+        self.paused = False
+        self._wake.set()
+
+    def sleep(self, seconds, on_pause=None):
+        """Wait ``seconds``, or less if a scan is requested; while paused, wait for ``resume``.
+
+        ``on_pause`` is called once when a pause starts. Returns True if woken early.
+        """
+        woken = self.clock.wait(self._wake, seconds)
+        self._wake.clear()
+        if self.paused:
+            logging.info("⏸️ Polling paused.")
+            if on_pause:
+                on_pause()
+            while self.paused:
+                self.clock.wait(self._wake, 1)
+            self._wake.clear()
+            logging.info("▶️ Polling resumed.")
+            woken = True
+        return woken
+
+
+# -------- HTTP status --------
+class StatusServer:
+    """``/status`` and ``/metrics`` on ``host:port``; ``status()`` returns a JSON-able dict, ``metrics()`` text."""
+
+    def __init__(self, status, metrics, host="127.0.0.1", port=8787):
+        self._server = ThreadingHTTPServer((host, port), self._handler_class(status, metrics))
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="status-server", daemon=True)
+
+    @property
+    def address(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread.start()
+        logging.info(f"Status endpoint on {self.address}/status")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @staticmethod
+    def _handler_class(status, metrics):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body, content_type):
+                body = body.encode()
+                self.send_response(code)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                try:
+                    if path == "/status":
+                        return self._send(200, json.dumps(status(), default=str, indent=1), "application/json")
+                    if path == "/metrics":
+                        return self._send(200, metrics(), "text/plain; version=0.0.4")
+                except Exception as e:
+                    return self._send(500, json.dumps({"error": str(e)}), "application/json")
+                self._send(404, json.dumps({"error": "not found"}), "application/json")
+
+        return Handler
+
+
+# -------- Telegram commands --------
+class TelegramCommands:
+    """Long-poll the bot for commands and answer them through ``reply``.
+
+    ``handle(command, args)`` returns the reply text (or None to stay quiet).
+    Updates sent before the watcher started are skipped.
+    """
+
+    def __init__(self, token, chat_id, handle, reply, api_url=TELEGRAM_API_URL, poll_timeout=25):
+        self.url = f"{api_url}/bot{token}"
+        self.chat_id = str(chat_id)
+        self.handle = handle
+        self.reply = reply
+        self.poll_timeout = poll_timeout
+        self.offset = None
+        self._session = requests.Session()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="telegram-commands", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._session.close()   # also ends a long poll in progress
+
+    def _updates(self, timeout):
+        params = {"timeout": timeout, "allowed_updates": json.dumps(["message"])}
+        if self.offset is not None:
+            params["offset"] = self.offset
+        response = self._session.get(f"{self.url}/getUpdates", params=params, timeout=timeout + 10)
+        response.raise_for_status()
+        updates = response.json().get("result", [])
+        if updates:
+            self.offset = updates[-1]["update_id"] + 1
+        return updates
+
+    def _run(self):
+        try:
+            self._updates(0)   # only acknowledge what is already queued
+        except Exception as e:
+            logging.debug(f"Telegram getUpdates failed: {e}")
+        errors = 0
+        while not self._stop.is_set():
+            try:
+                updates = self._updates(self.poll_timeout)
+                errors = 0
+            except Exception as e:
+                if self._stop.is_set():
+                    return
+                errors += 1
+                logging.warning(f"Telegram getUpdates failed: {e}")
+                self._stop.wait(min(300, 5 * 2 ** errors))
+                continue
+            for update in updates:
+                self.dispatch(update.get("message") or {})
+
+    def dispatch(self, message):
+        text = (message.get("text") or "").strip()
+        if not text.startswith("/") or str(message.get("chat", {}).get("id")) != self.chat_id:
+            return
+        command, _, args = text[1:].partition(" ")
+        command = command.split("@")[0].lower().replace("-", "_")   # /scan-now, /status@my_bot
+        try:
+            answer = self.handle(command, args.strip())
+        except Exception as e:
+            logging.error(f"Telegram command /{command} failed: {e}")
+            answer = f"⚠️ /{command} failed: {e}"
+        if answer:
+            self.reply(answer)
@@ -0,0 +1,277 @@
+"""Coordination between watcher nodes that share schedules.
+
+Without it, every node polls every schedule, all of them trip "System
+Busy" together and two of them can race to book the same slot. A
+``Coordinator`` hands out three things:
+
+* **polling leases** per ``schedule:facility`` key (``schedule:sweep`` for a
+  node sweeping several facilities), each valid for one time
+  slice. A node whose slice ran out cannot renew it while another node is
+  waiting for the same key, so nodes take turns instead of all polling.
+* a **global request budget** (a token bucket shared by every node), so
+  adding nodes adds coverage and failover, not load on the site.
+* a **booking grant** per schedule: at most one node at a time may press
+  the confirm button for it, whichever facility it polls. Once a node
+  reports a booking, the schedule is closed for everyone.
+
+``SQLiteCoordinator`` keeps this state in one SQLite file and takes a
+``BEGIN IMMEDIATE`` lock per operation. That suffices for processes on one
+host or a shared disk with working file locks. Another backend (Redis,
+etcd, ...) only has to implement the ``Coordinator`` methods.
+``LocalCoordinator`` grants everything and is the default for a single
+node.
+
+Several local processes can be checked against one database::
+
+    python -m appointment_watcher.coordination /tmp/coord.db --nodes 4 --duration 20 --budget 720
+"""
+import abc
+import argparse
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+Lease = namedtuple("Lease", "key holder expires token")
+
+
+def default_node_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class Coordinator(abc.ABC):
+    """Interface every backend implements.
+
+    Polling leases are keyed ``"<schedule>:<facility>"``; the booking grant
+    and ``is_booked`` are keyed by ``"<schedule>"`` alone.
+    """
+
+    node_id = None
+
+    @abc.abstractmethod
+    def acquire_poll(self, key):
+        """Return a ``Lease`` if this node may poll ``key`` now, else None."""
+
+    @abc.abstractmethod
+    def release_poll(self, key):
+        pass
+
+    @abc.abstractmethod
+    def take_request(self, count=1):
+        """Consume ``count`` requests from the shared budget; returns seconds to wait first (0 if none)."""
+
+    @abc.abstractmethod
+    def acquire_booking(self, key, ttl=120):
+        """True if this node holds the booking grant for ``key`` (until released or ``ttl`` passes)."""
+
+    @abc.abstractmethod
+    def release_booking(self, key, booked=False):
+        """Give the grant back; ``booked=True`` closes ``key`` for every node."""
+
+    @abc.abstractmethod
+    def is_booked(self, key):
+        pass
+
+    def close(self):
+        pass
+
+
+class LocalCoordinator(Coordinator):
+    """Single node: every lease, request and grant is granted."""
+
+    def __init__(self, node_id=None):
+        self.node_id = node_id or default_node_id()
+        self._booked = set()
+
+    def acquire_poll(self, key):
+        return Lease(key, self.node_id, float("inf"), 0)
+
+    def release_poll(self, key):
+        pass
+
+    def take_request(self, count=1):
+        return 0.0
+
+    def acquire_booking(self, key, ttl=120):
+        return key not in self._booked
+
+    def release_booking(self, key, booked=False):
+        if booked:
+            self._booked.add(key)
+
+    def is_booked(self, key):
+        return key in self._booked
+
+
+class SQLiteCoordinator(Coordinator):
+    def __init__(self, path, node_id=None, lease_seconds=300, requests_per_hour=None, clock=time.time):
+        self.path = path
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+        self.requests_per_hour = requests_per_hour
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, holder TEXT, expires REAL, token INTEGER);
+            CREATE TABLE IF NOT EXISTS waiters (key TEXT, node TEXT, since REAL, seen REAL, PRIMARY KEY (key, node));
+            CREATE TABLE IF NOT EXISTS budget (id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL, updated REAL);
+            CREATE TABLE IF NOT EXISTS bookings (key TEXT PRIMARY KEY, holder TEXT, expires REAL, booked INTEGER DEFAULT 0);
+        """)
+
+    def _transaction(self, fn):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-check-write is atomic across processes
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._db, self.clock())
+                self._db.execute("COMMIT")
+                return result
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    # -------- Polling leases --------
+    def acquire_poll(self, key):
+        def acquire(db, now):
+            row = db.execute("SELECT holder, expires, token FROM leases WHERE key = ?", (key,)).fetchone()
+            if row:
+                holder, expires, token = row
+                if holder == self.node_id and expires > now:
+                    return Lease(key, holder, expires, token)
+                if expires <= now:
+                    # The slice is over: the node that has waited longest is next, whoever asks first
+                    nxt = db.execute("SELECT node FROM waiters WHERE key = ? AND seen > ? ORDER BY since LIMIT 1",
+                                     (key, now - 2 * self.lease_seconds)).fetchone()
+                    holder = nxt[0] if nxt else self.node_id
+                    expires = now + self.lease_seconds
+                    token += 1
+                    db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?, ?)", (key, holder, expires, token))
+                    db.execute("DELETE FROM waiters WHERE key = ? AND node = ?", (key, holder))
+                    logging.info(f"Polling lease for {key} passed to {holder} (token {token})")
+                if holder != self.node_id:
+                    db.execute("INSERT INTO waiters VALUES (?, ?, ?, ?) ON CONFLICT (key, node) DO UPDATE SET seen = ?",
+                               (key, self.node_id, now, now, now))
+                    return None
+                return Lease(key, holder, expires, token)
+            expires = now + self.lease_seconds
+            db.execute("INSERT INTO leases VALUES (?, ?, ?, 1)", (key, self.node_id, expires))
+            logging.info(f"Polling lease for {key} granted to {self.node_id} (token 1)")
+            return Lease(key, self.node_id, expires, 1)
+        return self._transaction(acquire)
+
+    def release_poll(self, key):
+        self._transaction(lambda db, now: db.execute(
+            "DELETE FROM leases WHERE key = ? AND holder = ?", (key, self.node_id)))
+
+    # -------- Global request budget --------
+    def take_request(self, count=1):
+        if not self.requests_per_hour:
+            return 0.0
+        rate = self.requests_per_hour / 3600
+        capacity = max(1.0, self.requests_per_hour / 60)   # at most one minute's worth of burst
+
+        def take(db, now):
+            row = db.execute("SELECT tokens, updated FROM budget WHERE id = 1").fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + (now - updated) * rate) - count
+            db.execute("INSERT OR REPLACE INTO budget VALUES (1, ?, ?)", (tokens, now))
+            # Negative balance means the token was borrowed from the future: wait until it is earned
+            return max(0.0, -tokens / rate)
+        return self._transaction(take)
+
+    # -------- Booking grant --------
+    def acquire_booking(self, key, ttl=120):
+        def acquire(db, now):
+            row = db.execute("SELECT holder, expires, booked FROM bookings WHERE key = ?", (key,)).fetchone()
+            if row and (row[2] or (row[0] != self.node_id and row[1] > now)):
+                return False
+            db.execute("INSERT OR REPLACE INTO bookings VALUES (?, ?, ?, 0)", (key, self.node_id, now + ttl))
+            return True
+        granted = self._transaction(acquire)
+        logging.info(f"Booking grant for {key} {'granted to' if granted else 'refused to'} {self.node_id}")
+        return granted
+
+    def release_booking(self, key, booked=False):
+        def release(db, now):
+            if booked:
+                db.execute("UPDATE bookings SET booked = 1 WHERE key = ? AND holder = ?", (key, self.node_id))
+            else:
+                db.execute("DELETE FROM bookings WHERE key = ? AND holder = ? AND booked = 0", (key, self.node_id))
+        self._transaction(release)
+
+    def is_booked(self, key):
+        with self._lock:
+            row = self._db.execute("SELECT booked FROM bookings WHERE key = ?", (key,)).fetchone()
+        return bool(row and row[0])
+
+    def close(self):
+        self._db.close()
+
+
+# -------- Local multi-process check --------
+def _node(path, index, duration, lease_seconds, budget, poll_interval, book_after, results):
+    coordinator = SQLiteCoordinator(path, f"node-{index}", lease_seconds, budget)
+    polls = booked = refused = 0
+    deadline = time.time() + duration
+    while time.time() < deadline and not coordinator.is_booked("1"):
+        if coordinator.acquire_poll("1:94") is None:
+            time.sleep(poll_interval)
+            continue
+        time.sleep(coordinator.take_request())
+        polls += 1
+        if book_after and time.time() > book_after:
+            # Every node "finds" the slot at once; only the grant holder may book it
+            if coordinator.acquire_booking("1"):
+                booked += 1
+                coordinator.release_booking("1", booked=True)
+            else:
+                refused += 1
+        time.sleep(poll_interval)
+    coordinator.close()
+    results.put((f"node-{index}", polls, booked, refused))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several local nodes against one coordination database.")
+    parser.add_argument("db")
+    parser.add_argument("--nodes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--lease", type=float, default=2, help="lease slice in seconds")
+    parser.add_argument("--budget", type=float, default=720, help="shared requests per hour (0 = unlimited)")
+    parser.add_argument("--interval", type=float, default=0.05, help="seconds between a node's polls")
+    parser.add_argument("--book-at", type=float, default=None, help="seconds in when every node tries to book")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    results = multiprocessing.Queue()
+    started = time.time()
+    book_after = started + args.book_at if args.book_at is not None else None
+    procs = [multiprocessing.Process(target=_node, args=(args.db, i, args.duration, args.lease, args.budget,
+                                                         args.interval, book_after, results))
+             for i in range(args.nodes)]
+    for p in procs:
+        p.start()
+    rows = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    elapsed = time.time() - started
+
+    total = sum(r[1] for r in rows)
+    for node, polls, booked, refused in sorted(rows):
+        print(f"{node:<8} polls={polls:<5} booked={booked} refused={refused}")
+    print(f"total polls={total} in {elapsed:.1f}s = {total / elapsed * 3600:.0f}/h (budget {args.budget:.0f}/h), "
+          f"bookings={sum(r[2] for r in rows)}")
+
+
+if __name__ == "__main__":
+    main()
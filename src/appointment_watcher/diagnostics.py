@@ -0,0 +1,145 @@
+"""Forensic captures (screenshot + page source) off the booking path.
+
+``Diagnostics.capture(driver, reason)`` is the only part that runs on the
+caller's thread: one script call scrolls the page to the time select and
+returns its trimmed HTML and URL, and one WebDriver call takes the
+screenshot (still base64 encoded). Decoding, hashing and writing happen on a
+worker thread.
+
+Captures are content addressed: a screenshot whose hash is already on disk
+is not written again, the existing files are only marked as recently used.
+Once the directory grows past ``max_bytes`` the least recently used
+captures are deleted, so a flapping site cannot fill the disk with
+identical PNGs.
+"""
+import base64
+import glob
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+
+# One round trip: bring the time select into view and return what the page looked like
+_PAGE_JS = """
+var select = document.getElementById('appointments_consulate_appointment_time');
+if (select) select.scrollIntoView({block: 'center'}); else window.scrollBy(0, 300);
+return [location.href, document.documentElement.outerHTML.slice(0, arguments[0])];
+"""
+
+_NAME_RE = re.compile(r"^\d{8}_\d{6}_[\w-]+_(?P<hash>[0-9a-f]{12})\.(png|html)$")
+
+
+class Diagnostics:
+    _STOP = object()
+
+    def __init__(self, directory="logs/diagnostics", max_bytes=50 * 1024 * 1024, max_html=200_000, maxsize=8):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_html = max_html
+        self.captured = self.duplicates = self.dropped = self.evicted = 0
+        self._queue = queue.Queue(maxsize)
+        self._seen = {}   # hash -> file paths of that capture
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, "*")):
+            match = _NAME_RE.match(os.path.basename(path))
+            if match:
+                self._seen.setdefault(match.group("hash"), []).append(path)
+        self._thread = threading.Thread(target=self._run, name="diagnostics", daemon=True)
+        self._thread.start()
+
+    def capture(self, driver, reason):
+        """Grab the page and queue it for writing; returns False if nothing was queued."""
+        try:
+            url, html = driver.execute_script(_PAGE_JS, self.max_html)
+            png_b64 = driver.get_screenshot_as_base64()
+        except Exception as e:
+            logging.error(f"Could not capture {reason} diagnostics: {e}")
+            return False
+        try:
+            self._queue.put_nowait((time.time(), reason, url, html, png_b64))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    # -------- Writer thread --------
+    def _write(self, ts, reason, url, html, png_b64):
+        png = base64.b64decode(png_b64)
+        digest = hashlib.sha1(png).hexdigest()[:12]
+        if digest in self._seen:
+            self.duplicates += 1
+            now = time.time()
+            for path in self._seen[digest]:
+                try:
+                    os.utime(path, (now, now))   # keeps the capture at the young end of the LRU
+                except OSError:
+                    pass
+            return
+        stem = os.path.join(self.directory, f"{datetime.fromtimestamp(ts):%Y%m%d_%H%M%S}_{reason}_{digest}")
+        with open(f"{stem}.png", "wb") as f:
+            f.write(png)
+        with open(f"{stem}.html", "w", encoding="utf-8") as f:
+            f.write(f"<!-- {url} -->\n{html}")
+        self._seen[digest] = [f"{stem}.png", f"{stem}.html"]
+        self.captured += 1
+        logging.info(f"Saved {reason} diagnostics to {stem}.png")
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for paths in self._seen.values():
+            for path in paths:
+                try:
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+                except OSError:
+                    pass
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            match = _NAME_RE.match(os.path.basename(path))
+            for stale in self._seen.pop(match.group("hash"), []) if match else [path]:
+                try:
+                    total -= os.path.getsize(stale)
+                    os.remove(stale)
+                except OSError:
+                    pass
+            self.evicted += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                self._write(*item)
+            except Exception as e:
+                logging.error(f"Could not write diagnostics: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def close(self, timeout=5):
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join(timeout)
+
+
+_default = None
+
+
+def default_diagnostics():
+    """Shared instance for callers that were not given one (writes to ``logs/diagnostics``)."""
+    global _default
+    if _default is None:
+        _default = Diagnostics()
+    return _default
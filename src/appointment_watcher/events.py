@@ -0,0 +1,271 @@
+"""Structured JSONL event stream, written off the polling thread.
+
+``EventLog.emit(kind, **fields)`` only puts a dict on a queue; one worker
+thread serialises events to ``<dir>/events-YYYYMMDD.jsonl``. The file
+rolls over at midnight and whenever it grows past ``max_bytes``; rolled
+files are gzip-compressed by the same worker. Every event carries ``ts``
+(epoch seconds), ``run`` (one id per process) and ``kind``.
+
+``EventLogHandler`` forwards ``logging`` records into the same stream, and
+``setup_logging`` moves the text log behind a ``QueueListener`` with a
+midnight ``TimedRotatingFileHandler``, so no log write blocks a check.
+
+The replay tool rebuilds a run's timeline and summary from the files::
+
+    python -m appointment_watcher.events logs/events            # latest run
+    python -m appointment_watcher.events logs/events --run 3f2a9c1e --kinds phase,outcome
+    python -m appointment_watcher.events logs/events --list
+"""
+import argparse
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime
+
+
+class EventLog:
+    _STOP = object()
+
+    def __init__(self, directory, prefix="events", max_bytes=50 * 1024 * 1024, compress=True, maxsize=10000):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.run_id = uuid.uuid4().hex[:8]
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize)
+        self._file = None
+        self._day = None
+        os.makedirs(directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="event-log", daemon=True)
+        self._thread.start()
+
+    def emit(self, kind, **fields):
+        """Queue one event; never blocks. Returns False if the queue was full and the event dropped."""
+        try:
+            self._queue.put_nowait({"ts": round(time.time(), 3), "run": self.run_id, "kind": kind, **fields})
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    # -------- Writer thread --------
+    def _path(self, day):
+        return os.path.join(self.directory, f"{self.prefix}-{day}.jsonl")
+
+    def _open(self, day):
+        self._day = day
+        self._file = open(self._path(day), "a", encoding="utf-8")
+
+    def _roll(self, day):
+        """Close the current file; keep it as the next numbered part (if rolled on size) and compress it."""
+        self._file.close()
+        path = self._path(self._day)
+        if day == self._day:
+            part = 1
+            while glob.glob(f"{path[:-len('.jsonl')]}.{part}.jsonl*"):
+                part += 1
+            rolled = f"{path[:-len('.jsonl')]}.{part}.jsonl"
+            os.replace(path, rolled)
+            path = rolled
+        if self.compress:
+            with open(path, "rb") as src, gzip.open(f"{path}.gz", "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(path)
+        self._open(day)
+
+    def _write(self, event):
+        day = datetime.fromtimestamp(event["ts"]).strftime("%Y%m%d")
+        if self._file is None:
+            self._open(day)
+        elif day != self._day or self._file.tell() >= self.max_bytes:
+            self._roll(day)
+        self._file.write(json.dumps(event, default=str) + "\n")
+
+    def _run(self):
+        while True:
+            event = self._queue.get()
+            try:
+                if event is self._STOP:
+                    return
+                self._write(event)
+                if self._queue.empty():
+                    self._file.flush()
+            except Exception as e:
+                # Never take the watcher down over its own diagnostics
+                print(f"event log write failed: {e}", file=sys.stderr)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.02)
+
+    def close(self, timeout=5):
+        if not self._thread.is_alive():
+            return
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self._file:
+            self._file.close()
+        if self.dropped:
+            logging.warning(f"Event log dropped {self.dropped} events (queue full)")
+
+
+class NullEventLog:
+    """Stand-in when the event log is disabled."""
+    run_id = None
+
+    def emit(self, kind, **fields):
+        return True
+
+    def flush(self, timeout=5):
+        pass
+
+    def close(self, timeout=5):
+        pass
+
+
+class EventLogHandler(logging.Handler):
+    """Forward log records into an ``EventLog`` as ``kind="log"`` events."""
+
+    def __init__(self, events, level=logging.INFO):
+        super().__init__(level)
+        self.events = events
+
+    def emit(self, record):
+        try:
+            self.events.emit("log", level=record.levelname, message=record.getMessage())
+        except Exception:
+            self.handleError(record)
+
+
+# -------- Logging Setup --------
+def setup_logging(log_dir="logs", events=None, level=logging.INFO):
+    """Text log rotated at midnight, written by a background listener; returns the listener to stop at exit."""
+    os.makedirs(log_dir, exist_ok=True)
+    file_handler = logging.handlers.TimedRotatingFileHandler(
+        os.path.join(log_dir, "visa_checker.log"), when="midnight", backupCount=30, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    handlers = [file_handler]
+    if events is not None:
+        handlers.append(EventLogHandler(events, level))
+    log_queue = queue.Queue(-1)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+# -------- Replay --------
+def _files(directory, prefix="events"):
+    def order(path):
+        name = os.path.basename(path).split(".")
+        # events-YYYYMMDD[.N].jsonl[.gz]: numbered parts were written before the live file of that day
+        part = int(name[1]) if name[1].isdigit() else float("inf")
+        return name[0], part
+    return sorted(glob.glob(os.path.join(directory, f"{prefix}-*.jsonl*")), key=order)
+
+
+def read_events(directory, run=None, kinds=None, prefix="events"):
+    """Yield events from every file in ``directory`` in write order, optionally filtered."""
+    for path in _files(directory, prefix):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue   # torn last line of a crashed run
+                if run and event.get("run") != run:
+                    continue
+                if kinds and event.get("kind") not in kinds:
+                    continue
+                yield event
+
+
+def list_runs(directory):
+    runs = {}
+    for event in read_events(directory):
+        first, last, count = runs.get(event["run"], (event["ts"], event["ts"], 0))
+        runs[event["run"]] = (first, event["ts"], count + 1)
+    return runs
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def summarize(events):
+    """Counts per kind, outcomes, and per-phase latency (n, p50, p95, max) for a list of events."""
+    kinds = Counter(e["kind"] for e in events)
+    outcomes = Counter(f"{e.get('outcome')}/{e.get('reason')}" for e in events if e["kind"] == "outcome")
+    phases = defaultdict(list)
+    for e in events:
+        if e["kind"] == "phase":
+            phases[e["phase"]].append(e["seconds"])
+    latency = {name: (len(v), _percentile(v, 0.5), _percentile(v, 0.95), max(v)) for name, v in phases.items()}
+    return {"kinds": kinds, "outcomes": outcomes, "phases": latency}
+
+
+def _describe(event):
+    return " ".join(f"{k}={v}" for k, v in event.items() if k not in ("ts", "run", "kind"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the structured event log of a watcher run.")
+    parser.add_argument("directory", help="event log directory (EVENT_LOG_DIR)")
+    parser.add_argument("--run", help="run id (default: the latest run)")
+    parser.add_argument("--kinds", help="comma separated kinds to show in the timeline, e.g. phase,outcome")
+    parser.add_argument("--list", action="store_true", help="list runs and exit")
+    parser.add_argument("--summary", action="store_true", help="print only the summary")
+    args = parser.parse_args(argv)
+
+    runs = list_runs(args.directory)
+    if args.list or not runs:
+        for run, (first, last, count) in sorted(runs.items(), key=lambda item: item[1][0]):
+            print(f"{run}  {datetime.fromtimestamp(first):%Y-%m-%d %H:%M:%S} .. "
+                  f"{datetime.fromtimestamp(last):%H:%M:%S}  {count} events")
+        if not runs:
+            print("No events recorded.")
+        return
+    run = args.run or max(runs, key=lambda r: runs[r][0])
+    events = list(read_events(args.directory, run=run))
+    if not events:
+        print(f"No events for run {run}.")
+        return
+
+    kinds = set(args.kinds.split(",")) if args.kinds else None
+    start = events[0]["ts"]
+    if not args.summary:
+        for event in events:
+            if kinds and event["kind"] not in kinds:
+                continue
+            print(f"{datetime.fromtimestamp(event['ts']):%H:%M:%S} +{event['ts'] - start:9.3f}s  "
+                  f"{event['kind']:<14} {_describe(event)}")
+
+    summary = summarize(events)
+    print(f"\nRun {run}: {len(events)} events over {events[-1]['ts'] - start:.0f}s")
+    print("Events:   " + ", ".join(f"{k}={n}" for k, n in summary["kinds"].most_common()))
+    if summary["outcomes"]:
+        print("Outcomes: " + ", ".join(f"{k}={n}" for k, n in summary["outcomes"].most_common()))
+    for name, (n, p50, p95, worst) in sorted(summary["phases"].items()):
+        print(f"  {name:<10} n={n:<5} p50={p50:.3f}s p95={p95:.3f}s max={worst:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
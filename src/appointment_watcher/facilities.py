@@ -0,0 +1,112 @@
+"""Facility (consulate) names and their dropdown values.
+
+The old location step fetched ``.text`` of every ``<option>`` over WebDriver
+to find one name. ``FacilityIndex`` maps names to option values instead.
+It is read once, either with a single script call on the page or from the
+page's HTML over HTTP, and then cached on disk per locale, so selecting a
+facility becomes one ``select_by_value``.
+
+``rank_facilities`` orders a multi-facility sweep: the facility with the
+earliest acceptable date is booked first, the next one is the fallback.
+"""
+import json
+import logging
+import os
+import re
+
+FACILITY_SELECT_ID = "appointments_consulate_appointment_facility_id"
+
+# Every real option of the facility dropdown in one round trip: [[value, name], ...]
+_OPTIONS_JS = """
+var select = document.getElementById(arguments[0]);
+if (!select) return null;
+var out = [];
+for (var i = 0; i < select.options.length; i++) {
+    if (select.options[i].value) out.push([select.options[i].value, select.options[i].text.trim()]);
+}
+return out;
+"""
+
+_SELECT_RE = re.compile(r'<select[^>]*id="%s"[^>]*>(.*?)</select>' % FACILITY_SELECT_ID, re.S)
+_OPTION_RE = re.compile(r'<option[^>]*value="([^"]+)"[^>]*>([^<]*)</option>')
+
+
+def read_options(driver):
+    return driver.execute_script(_OPTIONS_JS, FACILITY_SELECT_ID) or []
+
+
+def parse_options(html):
+    """``[[value, name], ...]`` from the appointment page's HTML."""
+    select = _SELECT_RE.search(html)
+    return [[value, name.strip()] for value, name in _OPTION_RE.findall(select.group(1))] if select else []
+
+
+class FacilityIndex:
+    def __init__(self, path=None, locale="en-ca"):
+        self.path = path
+        self.locale = locale
+        self.names = {}   # option value -> facility name
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.names = json.load(f).get(locale, {})
+            except FileNotFoundError:
+                pass
+            except (OSError, ValueError) as e:
+                logging.warning(f"Ignoring unreadable facility index {path}: {e}")
+
+    def __bool__(self):
+        return bool(self.names)
+
+    def update(self, options):
+        """Replace the index with ``[[value, name], ...]`` and write it to the cache file."""
+        if not options:
+            return
+        self.names = {str(value): name for value, name in options}
+        if not self.path:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        cached[self.locale] = self.names
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(cached, f, indent=1)
+
+    def value(self, name):
+        """Option value for a facility name (exact, then partial match) or id; None if unknown."""
+        key = str(name).strip()
+        if key in self.names:
+            return key
+        folded = key.casefold()
+        for value, known in self.names.items():
+            if known.casefold() == folded:
+                return value
+        for value, known in self.names.items():
+            if folded in known.casefold():
+                return value
+        return None
+
+    def name(self, value):
+        return self.names.get(str(value), str(value))
+
+    def resolve(self, names):
+        """``[(value, name), ...]`` for the given names or ids; unknown ones are logged and left out."""
+        resolved = []
+        for name in names:
+            value = self.value(name)
+            if value is None:
+                logging.warning(f"Unknown facility {name!r}; known: {', '.join(sorted(self.names.values()))}")
+            elif value not in (v for v, _ in resolved):
+                resolved.append((value, self.name(value)))
+        return resolved
+
+
+def rank_facilities(candidates):
+    """Order ``{facility: [dates]}`` by each facility's earliest date, dropping facilities without any."""
+    return sorted(((facility, dates) for facility, dates in candidates.items() if dates),
+                  key=lambda item: min(item[1]))
@@ -0,0 +1,227 @@
+"""Append-only store of observed slot availability.
+
+Every scan is offered to ``HistoryStore.record``; only months whose set of
+open days changed since the previous scan are written, so months of
+polling stay small. Rows are buffered and written in batches to SQLite
+(WAL mode). Query from the command line::
+
+    python -m appointment_watcher.history logs/availability.db earliest --facility 94
+    python -m appointment_watcher.history logs/availability.db hours --tz America/Los_Angeles
+    python -m appointment_watcher.history logs/availability.db log --limit 20
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import pytz
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS day_snapshots (
+    ts REAL NOT NULL,
+    facility TEXT NOT NULL,
+    month TEXT NOT NULL,          -- YYYY-MM
+    days TEXT NOT NULL,           -- comma separated open days, '' when none
+    opened TEXT NOT NULL,         -- days that were not open in the previous snapshot
+    closed TEXT NOT NULL          -- days that disappeared since the previous snapshot
+);
+CREATE INDEX IF NOT EXISTS ix_day_snapshots ON day_snapshots (facility, month, ts);
+CREATE TABLE IF NOT EXISTS time_snapshots (
+    ts REAL NOT NULL,
+    facility TEXT NOT NULL,
+    date TEXT NOT NULL,           -- YYYY-MM-DD
+    times TEXT NOT NULL           -- JSON list of HH:MM
+);
+CREATE INDEX IF NOT EXISTS ix_time_snapshots ON time_snapshots (facility, date, ts);
+"""
+
+
+def _join(days):
+    return ",".join(str(d) for d in sorted(days))
+
+
+def _split(value):
+    return [int(d) for d in value.split(",")] if value else []
+
+
+def months_from_dates(dates):
+    """``["2025-10-02", ...]`` -> ``{"2025-10": [2, ...]}``."""
+    months = {}
+    for date in dates:
+        months.setdefault(date[:7], []).append(int(date[8:10]))
+    return months
+
+
+def months_from_calendar(calendar_months):
+    """``CalendarMonth`` list -> ``{"YYYY-MM": [days]}`` (empty months included)."""
+    return {f"{m.year}-{m.month:02d}": list(m.days) for m in calendar_months}
+
+
+class HistoryStore:
+    def __init__(self, path, batch_size=50, flush_interval=60):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._day_rows = []
+        self._time_rows = []
+        self._last_flush = time.monotonic()
+        self._days = {}
+        self._times = {}
+        self._load_latest()
+
+    def _load_latest(self):
+        rows = self._conn.execute(
+            "SELECT facility, month, days FROM day_snapshots d WHERE ts = "
+            "(SELECT MAX(ts) FROM day_snapshots WHERE facility = d.facility AND month = d.month)")
+        for facility, month, days in rows:
+            self._days[(facility, month)] = set(_split(days))
+        rows = self._conn.execute(
+            "SELECT facility, date, times FROM time_snapshots t WHERE ts = "
+            "(SELECT MAX(ts) FROM time_snapshots WHERE facility = t.facility AND date = t.date)")
+        for facility, date, times in rows:
+            self._times[(facility, date)] = json.loads(times)
+
+    # -------- Writing --------
+    def record(self, facility, months, complete=False, ts=None):
+        """Record one scan of ``{"YYYY-MM": [open days]}`` for a facility.
+
+        With ``complete=True`` the scan covers every month, so previously
+        open months that are missing are recorded as closed.
+        Returns the number of months that changed.
+        """
+        facility = str(facility)
+        ts = ts or time.time()
+        months = {month: set(days) for month, days in months.items()}
+        if complete:
+            for (fac, month), days in self._days.items():
+                if fac == facility and days and month not in months:
+                    months[month] = set()
+        changed = 0
+        with self._lock:
+            for month, days in sorted(months.items()):
+                previous = self._days.get((facility, month))
+                if previous == days or (previous is None and not days):
+                    continue
+                previous = previous or set()
+                self._days[(facility, month)] = days
+                self._day_rows.append((ts, facility, month, _join(days), _join(days - previous), _join(previous - days)))
+                changed += 1
+        self._maybe_flush()
+        return changed
+
+    def record_times(self, facility, date, times, ts=None):
+        facility = str(facility)
+        times = sorted(times)
+        with self._lock:
+            if self._times.get((facility, date)) == times:
+                return False
+            self._times[(facility, date)] = times
+            self._time_rows.append((ts or time.time(), facility, date, json.dumps(times)))
+        self._maybe_flush()
+        return True
+
+    def _maybe_flush(self):
+        pending = len(self._day_rows) + len(self._time_rows)
+        if pending >= self.batch_size or (pending and time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            day_rows, self._day_rows = self._day_rows, []
+            time_rows, self._time_rows = self._time_rows, []
+            self._last_flush = time.monotonic()
+            if not (day_rows or time_rows):
+                return
+            with self._conn:
+                self._conn.executemany("INSERT INTO day_snapshots VALUES (?, ?, ?, ?, ?, ?)", day_rows)
+                self._conn.executemany("INSERT INTO time_snapshots VALUES (?, ?, ?, ?)", time_rows)
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+    # -------- Queries --------
+    def _where(self, facility):
+        return ("WHERE facility = ?", (str(facility),)) if facility is not None else ("", ())
+
+    def earliest_ever(self, facility=None):
+        """Return ``(date, first_seen_ts, facility)`` for the earliest open day ever observed, or None."""
+        self.flush()
+        where, args = self._where(facility)
+        best = None
+        for ts, fac, month, days in self._conn.execute(
+                f"SELECT ts, facility, month, days FROM day_snapshots {where} ORDER BY month, ts", args):
+            for day in _split(days):
+                date = f"{month}-{day:02d}"
+                if best is None or date < best[0]:
+                    best = (date, ts, fac)
+        return best
+
+    def release_hours(self, facility=None, tz="America/Los_Angeles"):
+        """Counter of local hour -> number of snapshots in which new days opened."""
+        self.flush()
+        zone = pytz.timezone(tz)
+        where, args = self._where(facility)
+        where = f"{where} AND opened != ''" if where else "WHERE opened != ''"
+        hours = Counter()
+        for (ts,) in self._conn.execute(f"SELECT ts FROM day_snapshots {where}", args):
+            hours[datetime.fromtimestamp(ts, zone).hour] += 1
+        return hours
+
+    def changes(self, facility=None, limit=50):
+        """Most recent changes, newest first, as dicts."""
+        self.flush()
+        where, args = self._where(facility)
+        rows = self._conn.execute(
+            f"SELECT ts, facility, month, days, opened, closed FROM day_snapshots {where} ORDER BY ts DESC LIMIT ?",
+            args + (limit,))
+        return [{"ts": ts, "facility": fac, "month": month, "days": _split(days),
+                 "opened": _split(opened), "closed": _split(closed)}
+                for ts, fac, month, days, opened, closed in rows]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the slot availability history.")
+    parser.add_argument("db")
+    parser.add_argument("command", choices=["earliest", "hours", "log"])
+    parser.add_argument("--facility")
+    parser.add_argument("--tz", default="America/Los_Angeles")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    store = HistoryStore(args.db)
+    try:
+        if args.command == "earliest":
+            found = store.earliest_ever(args.facility)
+            if not found:
+                print("No availability recorded.")
+            else:
+                date, ts, facility = found
+                print(f"{date} (facility {facility}, first seen {datetime.fromtimestamp(ts):%Y-%m-%d %H:%M:%S})")
+        elif args.command == "hours":
+            hours = store.release_hours(args.facility, args.tz)
+            peak = max(hours.values(), default=0)
+            for hour in range(24):
+                bar = "#" * round(40 * hours[hour] / peak) if peak else ""
+                print(f"{hour:02d}:00 {hours[hour]:5d} {bar}")
+        else:
+            for change in store.changes(args.facility, args.limit):
+                print(f"{datetime.fromtimestamp(change['ts']):%Y-%m-%d %H:%M:%S} facility {change['facility']} "
+                      f"{change['month']}: open {change['days']} (+{change['opened']} -{change['closed']})")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Per-phase timeouts and a total latency budget for one check.
+
+Each phase (``page``, ``location``, ``calendar``, ``times``, ``confirm``,
+``login``) gets a timeout for its readiness wait; the timeout handed out is
+capped by whatever is left of the check's total budget, and any phase that
+runs past its share is logged with the full breakdown.
+"""
+import logging
+import time
+from contextlib import contextmanager
+
+DEFAULT_TIMEOUTS = {"login": 15, "page": 10, "location": 5, "calendar": 5, "times": 8, "confirm": 5}
+
+
+def parse_timeouts(spec):
+    """Parse ``"page=10,times=6"`` into a dict on top of ``DEFAULT_TIMEOUTS``."""
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    for item in filter(None, (spec or "").split(",")):
+        name, value = item.split("=")
+        timeouts[name.strip()] = float(value)
+    return timeouts
+
+
+class LatencyBudget:
+    def __init__(self, timeouts=None, total=30.0, observer=None):
+        self.timeouts = timeouts or dict(DEFAULT_TIMEOUTS)
+        self.total = total
+        self.observer = observer   # called as observer(phase, seconds) after every phase
+        self.start()
+
+    def start(self):
+        """Begin a new check: resets the total budget and recorded timings."""
+        self.started = time.monotonic()
+        self.timings = {}
+        self._overrun_reported = False
+
+    def remaining(self):
+        return self.total - (time.monotonic() - self.started)
+
+    def timeout(self, phase):
+        return max(0.1, min(self.timeouts.get(phase, self.total), self.remaining()))
+
+    @contextmanager
+    def phase(self, name):
+        """Time a phase; yields the timeout its readiness wait should use."""
+        limit = self.timeouts.get(name, self.total)
+        t0 = time.monotonic()
+        try:
+            yield self.timeout(name)
+        finally:
+            elapsed = time.monotonic() - t0
+            self.timings[name] = elapsed
+            if self.observer:
+                self.observer(name, elapsed)
+            if elapsed > limit:
+                logging.warning(f"⏱️ Phase '{name}' overran its budget: {elapsed:.2f}s > {limit:.2f}s ({self.report()})")
+            elif self.remaining() < 0 and not self._overrun_reported:
+                self._overrun_reported = True
+                logging.warning(f"⏱️ Check overran total budget of {self.total:.1f}s at phase '{name}' ({self.report()})")
+
+    def report(self):
+        return ", ".join(f"{name}={elapsed:.2f}s" for name, elapsed in self.timings.items())
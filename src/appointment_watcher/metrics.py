@@ -0,0 +1,129 @@
+"""In-process counters, gauges and latency histograms.
+
+Exported either as Prometheus text format (written atomically, suitable for
+node_exporter's textfile collector) or appended as one JSON line per
+snapshot for offline analysis.
+"""
+import json
+import os
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+COUNTER = "counter"
+GAUGE = "gauge"
+HISTOGRAM = "histogram"
+
+
+def _key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _fmt_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._types = {}
+        self._help = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        self._types[name] = kind
+        self._help[name] = help_text
+
+    def inc(self, name, labels=None, value=1):
+        with self._lock:
+            self._types.setdefault(name, COUNTER)
+            series = self._values.setdefault(name, {})
+            series[_key(labels)] = series.get(_key(labels), 0) + value
+
+    def set(self, name, value, labels=None):
+        with self._lock:
+            self._types.setdefault(name, GAUGE)
+            self._values.setdefault(name, {})[_key(labels)] = value
+
+    def observe(self, name, value, labels=None):
+        with self._lock:
+            self._types.setdefault(name, HISTOGRAM)
+            series = self._values.setdefault(name, {})
+            hist = series.get(_key(labels))
+            if hist is None:
+                hist = series[_key(labels)] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    hist["buckets"][i] += 1
+            hist["sum"] += value
+            hist["count"] += 1
+
+    def get(self, name, labels=None):
+        return self._values.get(name, {}).get(_key(labels))
+
+    # -------- Export --------
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._values):
+                kind = self._types[name]
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self._values[name].items()):
+                    if kind != HISTOGRAM:
+                        lines.append(f"{name}{_fmt_labels(labels)} {value}")
+                        continue
+                    for bound, count in zip(self.buckets, value["buckets"]):
+                        lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', bound)])} {count}")
+                    lines.append(f"{name}_bucket{_fmt_labels(labels, [('le', '+Inf')])} {value['count']}")
+                    lines.append(f"{name}_sum{_fmt_labels(labels)} {value['sum']:.6f}")
+                    lines.append(f"{name}_count{_fmt_labels(labels)} {value['count']}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "ts": time.time(),
+                "metrics": {
+                    name: [{"labels": dict(labels), "value": dict(value, buckets=list(value["buckets"]))
+                            if isinstance(value, dict) else value}
+                           for labels, value in series.items()]
+                    for name, series in self._values.items()
+                },
+            }
+
+    def write_prometheus(self, path):
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp, path)
+
+    def append_jsonl(self, path):
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.snapshot()) + "\n")
+
+
+def process_rss_bytes(pid):
+    """RSS of ``pid`` and all its children (chromedriver -> chrome), or None without psutil."""
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        proc = psutil.Process(pid)
+        procs = [proc] + proc.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for p in procs:
+        try:
+            total += p.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
@@ -0,0 +1,488 @@
+"""Local stand-in for the AIS appointment site.
+
+Serves enough of ais.usvisa-info.com to drive the watcher end to end
+without network access:
+
+* the sign-in form (``user_email``, ``user_password``, ``div.icheckbox``,
+  ``commit``) which sets a ``_yatri_session`` cookie,
+* the appointment page with the facility dropdown, a datepicker rendering
+  jQuery UI's markup, the time select and the "Reschedule" button,
+* the ``days/<facility>.json`` and ``times/<facility>.json`` endpoints,
+* a Telegram ``/bot<token>/sendMessage`` endpoint that just records messages.
+
+A scenario file scripts slot releases, "System Busy" windows and session
+expiries in seconds from server start; dates may be ISO strings or ``+N``
+days from today. A release with a ``ttl`` is taken by someone else that
+many seconds after it opened, unless it was booked first::
+
+    {"slots": {"94": {"+40": ["09:00"]}},
+     "releases": [{"at": 30, "facility": "94", "date": "+12", "times": ["08:15", "08:30"], "ttl": 600}],
+     "busy": [{"start": 60, "end": 120}],
+     "expire_sessions_at": [300]}
+
+    python -m appointment_watcher.mock_ais --port 8765 --scenario scenario.json
+"""
+import argparse
+import html
+import json
+import re
+import secrets
+import threading
+import time
+from datetime import date as dt_date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SESSION_COOKIE = "_yatri_session"
+CSRF_TOKEN = "mock-csrf-token"
+
+FACILITIES = {"89": "Calgary", "90": "Halifax", "91": "Montreal", "92": "Ottawa",
+              "93": "Quebec City", "94": "Toronto", "95": "Vancouver"}
+
+_SIGN_IN_RE = re.compile(r"^/(?P<locale>[\w-]+)/niv/users/sign_in$")
+_APPOINTMENT_RE = re.compile(r"^/(?P<locale>[\w-]+)/niv/schedule/(?P<schedule>\d+)/appointment$")
+_DAYS_RE = re.compile(r"^/[\w-]+/niv/schedule/(?P<schedule>\d+)/appointment/days/(?P<facility>\d+)\.json$")
+_TIMES_RE = re.compile(r"^/[\w-]+/niv/schedule/(?P<schedule>\d+)/appointment/times/(?P<facility>\d+)\.json$")
+_TELEGRAM_RE = re.compile(r"^/bot[^/]+/sendMessage$")
+
+BUSY_PAGE = b"<html><body><h1>System is busy. Please try again later.</h1></body></html>"
+
+
+def resolve_date(value, today=None):
+    """``"+12"`` -> the ISO date 12 days from today; ISO strings pass through."""
+    if isinstance(value, str) and value.startswith("+"):
+        return ((today or dt_date.today()) + timedelta(days=int(value[1:]))).isoformat()
+    return value
+
+
+class MockAIS:
+    """In-memory AIS stand-in running on a background thread.
+
+    ``slots`` maps facility id (str) -> {"YYYY-MM-DD": ["HH:MM", ...]}.
+    Everything the watcher does is appended to ``events`` as
+    ``(seconds_since_start, kind, detail)``.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, slots=None, scenario=None,
+                 email=None, password=None, clock=time.monotonic):
+        scenario = scenario or {}
+        self.clock = clock
+        self.started = clock()
+        self.email = email
+        self.password = password
+        self.facilities = scenario.get("facilities", FACILITIES)
+        self.slots = slots if slots is not None else {}
+        for facility_id, days in scenario.get("slots", {}).items():
+            for day, times in days.items():
+                self.slots.setdefault(str(facility_id), {})[resolve_date(day)] = list(times)
+        self.releases = sorted(({**r, "date": resolve_date(r["date"])} for r in scenario.get("releases", [])),
+                               key=lambda r: r["at"])
+        self.busy_windows = [(w["start"], w["end"]) for w in scenario.get("busy", [])]
+        self.expiries = sorted(scenario.get("expire_sessions_at", []))
+        self.takeovers = []   # (at, facility, date) of released slots that competitors will take
+        self.busy = False
+        self.sessions = set()
+        self.session_value = None
+        self.requests_served = 0
+        self.events = []
+        self.bookings = []
+        self.telegram_messages = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls(scenario=json.load(f), **kwargs)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def appointment_url(self, schedule_id="1", locale="en-ca"):
+        return f"{self.base_url}/{locale}/niv/schedule/{schedule_id}/appointment"
+
+    def now(self):
+        return self.clock() - self.started
+
+    # -------- Scenario control --------
+    def new_session(self):
+        """Create a logged-in session and return its cookie value."""
+        value = secrets.token_hex(8)
+        with self._lock:
+            self.sessions.add(value)
+        return value
+
+    def set_slots(self, facility_id, days):
+        with self._lock:
+            self.slots[str(facility_id)] = days
+            self._event("release", {"facility": str(facility_id), "dates": sorted(days)})
+
+    def expire_session(self):
+        with self._lock:
+            self.sessions.clear()
+            self._event("expire", None)
+
+    def _event(self, kind, detail, at=None):
+        self.events.append((round(self.now() if at is None else at, 3), kind, detail))
+
+    def _tick(self):
+        """Apply scheduled releases/expiries that are due. Caller holds the lock."""
+        now = self.now()
+        while self.releases and self.releases[0]["at"] <= now:
+            r = self.releases.pop(0)
+            self.slots.setdefault(str(r["facility"]), {})[r["date"]] = list(r["times"])
+            # Stamp with the scheduled time so latencies count from the real release
+            self._event("release", {"facility": str(r["facility"]), "dates": [r["date"]]}, at=r["at"])
+            if r.get("ttl") is not None:
+                self.takeovers.append((r["at"] + r["ttl"], str(r["facility"]), r["date"]))
+                self.takeovers.sort()
+        while self.takeovers and self.takeovers[0][0] <= now:
+            at, facility_id, day = self.takeovers.pop(0)
+            if self.slots.get(facility_id, {}).pop(day, None):
+                self._event("taken", {"facility": facility_id, "date": day}, at=at)
+        while self.expiries and self.expiries[0] <= now:
+            self.expiries.pop(0)
+            self.sessions.clear()
+            self._event("expire", None)
+        return self.busy or any(start <= now < end for start, end in self.busy_windows)
+
+    # -------- Server lifecycle --------
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------- Pages --------
+    def _sign_in_page(self, locale, error=""):
+        return f"""<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{CSRF_TOKEN}"><title>Sign In</title></head><body>
+<p class="error">{html.escape(error)}</p>
+<form id="sign_in_form" method="post" action="/{locale}/niv/users/sign_in">
+<input type="email" id="user_email" name="user[email]">
+<input type="password" id="user_password" name="user[password]">
+<div class="icheckbox"><input type="checkbox" id="policy_confirmed" name="policy_confirmed" value="1" style="position:absolute;opacity:0"></div>
+<input type="submit" name="commit" value="Sign In">
+</form>
+<script>
+document.querySelector('div.icheckbox').addEventListener('click', function () {{
+  var box = document.getElementById('policy_confirmed');
+  box.checked = !box.checked;
+  this.classList.toggle('checked', box.checked);
+}});
+</script>
+</body></html>"""
+
+    def _appointment_page(self, path):
+        options = "".join(f'<option value="{fid}">{html.escape(name)}</option>'
+                          for fid, name in sorted(self.facilities.items(), key=lambda kv: kv[1]))
+        return _APPOINTMENT_TEMPLATE.replace("{csrf}", CSRF_TOKEN).replace("{action}", path) \
+            .replace("{options}", options)
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, body=b"", content_type="application/json", headers=None):
+                if isinstance(body, str):
+                    body = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _redirect(self, location, headers=None):
+                self._send(302, headers={"Location": location, **(headers or {})}, content_type="text/html")
+
+            def _session(self):
+                for part in self.headers.get("Cookie", "").split(";"):
+                    name, _, value = part.strip().partition("=")
+                    if name == SESSION_COOKIE and (value in mock.sessions or value == mock.session_value):
+                        return value
+                return None
+
+            def _form(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                return {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()}
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                with mock._lock:
+                    mock.requests_served += 1
+                    busy = mock._tick()
+
+                if _TELEGRAM_RE.match(url.path):
+                    return self._send(200, b'{"ok": true}')
+                sign_in = _SIGN_IN_RE.match(url.path)
+                if sign_in:
+                    return self._send(200, mock._sign_in_page(sign_in.group("locale")), "text/html")
+                if url.path.endswith("/niv/groups/1"):
+                    return self._send(200, "<html><body><h1>Groups</h1></body></html>", "text/html")
+
+                appointment = _APPOINTMENT_RE.match(url.path)
+                days = _DAYS_RE.match(url.path)
+                times = _TIMES_RE.match(url.path)
+                if not (appointment or days or times):
+                    return self._send(404, b"{}")
+                if not self._session():
+                    return self._redirect("/en-ca/niv/users/sign_in")
+                if appointment:
+                    return self._send(200, mock._appointment_page(url.path), "text/html")
+                if busy:
+                    with mock._lock:
+                        mock._event("busy", url.path)
+                    return self._send(200, BUSY_PAGE, "text/html")
+
+                facility_id = (days or times).group("facility")
+                with mock._lock:
+                    facility_slots = {d: list(t) for d, t in mock.slots.get(facility_id, {}).items() if t}
+                    if days:
+                        mock._event("days", {"facility": facility_id})
+                    else:
+                        mock._event("times", {"facility": facility_id, "date": query.get("date", [""])[0]})
+                if days:
+                    body = [{"date": d, "business_day": True} for d in sorted(facility_slots)]
+                else:
+                    available = facility_slots.get(query.get("date", [""])[0], [])
+                    body = {"available_times": available, "business_times": available}
+                return self._send(200, json.dumps(body))
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                with mock._lock:
+                    mock.requests_served += 1
+                    mock._tick()
+                form = self._form()
+
+                if _TELEGRAM_RE.match(url.path):
+                    with mock._lock:
+                        mock.telegram_messages.append(form.get("text", ""))
+                        mock._event("telegram", form.get("text", ""))
+                    return self._send(200, b'{"ok": true}')
+
+                sign_in = _SIGN_IN_RE.match(url.path)
+                if sign_in:
+                    locale = sign_in.group("locale")
+                    if form.get("policy_confirmed") != "1":
+                        return self._send(200, mock._sign_in_page(locale, "You must accept the privacy policy."), "text/html")
+                    if (mock.email and form.get("user[email]") != mock.email) or \
+                            (mock.password and form.get("user[password]") != mock.password):
+                        return self._send(200, mock._sign_in_page(locale, "Invalid email or password."), "text/html")
+                    value = mock.new_session()
+                    with mock._lock:
+                        mock._event("login", None)
+                    return self._redirect(f"/{locale}/niv/groups/1",
+                                          {"Set-Cookie": f"{SESSION_COOKIE}={value}; Path=/; HttpOnly"})
+
+                appointment = _APPOINTMENT_RE.match(url.path)
+                if not appointment:
+                    return self._send(404, b"{}")
+                if not self._session():
+                    return self._redirect("/en-ca/niv/users/sign_in")
+                facility_id = form.get("appointments[consulate_appointment][facility_id]", "")
+                day = form.get("appointments[consulate_appointment][date]", "")
+                slot = form.get("appointments[consulate_appointment][time]", "")
+                with mock._lock:
+                    times = mock.slots.get(facility_id, {}).get(day, [])
+                    if slot not in times:
+                        mock._event("booking_failed", {"facility": facility_id, "date": day, "time": slot})
+                        return self._send(200, "<html><body><p class=\"error\">The selected time is no longer available.</p></body></html>", "text/html")
+                    times.remove(slot)
+                    booking = {"facility": facility_id, "date": day, "time": slot}
+                    mock.bookings.append(booking)
+                    mock._event("booked", booking)
+                return self._send(200, "<html><body><h1>You have successfully scheduled your visa appointment</h1></body></html>", "text/html")
+
+        return Handler
+
+
+_APPOINTMENT_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{csrf}"><title>Schedule Appointments</title>
+<style>
+#ui-datepicker-div { display: none; position: absolute; background: #fff; border: 1px solid #999; }
+.ui-datepicker-group { display: inline-block; vertical-align: top; margin: 4px; }
+</style></head><body>
+<form id="appointment-form" method="post" action="{action}">
+<input type="hidden" name="authenticity_token" value="{csrf}">
+<select id="appointments_consulate_appointment_facility_id" name="appointments[consulate_appointment][facility_id]">
+<option value=""></option>{options}</select>
+<input type="text" id="appointments_consulate_appointment_date" name="appointments[consulate_appointment][date]" readonly disabled>
+<select id="appointments_consulate_appointment_time" name="appointments[consulate_appointment][time]" disabled><option value=""></option></select>
+<input type="submit" name="commit" value="Reschedule" id="appointments_submit" disabled>
+</form>
+<p id="consulate_date_time_not_available" style="display:none">System is busy. Please try again later.</p>
+<div id="ui-datepicker-div"></div>
+<script>
+(function () {
+  var base = location.pathname;
+  var MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+                'August', 'September', 'October', 'November', 'December'];
+  var facility = document.getElementById('appointments_consulate_appointment_facility_id');
+  var dateInput = document.getElementById('appointments_consulate_appointment_date');
+  var timeSelect = document.getElementById('appointments_consulate_appointment_time');
+  var submit = document.getElementById('appointments_submit');
+  var busyNote = document.getElementById('consulate_date_time_not_available');
+  var picker = document.getElementById('ui-datepicker-div');
+  var available = {}, busy = false, shown = null;
+
+  function pad(n) { return (n < 10 ? '0' : '') + n; }
+
+  function getJSON(url, ok, fail) {
+    var xhr = new XMLHttpRequest();
+    xhr.open('GET', url);
+    xhr.setRequestHeader('Accept', 'application/json');
+    xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+    xhr.onload = function () {
+      var data;
+      try { data = JSON.parse(xhr.responseText); } catch (e) { return fail(); }
+      ok(data);
+    };
+    xhr.onerror = fail;
+    xhr.send();
+  }
+
+  function render() {
+    var out = '';
+    for (var k = 0; k < 2; k++) {
+      var first = new Date(shown.getFullYear(), shown.getMonth() + k, 1);
+      var y = first.getFullYear(), m = first.getMonth(), lead = first.getDay();
+      var last = new Date(y, m + 1, 0).getDate();
+      out += '<div class="ui-datepicker-group"><div class="ui-datepicker-header">';
+      if (k === 0) out += '<a class="ui-datepicker-prev" data-handler="prev">Prev</a>';
+      if (k === 1) out += '<a class="ui-datepicker-next" data-handler="next">Next</a>';
+      out += '<div class="ui-datepicker-title"><span class="ui-datepicker-month">' + MONTHS[m] +
+             '</span>&nbsp;<span class="ui-datepicker-year">' + y + '</span></div></div>';
+      out += '<table class="ui-datepicker-calendar"><tbody><tr>';
+      for (var i = 0; i < lead; i++) out += '<td class="ui-datepicker-other-month">&#xa0;</td>';
+      for (var d = 1; d <= last; d++) {
+        if (d > 1 && (lead + d - 1) % 7 === 0) out += '</tr><tr>';
+        if (available[y + '-' + pad(m + 1) + '-' + pad(d)]) {
+          out += '<td data-handler="selectDay" data-event="click" data-month="' + m + '" data-year="' + y +
+                 '"><a class="ui-state-default" href="#">' + d + '</a></td>';
+        } else {
+          out += '<td class="ui-datepicker-unselectable ui-state-disabled"><span class="ui-state-default">' + d + '</span></td>';
+        }
+      }
+      out += '</tr></tbody></table></div>';
+    }
+    picker.innerHTML = out;
+  }
+
+  function loadTimes(key) {
+    timeSelect.disabled = true;
+    submit.disabled = true;
+    timeSelect.innerHTML = '<option value=""></option>';
+    getJSON(base + '/times/' + facility.value + '.json?date=' + key + '&appointments[expedite]=false', function (data) {
+      (data.available_times || []).forEach(function (t) {
+        var option = document.createElement('option');
+        option.value = option.textContent = t;
+        timeSelect.appendChild(option);
+      });
+      timeSelect.disabled = false;
+      submit.disabled = false;
+    }, function () { busyNote.style.display = 'block'; });
+  }
+
+  facility.addEventListener('change', function () {
+    dateInput.disabled = true;
+    dateInput.value = '';
+    picker.style.display = 'none';
+    available = {};
+    getJSON(base + '/days/' + facility.value + '.json?appointments[expedite]=false', function (days) {
+      days.forEach(function (d) { available[d.date] = true; });
+      busy = false;
+      busyNote.style.display = 'none';
+      dateInput.disabled = false;
+    }, function () {
+      busy = true;
+      dateInput.disabled = false;
+    });
+  });
+
+  dateInput.addEventListener('click', function () {
+    if (busy) { busyNote.style.display = 'block'; return; }
+    var today = new Date();
+    shown = shown || new Date(today.getFullYear(), today.getMonth(), 1);
+    render();
+    picker.style.display = 'block';
+  });
+
+  picker.addEventListener('click', function (e) {
+    e.preventDefault();
+    var t = e.target;
+    if (t.closest('.ui-datepicker-next')) {
+      shown = new Date(shown.getFullYear(), shown.getMonth() + 1, 1);
+      return render();
+    }
+    if (t.closest('.ui-datepicker-prev')) {
+      shown = new Date(shown.getFullYear(), shown.getMonth() - 1, 1);
+      return render();
+    }
+    var td = t.closest('td[data-handler="selectDay"]');
+    if (!td) return;
+    var key = td.getAttribute('data-year') + '-' + pad(parseInt(td.getAttribute('data-month'), 10) + 1) +
+              '-' + pad(parseInt(td.textContent, 10));
+    dateInput.value = key;
+    picker.style.display = 'none';
+    loadTimes(key);
+  });
+})();
+</script>
+</body></html>"""
+
+
+def _parse_slot(spec):
+    facility_id, date, hhmm = spec.split(":", 2)
+    return facility_id, resolve_date(date), hhmm
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local AIS stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--scenario", help="JSON scenario file")
+    parser.add_argument("--slot", action="append", default=[],
+                        help="FACILITY:YYYY-MM-DD:HH:MM (or FACILITY:+DAYS:HH:MM), may be repeated")
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    args = parser.parse_args(argv)
+
+    scenario = {}
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as f:
+            scenario = json.load(f)
+    mock = MockAIS(args.host, args.port, scenario=scenario, email=args.email, password=args.password)
+    for spec in args.slot:
+        facility_id, date, hhmm = _parse_slot(spec)
+        mock.slots.setdefault(facility_id, {}).setdefault(date, []).append(hhmm)
+    print(f"Mock AIS listening on {mock.base_url}")
+    try:
+        mock._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock._server.server_close()
+        print(json.dumps({"requests": mock.requests_served, "bookings": mock.bookings}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
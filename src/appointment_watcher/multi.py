@@ -0,0 +1,242 @@
+"""Watch several schedules concurrently from one process.
+
+Each schedule polls its own AIS JSON endpoints over its own cookie
+session. Browsers are only started to log in and to book, under a shared
+``max_browsers`` limit, and are quit straight afterwards; JSON requests go
+through a shared ``max_http`` limit. Idle schedules are just sleeping
+coroutines, so memory and CPU follow the number of in-flight checks
+rather than the number of schedules::
+
+    python -m appointment_watcher.multi schedules.json --max-browsers 1 --max-http 4
+
+``schedules.json`` is a list of objects with ``name``, ``email``,
+``password``, ``schedule_id`` and optionally ``facility_id``,
+``facility_name``, ``country_code``, ``ais_base_url`` (default
+``AIS_BASE_URL``, so ``mock_ais`` works), ``retry_delay``, ``valid_months``,
+``valid_years``, ``date_windows`` (``"YYYY-MM-DD..YYYY-MM-DD,..."``, which
+overrides the month/year lists), ``exclude_dates``, ``min_lead_days``,
+``max_lead_days`` and ``current_appointment``.
+
+A schedule whose loop fails (a chromedriver crash, a WebDriver error) is
+restarted after a back-off; the other schedules keep running.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import requests
+from dotenv import load_dotenv
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+from appointment_watcher.notify import TELEGRAM_API_URL, BackgroundNotifier
+from appointment_watcher.policy import DatePolicy, parse_dates, parse_windows, windows_from_months
+
+DEFAULT_MONTHS = ["September", "October", "November", "December", "January", "February"]
+DEFAULT_YEARS = [2025, 2026]
+DEFAULT_BASE_URL = "https://ais.usvisa-info.com"
+
+
+@dataclass
+class ScheduleConfig:
+    name: str
+    email: str
+    password: str
+    schedule_id: str
+    facility_id: str = "94"
+    facility_name: str = "Toronto"
+    country_code: str = "en-ca"
+    ais_base_url: str = DEFAULT_BASE_URL
+    retry_delay: float = 60
+    valid_months: list = field(default_factory=lambda: list(DEFAULT_MONTHS))
+    valid_years: list = field(default_factory=lambda: list(DEFAULT_YEARS))
+    date_windows: str = None
+    exclude_dates: str = None
+    min_lead_days: int = 0
+    max_lead_days: int = None
+    current_appointment: str = None
+
+    def __post_init__(self):
+        windows = parse_windows(self.date_windows) or windows_from_months(self.valid_months, self.valid_years)
+        self.policy = DatePolicy(windows, parse_dates(self.exclude_dates), self.min_lead_days,
+                                 self.max_lead_days, self.current_appointment)
+
+    @property
+    def login_url(self):
+        return f"{self.ais_base_url}/{self.country_code}/niv/users/sign_in"
+
+    @property
+    def appointment_url(self):
+        return f"{self.ais_base_url}/{self.country_code}/niv/schedule/{self.schedule_id}/appointment"
+
+    def accepts(self, date):
+        return self.policy.accepts(datetime.strptime(date, "%Y-%m-%d"))
+
+    def is_wanted_month(self, month):
+        return self.policy.accepts_month(month.year, month.month)
+
+    def is_wanted_date(self, day):
+        return self.policy.accepts(day)
+
+
+def load_schedules(path, ais_base_url=None):
+    """Read the schedule list; ``ais_base_url`` applies to entries that do not set their own."""
+    with open(path, encoding="utf-8") as f:
+        return [ScheduleConfig(**{"ais_base_url": ais_base_url or DEFAULT_BASE_URL, **entry}) for entry in json.load(f)]
+
+
+class MultiScheduleWatcher:
+    def __init__(self, schedules, notify, driver_factory, max_browsers=1, max_http=4):
+        self.schedules = schedules
+        self.notify = notify
+        self.driver_factory = driver_factory
+        self.max_browsers = max_browsers
+        self.max_http = max_http
+        self.results = {}
+
+    async def run(self):
+        """Watch every schedule until each one has booked; returns ``{name: datetime}``."""
+        self._browsers = asyncio.Semaphore(self.max_browsers)
+        self._http = asyncio.Semaphore(self.max_http)
+        await asyncio.gather(*(self._supervise(s) for s in self.schedules))
+        return self.results
+
+    # -------- Shared resources --------
+    async def _alert(self, schedule, message, key=None):
+        await asyncio.to_thread(self.notify, f"[{schedule.name}] {message}", key)
+
+    async def _with_browser(self, fn, *args):
+        async with self._browsers:
+            return await asyncio.to_thread(self._run_browser, fn, *args)
+
+    def _run_browser(self, fn, *args):
+        driver = self.driver_factory()
+        try:
+            return fn(driver, *args)
+        finally:
+            driver.quit()
+
+    # -------- Browser steps (run in worker threads) --------
+    # Selenium is imported on first use; a driver already exists by then
+    def _login(self, driver, schedule):
+        from appointment_watcher import browser
+        notify = lambda message: self.notify(f"[{schedule.name}] {message}")
+        browser.login(driver, schedule.email, schedule.password, schedule.login_url, notify)
+        driver.get(schedule.appointment_url)
+        return AISClient.from_driver(driver, schedule.appointment_url)
+
+    def _book(self, driver, schedule, client):
+        from appointment_watcher import browser
+        notify = lambda message: self.notify(f"[{schedule.name}] {message}")
+        browser.restore_cookies(driver, client.session.cookies.get_dict(), schedule.appointment_url)
+        if "sign_in" in driver.current_url:
+            browser.login(driver, schedule.email, schedule.password, schedule.login_url, notify)
+            driver.get(schedule.appointment_url)
+        browser.select_location(driver, schedule.facility_name)
+        browser.open_calendar(driver)
+        scan = schedule.policy.scan_range()
+        if scan is None:
+            return None
+        start, months, skip = scan
+        return browser.book_earliest(driver, schedule.is_wanted_month, notify, months=months, skip=skip, start=start,
+                                     is_wanted_date=schedule.is_wanted_date)
+
+    # -------- Per-schedule loop --------
+    async def _supervise(self, schedule):
+        """Run one schedule's loop, restarting it with a back-off when it fails, so one schedule cannot stop the others."""
+        failures = 0
+        while True:
+            try:
+                return await self._watch(schedule)
+            except Exception as e:
+                failures += 1
+                delay = min(600, 30 * 2 ** (failures - 1))
+                logging.error(f"[{schedule.name}] Watch loop failed ({e.__class__.__name__}: {e}); restarting in {delay}s")
+                await self._alert(schedule, f"⚠️ Watcher failed: {e.__class__.__name__}. Restarting in {delay}s.")
+                await asyncio.sleep(delay)
+
+    async def _watch(self, schedule):
+        attempt = 1
+        client = None
+        expiries = 0   # consecutive session expiries; a login that keeps failing is retried with a back-off
+
+        while True:
+            if client is None:
+                client = await self._with_browser(self._login, schedule)
+
+            logging.info(f"[{schedule.name}] Attempt {attempt}: Polling available days...")
+            try:
+                async with self._http:
+                    days = await asyncio.to_thread(client.get_available_days, schedule.facility_id)
+                expiries = 0
+            except SessionExpired as e:
+                logging.warning(f"[{schedule.name}] Session expired: {e}")
+                client.close()
+                client = None
+                expiries += 1
+                if expiries > 1:
+                    await asyncio.sleep(min(600, schedule.retry_delay * 2 ** (expiries - 2)))
+                continue
+            except (SystemBusy, requests.RequestException) as e:
+                logging.error(f"[{schedule.name}] Poll failed / System Busy: {e}")
+                attempt += 1
+                await asyncio.sleep(schedule.retry_delay)
+                continue
+
+            wanted = [d for d in days if schedule.accepts(d)]
+            if wanted:
+                logging.info(f"[{schedule.name}] Found {len(wanted)} date(s), earliest {wanted[0]}. Booking...")
+                earliest_date = await self._with_browser(self._book, schedule, client)
+                if earliest_date:
+                    msg = f"✅ Visa slot confirmed for {earliest_date.strftime('%B %d, %Y')} at {earliest_date.strftime('%H:%M')}"
+                    logging.info(f"[{schedule.name}] {msg}")
+                    await self._alert(schedule, msg)
+                    self.results[schedule.name] = earliest_date
+                    client.close()
+                    return earliest_date
+            elif attempt % 30 == 0:
+                await self._alert(schedule, f"🔄 Attempt #{attempt}: No Earliest dates Avail. Still checking for visa slots...",
+                                  key=f"heartbeat:{schedule.name}")
+
+            attempt += 1
+            await asyncio.sleep(schedule.retry_delay)
+
+
+def _create_driver(driver_path, lean):
+    from appointment_watcher import browser
+    return browser.create_driver(driver_path, lean=lean)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch several visa schedules concurrently.")
+    parser.add_argument("config", help="JSON list of schedule configs")
+    parser.add_argument("--max-browsers", type=int, default=1)
+    parser.add_argument("--max-http", type=int, default=4)
+    parser.add_argument("--lean", action="store_true", help="headless browsers with images, fonts and analytics blocked")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    driver_path = os.getenv("CHROME_DRIVER_PATH")
+    notifier = BackgroundNotifier(os.getenv("TELEGRAM_BOT_TOKEN"), os.getenv("TELEGRAM_CHAT_ID"),
+                                  os.getenv("TELEGRAM_API_URL", TELEGRAM_API_URL))
+    watcher = MultiScheduleWatcher(
+        load_schedules(args.config, os.getenv("AIS_BASE_URL")),
+        notifier,
+        lambda: _create_driver(driver_path, args.lean),
+        max_browsers=args.max_browsers,
+        max_http=args.max_http,
+    )
+    try:
+        asyncio.run(watcher.run())
+    except KeyboardInterrupt:
+        logging.warning("Stopped by user.")
+    finally:
+        notifier.close("⚠️ Multi-schedule watcher is exiting")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Telegram alerts.
+
+``send_telegram_alert`` is the plain synchronous call. ``BackgroundNotifier``
+is what the watchers use: it queues messages and sends them from a worker
+thread over one persistent session, so a slow Telegram API never delays a
+booking.
+"""
+import itertools
+import logging
+import queue
+import threading
+import time
+
+import requests
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+# -------- Send Telegram Alert --------
+def send_telegram_alert(message, token, chat_id, api_url=TELEGRAM_API_URL, session=None, timeout=10):
+    """Send ``message``; returns True if Telegram accepted it."""
+    try:
+        url = f"{api_url}/bot{token}/sendMessage"
+        payload = {
+            "chat_id": chat_id,
+            "text": message
+        }
+        response = (session or requests).post(url, data=payload, timeout=timeout)
+        if response.status_code == 200:
+            logging.info("Telegram alert sent.")
+            return True
+        logging.warning(f"Telegram error: {response.text}")
+    except Exception as e:
+        logging.error(f"Telegram exception: {e}")
+    return False
+
+
+class TelegramNotifier:
+    """Callable ``notify(message)`` bound to one bot/chat."""
+
+    def __init__(self, token, chat_id, api_url=TELEGRAM_API_URL):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url
+
+    def __call__(self, message, key=None):
+        return send_telegram_alert(message, self.token, self.chat_id, self.api_url)
+
+
+# -------- Background notifier --------
+class BackgroundNotifier:
+    """Non-blocking ``notify(message, key=None)``.
+
+    Messages go into a bounded queue drained by one worker thread. Sending a
+    message with the same ``key`` as one still waiting in the queue replaces
+    it instead of queueing another (used for the periodic heartbeat).
+    Failed sends are retried with exponential backoff; ``on_failure`` is
+    called for every message that is finally given up on.
+    """
+
+    _STOP = object()
+
+    def __init__(self, token, chat_id, api_url=TELEGRAM_API_URL, maxsize=100, timeout=5,
+                 retries=3, backoff=1.0, on_failure=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.api_url = api_url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.on_failure = on_failure
+        self._queue = queue.Queue(maxsize)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._session = requests.Session()
+        self._thread = threading.Thread(target=self._run, name="telegram-notifier", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message, key=None):
+        """Queue ``message``; returns False if it had to be dropped."""
+        with self._lock:
+            if key is not None and key in self._pending:
+                self._pending[key] = message
+                return True
+            key = key if key is not None else next(self._ids)
+            self._pending[key] = message
+        try:
+            self._queue.put_nowait(key)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(key, None)
+            logging.warning(f"Telegram queue full, dropped: {message}")
+            if self.on_failure:
+                self.on_failure(message)
+            return False
+
+    def _send(self, message):
+        for attempt in range(self.retries + 1):
+            if send_telegram_alert(message, self.token, self.chat_id, self.api_url,
+                                   session=self._session, timeout=self.timeout):
+                return True
+            if attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+        if self.on_failure:
+            self.on_failure(message)
+        return False
+
+    def _run(self):
+        while True:
+            key = self._queue.get()
+            if key is self._STOP:
+                return
+            with self._lock:
+                message = self._pending.pop(key, None)
+            if message is not None:
+                self._send(message)
+            self._queue.task_done()
+
+    def flush(self, timeout=10):
+        """Wait up to ``timeout`` seconds for everything queued to be sent."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self, final_message=None, timeout=10):
+        """Send ``final_message`` (if any) after everything queued, then stop within ``timeout`` seconds."""
+        if not self._thread.is_alive():
+            return
+        if final_message:
+            self(final_message)
+        self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logging.warning("Telegram notifier did not flush before shutdown.")
+        self._session.close()
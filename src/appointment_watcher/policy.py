@@ -0,0 +1,131 @@
+"""Which appointment dates are worth booking.
+
+``DatePolicy`` replaces the ``valid_months`` / ``valid_year`` string lists
+with real date intervals, excluded dates, a minimum/maximum lead time and
+an optional "must beat my current appointment" cutoff. Acceptable days
+for the next ``horizon_days`` are precomputed into a set of ordinals, so a
+lookup is one set membership test, and ``scan_range`` tells the calendar
+reader which month to start at and how many months to read.
+"""
+import calendar
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+
+def add_months(year, month, n):
+    index = year * 12 + (month - 1) + n
+    return index // 12, index % 12 + 1
+
+
+def _to_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+def parse_windows(spec):
+    """``"2025-09-01..2026-02-28,2026-09-01..2027-04-30"`` -> list of (start, end) dates."""
+    windows = []
+    for item in filter(None, (spec or "").split(",")):
+        start, _, end = item.strip().partition("..")
+        windows.append((_to_date(start), _to_date(end)))
+    return windows
+
+
+def parse_dates(spec):
+    return {_to_date(item.strip()) for item in (spec or "").split(",") if item.strip()}
+
+
+def windows_from_months(month_names, years):
+    """Translate the legacy month-name/year lists into date intervals."""
+    numbers = {list(calendar.month_name).index(name) for name in month_names}
+    windows = []
+    for year in sorted(years):
+        for month in sorted(numbers):
+            start = date(year, month, 1)
+            end = date(year, month, calendar.monthrange(year, month)[1])
+            if windows and windows[-1][1] + timedelta(days=1) == start:
+                windows[-1] = (windows[-1][0], end)
+            else:
+                windows.append((start, end))
+    return windows
+
+
+@dataclass
+class DatePolicy:
+    windows: list = field(default_factory=list)      # [(start, end)] inclusive; empty means any date
+    exclude: set = field(default_factory=set)
+    min_lead_days: int = 0
+    max_lead_days: int = None
+    current_appointment: date = None                 # only dates strictly before this are accepted
+    horizon_days: int = 400
+
+    def __post_init__(self):
+        self.windows = [(_to_date(s), _to_date(e)) for s, e in self.windows]
+        self.exclude = {_to_date(d) for d in self.exclude}
+        if self.current_appointment:
+            self.current_appointment = _to_date(self.current_appointment)
+        self._built_for = None
+        self._accepted = frozenset()
+
+    def _check(self, day, today):
+        lead = (day - today).days
+        if lead < self.min_lead_days or (self.max_lead_days is not None and lead > self.max_lead_days):
+            return False
+        if day in self.exclude:
+            return False
+        if self.current_appointment and day >= self.current_appointment:
+            return False
+        return not self.windows or any(start <= day <= end for start, end in self.windows)
+
+    def _build(self, today):
+        if self._built_for != today:
+            self._accepted = frozenset(
+                (today + timedelta(days=i)).toordinal() for i in range(self.horizon_days + 1)
+                if self._check(today + timedelta(days=i), today))
+            self._built_for = today
+
+    def accepts(self, day, today=None):
+        """True if ``day`` (date or datetime) may be booked."""
+        today = today or date.today()
+        day = day.date() if hasattr(day, "date") else day
+        self._build(today)
+        if 0 <= (day - today).days <= self.horizon_days:
+            return day.toordinal() in self._accepted
+        return self._check(day, today)
+
+    def accepts_month(self, year, month, today=None):
+        today = today or date.today()
+        self._build(today)
+        first = date(year, month, 1).toordinal()
+        last = first + calendar.monthrange(year, month)[1]
+        return any(first <= o < last for o in self._accepted)
+
+    def acceptable_months(self, today=None):
+        """Sorted ``(year, month)`` pairs containing at least one acceptable day within the horizon."""
+        today = today or date.today()
+        self._build(today)
+        return sorted({(d.year, d.month) for d in map(date.fromordinal, self._accepted)})
+
+    def scan_range(self, today=None):
+        """``(start (year, month), month count, months to skip)`` for the calendar reader, or None if nothing is acceptable."""
+        months = self.acceptable_months(today)
+        if not months:
+            return None
+        first, last = months[0], months[-1]
+        count = (last[0] - first[0]) * 12 + last[1] - first[1] + 1
+        wanted = set(months)
+        skip = [add_months(*first, i) for i in range(count) if add_months(*first, i) not in wanted]
+        return first, count, skip
+
+    def describe(self):
+        parts = [", ".join(f"{s:%Y-%m-%d}..{e:%Y-%m-%d}" for s, e in self.windows) or "any date"]
+        if self.min_lead_days:
+            parts.append(f"at least {self.min_lead_days} days ahead")
+        if self.max_lead_days is not None:
+            parts.append(f"at most {self.max_lead_days} days ahead")
+        if self.current_appointment:
+            parts.append(f"before {self.current_appointment:%Y-%m-%d}")
+        if self.exclude:
+            parts.append(f"{len(self.exclude)} excluded dates")
+        return "; ".join(parts)
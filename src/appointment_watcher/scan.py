@@ -0,0 +1,70 @@
+"""Scan strategies: which open calendar days to try, and in what order.
+
+The calendar is read in a single round trip (see ``calendar_reader``), so
+a strategy never pages the datepicker itself. It takes the open,
+acceptable days and returns them in the order ``browser.book_dates``
+should try them; booking stops at the first day that can be selected.
+
+- ``forward``: earliest day first.
+- ``backward``: latest month first, earliest day within each month.
+- ``bidirectional``: months closest to a preferred month first, alternating
+  earlier/later, so the preferred region is reached in one pass instead of
+  a forward scan, a sleep and a backward scan.
+- ``first``: only the earliest acceptable day; nothing else is tried.
+"""
+from itertools import groupby
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def forward(dates):
+    return sorted(dates)
+
+
+def backward(dates):
+    months = [list(days) for _, days in groupby(sorted(dates), key=_month_index)]
+    return [day for days in reversed(months) for day in days]
+
+
+def first_acceptable(dates):
+    return sorted(dates)[:1]
+
+
+def bidirectional(preferred=None):
+    """Strategy ordering months by distance from ``preferred`` (``(year, month)``).
+
+    Earlier months win ties. Without a preferred month this is ``forward``.
+    """
+    if preferred is None:
+        return forward
+    target = preferred[0] * 12 + preferred[1] - 1
+
+    def order(dates):
+        return sorted(dates, key=lambda day: (abs(_month_index(day) - target), _month_index(day), day))
+    return order
+
+
+STRATEGIES = {
+    "forward": lambda preferred=None: forward,
+    "backward": lambda preferred=None: backward,
+    "bidirectional": bidirectional,
+    "first": lambda preferred=None: first_acceptable,
+}
+
+
+def parse_month(spec):
+    """``"2026-11"`` -> ``(2026, 11)``; empty -> None."""
+    if not spec:
+        return None
+    year, month = spec.strip().split("-")[:2]
+    return int(year), int(month)
+
+
+def get_strategy(name, preferred=None):
+    """Return the strategy called ``name``; ``preferred`` is used by ``bidirectional``."""
+    try:
+        return STRATEGIES[name](preferred)
+    except KeyError:
+        raise ValueError(f"Unknown scan strategy {name!r}; expected one of {', '.join(STRATEGIES)}") from None
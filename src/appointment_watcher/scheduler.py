@@ -0,0 +1,190 @@
+"""Adaptive polling cadence.
+
+``PollScheduler`` replaces the fixed ``retry_delay`` / 10-minute busy sleep:
+
+* busy and error outcomes back off exponentially with jitter,
+* a token bucket caps requests per hour,
+* a time-of-day profile scales the delay (intensity 2 polls twice as often),
+* an optional ``ReleaseHistory`` boosts the hours in which slots were seen
+  to open before.
+
+A profile file looks like::
+
+    {"timezone": "America/Los_Angeles", "default": 1.0,
+     "windows": [{"start": "16:01", "end": "02:00", "intensity": 1.5}]}
+"""
+import json
+import logging
+import random
+import time
+from datetime import datetime, time as tm
+
+import pytz
+
+OK = "ok"
+FOUND = "found"
+BUSY = "busy"
+ERROR = "error"
+
+DEFAULT_PROFILE = {
+    "timezone": "America/Los_Angeles",
+    "default": 1.0,
+    "windows": [{"start": "16:01", "end": "02:00", "intensity": 1.0}],
+}
+
+
+# -------- Token bucket --------
+class TokenBucket:
+    def __init__(self, per_hour, clock=time.time):
+        self.capacity = max(1.0, per_hour / 12)   # allow up to 5 minutes' worth of burst
+        self.rate = per_hour / 3600
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, after=0):
+        """Seconds until a token is available, counting from ``after`` seconds from now."""
+        self._refill()
+        missing = 1 - (self.tokens + after * self.rate)
+        return max(0.0, missing / self.rate) if self.rate else 0.0
+
+    def take(self, count=1):
+        self._refill()
+        self.tokens -= count
+
+
+# -------- Time-of-day profile --------
+class IntensityProfile:
+    def __init__(self, timezone="America/Los_Angeles", default=1.0, windows=()):
+        self.tz = pytz.timezone(timezone)
+        self.default = default
+        self.windows = [(_parse_hhmm(w["start"]), _parse_hhmm(w["end"]), float(w["intensity"])) for w in windows]
+
+    @classmethod
+    def load(cls, path=None):
+        if not path:
+            return cls(**DEFAULT_PROFILE)
+        with open(path, encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+    def local_now(self, now=None):
+        return datetime.fromtimestamp(now if now is not None else time.time(), self.tz)
+
+    def window(self, now=None):
+        """Return the matching window's intensity, or None outside every window."""
+        t = self.local_now(now).time()
+        for start, end, intensity in self.windows:
+            inside = start <= t < end if start <= end else (t >= start or t < end)
+            if inside:
+                return intensity
+        return None
+
+    def intensity(self, now=None):
+        w = self.window(now)
+        return self.default if w is None else w
+
+
+def _parse_hhmm(value):
+    hours, minutes = value.split(":")
+    return tm(int(hours), int(minutes))
+
+
+# -------- Learned release hours --------
+class ReleaseHistory:
+    """Counts, per local hour, how often new availability was observed."""
+
+    def __init__(self, path=None, weight=1.0):
+        self.path = path
+        self.weight = weight
+        self.counts = [0] * 24
+        if path:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self.counts = json.load(f)["hours"]
+            except FileNotFoundError:
+                pass
+
+    def observe(self, hour):
+        self.counts[hour] += 1
+        if self.path:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"hours": self.counts}, f)
+
+    def boost(self, hour):
+        """1.0 for hours with no history, up to ``1 + weight`` for the busiest release hour."""
+        peak = max(self.counts)
+        return 1.0 + self.weight * self.counts[hour] / peak if peak else 1.0
+
+
+# -------- Scheduler --------
+class PollScheduler:
+    def __init__(self, base_delay=60, busy_delay=60, error_delay=5, max_delay=600, min_delay=5,
+                 backoff=2.0, jitter=0.2, max_per_hour=None, profile=None, history=None, clock=time.time):
+        self.base_delay = base_delay
+        self.busy_delay = busy_delay
+        self.error_delay = error_delay
+        self.max_delay = max_delay
+        self.min_delay = min_delay
+        self.backoff = backoff
+        self.jitter = jitter
+        self.profile = profile or IntensityProfile.load()
+        self.history = history
+        self.clock = clock
+        self.bucket = TokenBucket(max_per_hour, clock) if max_per_hour else None
+        self.busy_streak = 0
+        self.error_streak = 0
+        self.busy_outside_window = 0   # busy responses outside every window since the last success
+        self.override = None   # operator's intensity multiplier, set at runtime
+
+    def record(self, outcome, requests=1):
+        """Feed back the result of the last poll (``OK``, ``FOUND``, ``BUSY`` or ``ERROR``) and the requests it sent."""
+        if self.bucket:
+            self.bucket.take(requests)
+        if outcome == BUSY:
+            self.busy_streak += 1
+            self.error_streak = 0
+            if not self.in_window():
+                self.busy_outside_window += 1
+        elif outcome == ERROR:
+            self.error_streak += 1
+        else:
+            self.busy_streak = 0
+            self.error_streak = 0
+            self.busy_outside_window = 0
+            if outcome == FOUND and self.history:
+                self.history.observe(self.profile.local_now(self.clock()).hour)
+
+    def in_window(self):
+        return self.profile.window(self.clock()) is not None
+
+    def intensity(self):
+        now = self.clock()
+        intensity = self.profile.intensity(now)
+        if self.history:
+            intensity *= self.history.boost(self.profile.local_now(now).hour)
+        if self.override:
+            intensity *= self.override
+        return intensity
+
+    def next_delay(self):
+        """Seconds to wait before the next poll."""
+        if self.busy_streak:
+            delay = self.busy_delay * self.backoff ** (self.busy_streak - 1)
+        elif self.error_streak:
+            delay = self.error_delay * self.backoff ** (self.error_streak - 1)
+        else:
+            delay = self.base_delay
+        delay = min(self.max_delay, delay) / max(self.intensity(), 0.01)
+        delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        delay = max(self.min_delay, min(self.max_delay, delay))
+        if self.bucket:
+            wait = self.bucket.wait_time(after=delay)
+            if wait:
+                logging.info(f"Request budget reached; delaying next poll by {wait:.0f}s")
+                delay += wait
+        return delay
@@ -0,0 +1,101 @@
+"""On-disk cache of the logged-in AIS session.
+
+Stores the browser cookies plus a little metadata (CSRF token, user agent,
+save time) so a restart can skip ``login()``. If ``key`` is given the file
+is encrypted with Fernet (``pip install cryptography``); generate a key with
+``python -c "from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())"``
+and put it in ``.env`` as ``SESSION_CACHE_KEY``.
+"""
+import json
+import logging
+import os
+import time
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+
+
+class SessionCache:
+    def __init__(self, path, key=None, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._fernet = None
+        if key:
+            try:
+                from cryptography.fernet import Fernet
+            except ImportError:
+                raise RuntimeError("SESSION_CACHE_KEY is set but the 'cryptography' package is not installed")
+            self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
+
+    def save(self, cookies, csrf_token=None, user_agent=None):
+        """Write the session to disk and return it as a cache entry."""
+        entry = {
+            "saved_at": self.clock(),
+            "cookies": cookies,
+            "csrf_token": csrf_token,
+            "user_agent": user_agent,
+        }
+        data = json.dumps(entry).encode()
+        if self._fernet:
+            data = self._fernet.encrypt(data)
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        logging.info(f"Session cached to {self.path}")
+        return entry
+
+    def save_from_driver(self, driver):
+        csrf_token = driver.execute_script(
+            "var m = document.querySelector('meta[name=\"csrf-token\"]'); return m ? m.content : null;")
+        return self.save(driver.get_cookies(), csrf_token, driver.execute_script("return navigator.userAgent;"))
+
+    def load(self):
+        """Return the cached entry, or None if missing or unreadable."""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+            if self._fernet:
+                data = self._fernet.decrypt(data)
+            entry = json.loads(data)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable session cache {self.path}: {e}")
+            return None
+        # Drop cookies that have expired on their own
+        now = self.clock()
+        entry["cookies"] = [c for c in entry["cookies"] if not c.get("expiry") or c["expiry"] > now]
+        return entry
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def is_alive(self, entry, appointment_url, facility_id, timeout=10):
+        """Check a loaded entry with one cheap JSON request; clears the cache if the session is dead."""
+        if not entry or not entry["cookies"]:
+            return False
+        client = AISClient.from_cookies(entry["cookies"], appointment_url, entry.get("csrf_token"),
+                                        entry.get("user_agent"), timeout=timeout)
+        try:
+            client.get_available_days(facility_id)
+        except SessionExpired:
+            logging.info("Cached session is no longer valid.")
+            self.clear()
+            return False
+        except SystemBusy:
+            pass  # the session itself was accepted
+        except Exception as e:
+            logging.warning(f"Could not validate cached session: {e}")
+            return False
+        finally:
+            client.close()
+        age = (self.clock() - entry["saved_at"]) / 60
+        logging.info(f"Cached session is valid ({age:.0f} min old).")
+        return True
@@ -0,0 +1,187 @@
+"""Keep the AIS session alive off the polling thread.
+
+Without it, an expired session is only noticed when a check fails, and the
+poller then blocks on a full browser ``login()``. ``SessionKeeper`` runs a
+background thread that
+
+* validates the session with one cheap ``days.json`` request when the
+  poller has not proven it valid for ``check_interval`` seconds (every
+  successful check counts, so a busy poller costs no extra requests),
+  and signs in again over HTTP (``AISClient.sign_in``) once it fails;
+* with ``refresh_after`` set, also signs in again once the session is
+  that old. It is off by default: every sign-in is a request AIS may
+  throttle, and a session that still validates does not need one;
+* optionally keeps a second, ``standby`` session logged in, so a session
+  lost on the hot path is replaced by ``take_over()`` without any request.
+
+Sessions are plain cache entries (``cookies``, ``csrf_token``,
+``user_agent``, ``saved_at``), as stored by ``SessionCache``. Every change
+of the current session bumps ``generation``; the poller compares it with
+the generation it is using and moves its client or browser over at the
+start of the next check.
+"""
+import logging
+import threading
+import time
+
+import requests
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+
+
+class SessionKeeper:
+    def __init__(self, login_url, appointment_url, facility_id, email=None, password=None, cache=None,
+                 refresh_after=0, check_interval=240, standby=False, on_renew=None, clock=time.time):
+        self.login_url = login_url
+        self.appointment_url = appointment_url
+        self.facility_id = facility_id
+        self.email = email
+        self.password = password
+        self.cache = cache
+        self.refresh_after = refresh_after
+        self.check_interval = check_interval
+        self.use_standby = standby
+        self.on_renew = on_renew                 # called with (reason, entry) after every renewal
+        self.clock = clock
+        self.current = None
+        self.standby = None
+        self.generation = 0
+        self.last_valid = 0.0
+        self._standby_checked = 0.0
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -------- Hot path --------
+    def adopt(self, entry):
+        """Use ``entry`` (e.g. after a browser login or a cache restore) as the current session."""
+        if not entry:
+            return
+        with self._lock:
+            self.current = entry
+            self.generation += 1
+            self.last_valid = self.clock()
+
+    def mark_valid(self):
+        """The poller just used the session successfully; postpones the next background check."""
+        self.last_valid = self.clock()
+
+    def age(self):
+        entry = self.current
+        return self.clock() - entry["saved_at"] if entry else None
+
+    def take_over(self):
+        """Replace a session the poller found dead; returns the new entry, or None if a browser login is needed.
+
+        A ready standby is handed over without any request; otherwise one
+        HTTP sign-in is tried right away, unless the last one failed less
+        than ``check_interval`` seconds ago.
+        """
+        with self._lock:
+            entry, self.standby = self.standby, None
+        reason = "standby" if entry else "expired"
+        if entry is None and self.clock() < self._retry_at:
+            return None
+        entry = entry or self._sign_in()
+        if entry:
+            self._promote(entry, reason)
+        return entry
+
+    # -------- Background --------
+    def start(self):
+        if self._thread is None and self.check_interval:
+            self._thread = threading.Thread(target=self._run, name="session-keeper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.wait(min(30.0, self.check_interval / 4)):
+            try:
+                self.tick()
+            except Exception as e:
+                logging.error(f"Session keeper failed: {e}")
+
+    def tick(self):
+        """One round of housekeeping; normally driven by the background thread."""
+        now = self.clock()
+        if self.current is None or now < self._retry_at:
+            return
+        if self.refresh_after and self.age() >= self.refresh_after:
+            self._replace("age")
+        elif now - self.last_valid >= self.check_interval and not self.is_valid(self.current):
+            self._replace("expired")
+        if self.use_standby and not self._stop.is_set():
+            self._refresh_standby(now)
+
+    def _refresh_standby(self, now):
+        standby = self.standby
+        if standby is not None:
+            if self.refresh_after and now - standby["saved_at"] >= self.refresh_after:
+                standby = None
+            elif now - self._standby_checked >= self.check_interval:
+                self._standby_checked = now
+                standby = standby if self.is_valid(standby) else None
+            if standby is not None:
+                return
+        with self._lock:
+            self.standby = None
+        entry = self._sign_in()
+        with self._lock:
+            if self.standby is None:
+                self.standby = entry
+                self._standby_checked = now
+
+    def is_valid(self, entry):
+        client = AISClient.from_cookies(entry["cookies"], self.appointment_url, entry.get("csrf_token"),
+                                        entry.get("user_agent"), timeout=10)
+        try:
+            client.get_available_days(self.facility_id)
+        except SessionExpired:
+            return False
+        except (SystemBusy, requests.RequestException):
+            pass   # the session itself was not rejected
+        finally:
+            client.close()
+        if entry is self.current:
+            self.last_valid = self.clock()
+        return True
+
+    def _replace(self, reason):
+        with self._lock:
+            entry, self.standby = self.standby, None
+        if entry is None or (reason == "expired" and not self.is_valid(entry)):
+            entry = self._sign_in()
+        if entry:
+            self._promote(entry, reason)
+
+    def _promote(self, entry, reason):
+        old_age = self.age()
+        self.adopt(entry)
+        if self.cache:
+            self.cache.save(entry["cookies"], entry.get("csrf_token"), entry.get("user_agent"))
+        logging.info(f"🔑 Session renewed ({reason}; previous one was "
+                     f"{(old_age or 0) / 60:.0f} min old)")
+        if self.on_renew:
+            self.on_renew(reason, entry)
+
+    def _sign_in(self):
+        if not (self.email and self.password):
+            return None
+        user_agent = (self.current or {}).get("user_agent")
+        try:
+            client = AISClient.sign_in(self.login_url, self.email, self.password, self.appointment_url, user_agent)
+        except (SessionExpired, requests.RequestException) as e:
+            logging.warning(f"Background sign-in failed: {e}")
+            self._retry_at = self.clock() + self.check_interval
+            return None
+        try:
+            return {"saved_at": self.clock(), "cookies": client.cookie_dicts(), "csrf_token": client.csrf_token,
+                    "user_agent": user_agent}
+        finally:
+            client.close()
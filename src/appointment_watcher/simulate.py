@@ -0,0 +1,363 @@
+"""Replay whole days of polling in seconds, in virtual time.
+
+Runs the HTTP poll loop (``POLL_MODE=http``) against ``mock_ais`` with both
+sharing a ``SimulatedClock``. Every wait of the loop (retry delay, busy
+back-off, request budget) advances virtual time instead of sleeping. The
+stand-in's releases, busy windows and session expiries follow the same
+clock. Scheduling settings come from ``.env`` as for a real run (or from
+``-e KEY=VALUE``), so a change to ``RETRY_DELAY``, ``POLL_PROFILE`` or
+``MAX_REQUESTS_PER_HOUR`` can be tried on a week of traffic before it
+reaches production::
+
+    python -m appointment_watcher.simulate --days 7 --scenario week.json -e RETRY_DELAY=30
+
+The scenario uses the ``mock_ais`` format. Times may also be local
+``"HH:MM"`` strings (in the poll profile's timezone), which repeat daily,
+and any entry may carry ``"every": SECONDS`` to repeat it. ``+N`` dates
+count from the day of each occurrence::
+
+    {"releases": [{"at": "16:05", "facility": "94", "date": "+45", "times": ["08:15"], "ttl": 900}],
+     "busy": [{"start": "16:00", "end": "16:20"}],
+     "expire_sessions_at": [{"at": 3600, "every": 7200}]}
+
+The simulation is a dry run: nothing is booked on AIS, and there is no
+browser. A slot is "captured" when the stand-in accepts the booking form
+that the browser would have submitted. The loop then keeps watching for
+the next release. Reported:
+
+* requests served, busy hits, sign-ins and heartbeats, with checks and busy hits per local hour
+* how often a busy streak outside the release windows would have hibernated the machine
+* per release: ``detect_s`` (release -> first times fetch for its date)
+  and ``capture_s`` (release -> booking accepted), or ``missed`` if it was
+  taken first
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import date, datetime, time as tm, timedelta
+
+import requests
+from dotenv import load_dotenv
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+from appointment_watcher.clock import SimulatedClock, SimulationOver
+from appointment_watcher.config import Config
+from appointment_watcher.events import NullEventLog
+from appointment_watcher.mock_ais import MockAIS, resolve_date
+from appointment_watcher.scheduler import BUSY, ERROR, IntensityProfile
+from appointment_watcher.watcher import Watcher
+
+DEFAULT_SCENARIO = {
+    "releases": [{"at": "16:05", "facility": "94", "date": "+45", "times": ["08:15", "08:30"], "ttl": 900},
+                 {"at": "21:40", "facility": "94", "date": "+60", "times": ["10:00"], "ttl": 300},
+                 {"at": "03:30", "facility": "94", "date": "+30", "times": ["09:00"], "ttl": 1800}],
+    "busy": [{"start": "16:00", "end": "16:20"}, {"start": "09:00", "end": "09:45"}],
+}
+
+EMAIL = "simulate@example.com"
+PASSWORD = "simulate-password"
+DAY = 86400
+
+
+# -------- Scenario --------
+def _next_local(after, hhmm, tz):
+    """Epoch seconds of the first local ``HH:MM`` at or after the datetime ``after``."""
+    hours, minutes = map(int, hhmm.split(":"))
+    day = after.date()
+    while True:
+        candidate = tz.localize(datetime.combine(day, tm(hours, minutes)))
+        if candidate >= after:
+            return candidate.timestamp()
+        day += timedelta(days=1)
+
+
+def _offsets(entry, key, start, duration, tz):
+    """Offsets from ``start`` at which ``entry[key]`` happens during the run (plus one just before it)."""
+    value = entry[key]
+    if isinstance(value, str) and ":" in value:
+        first, every = _next_local(datetime.fromtimestamp(start, tz), value, tz) - start, entry.get("every", DAY)
+    else:
+        first, every = float(value), entry.get("every")
+    if not every:
+        return [first]
+    t = first - every   # the previous occurrence may still be running at the start
+    offsets = []
+    while t < duration:
+        offsets.append(t)
+        t += every
+    return offsets
+
+
+def _span(entry):
+    """Length of a busy window in seconds; local windows may run past midnight."""
+    if isinstance(entry["start"], str):
+        start, end = ((int(h) * 60 + int(m)) * 60 for h, m in (entry[k].split(":") for k in ("start", "end")))
+        return (end - start) % DAY
+    return entry["end"] - entry["start"]
+
+
+def expand_scenario(scenario, start, duration, tz):
+    """Turn a simulation scenario into a plain ``mock_ais`` one: numeric offsets and ISO dates."""
+    def day_of(offset):
+        return datetime.fromtimestamp(start + max(0.0, offset), tz).date()
+
+    releases = []
+    for r in scenario.get("releases", []):
+        for t in _offsets(r, "at", start, duration, tz):
+            if t >= 0:
+                releases.append({**r, "at": t, "date": resolve_date(r["date"], day_of(t))})
+    busy = []
+    for w in scenario.get("busy", []):
+        length = _span(w)
+        busy.extend({"start": t, "end": t + length} for t in _offsets(w, "start", start, duration, tz)
+                    if t + length > 0)
+    expiries = []
+    for e in scenario.get("expire_sessions_at", []):
+        entry = e if isinstance(e, dict) else {"at": e}
+        expiries.extend(t for t in _offsets(entry, "at", start, duration, tz) if t >= 0)
+    slots = {facility: {resolve_date(d, day_of(0)): times for d, times in days.items()}
+             for facility, days in scenario.get("slots", {}).items()}
+    return {**{k: v for k, v in scenario.items() if k == "facilities"},
+            "slots": slots, "releases": releases, "busy": busy, "expire_sessions_at": expiries}
+
+
+# -------- Watcher without a browser --------
+class SimulationLog(NullEventLog):
+    """Keeps the watcher's events in memory, stamped with virtual time."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.events = []
+
+    def emit(self, kind, **fields):
+        self.events.append((self.clock.time(), kind, fields))
+        return True
+
+
+class Outbox:
+    """Notifier that only records the Telegram messages the watcher would have sent."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.messages = []
+
+    def __call__(self, message, key=None):
+        self.messages.append((self.clock.time(), key, message))
+        return True
+
+    def flush(self, timeout=10):
+        pass
+
+    def close(self, final_message=None, timeout=10):
+        pass
+
+
+class SimulatedWatcher(Watcher):
+    """HTTP-mode watcher whose browser steps (login, booking) are done with their HTTP equivalents."""
+
+    def login(self):
+        client = AISClient.sign_in(self.config.login_url, self.config.email, self.config.password,
+                                   self.config.appointment_url)
+        try:
+            entry = self.session_cache.save(client.cookie_dicts(), client.csrf_token)
+        finally:
+            client.close()
+        self.events.emit("login", ok=True)
+        self.sessions.adopt(entry)
+        self._session_generation = self.sessions.generation
+
+    def _http_client(self):
+        return self._client_for(self.sessions.current)
+
+    def _wait(self, delay):
+        # Stands in for the keeper's background thread, which would not run in virtual time
+        if self.config.session_check_interval:
+            self.sessions.tick()
+        super()._wait(delay)
+
+    def _book_ranked(self, client, candidates):
+        """Submit the booking form for the first free time, as the browser would; returns (datetime, facility)."""
+        for facility_id, wanted in candidates:
+            for day in self.strategy(wanted):
+                key = f"{day:%Y-%m-%d}"
+                try:
+                    times = client.get_available_times(facility_id, key)
+                except (SessionExpired, SystemBusy, requests.RequestException) as e:
+                    logging.warning(f"Could not fetch times for {key}: {e}")
+                    continue
+                for slot in times:
+                    response = client.session.post(self.config.appointment_url, timeout=client.timeout, data={
+                        "appointments[consulate_appointment][facility_id]": facility_id,
+                        "appointments[consulate_appointment][date]": key,
+                        "appointments[consulate_appointment][time]": slot,
+                    })
+                    if "successfully scheduled" in response.text:
+                        return datetime.strptime(f"{key} {slot}", "%Y-%m-%d %H:%M"), facility_id
+                self._day_failed(day, "taken" if times else "no_times", facility_id)
+        return None, None
+
+
+# -------- Run --------
+def simulate(config, scenario, start, duration, seed=1):
+    """Poll ``duration`` virtual seconds from ``start`` against the scenario; returns the report dict."""
+    random.seed(seed)
+    tz = IntensityProfile.load(config.poll_profile).tz
+    clock = SimulatedClock(start, start + duration)
+    workdir = tempfile.mkdtemp(prefix="visa-simulate-")
+    mock = MockAIS(scenario=expand_scenario(scenario, start, duration, tz), email=EMAIL, password=PASSWORD,
+                   clock=clock.time).start()
+    config = replace(
+        config, ais_base_url=mock.base_url, email=EMAIL, password=PASSWORD, schedule_id="1",
+        poll_mode="http", dry_run=True, session_standby=False, control_port=None, telegram_commands=False,
+        history_db=None, release_history_path=None, metrics_prom_path=None, metrics_jsonl_path=None,
+        session_cache_path=os.path.join(workdir, "session_cache.json"), session_cache_key=None,
+        diagnostics_dir=os.path.join(workdir, "diagnostics"),
+        facility_index_path=os.path.join(workdir, "facility_index.json"))
+    log, outbox = SimulationLog(clock), Outbox(clock)
+    watcher = SimulatedWatcher(config, notifier=outbox, events=log, clock=clock, driver_factory=_no_browser)
+    started = time.monotonic()
+    try:
+        watcher.restore_or_login()
+        while True:
+            watcher.check_visa_availability_http()   # returns after each capture; keep watching
+    except SimulationOver:
+        pass
+    finally:
+        elapsed = time.monotonic() - started
+        watcher.close()
+        mock.stop()
+    return report(config, mock, log, outbox, watcher.scheduler.profile, start, duration, elapsed)
+
+
+def _no_browser():
+    raise RuntimeError("The simulation has no browser; this step needs one")
+
+
+def report(config, mock, log, outbox, profile, start, duration, elapsed):
+    """Summarise a finished run; mock event times are seconds since ``start``."""
+    events = sorted(mock.events, key=lambda e: e[0])
+    releases = []
+    for i, (at, kind, detail) in enumerate(events):
+        if kind != "release":
+            continue
+        day, facility = detail["dates"][0], detail["facility"]
+        after = []
+        for e in events[i + 1:]:
+            if not isinstance(e[2], dict) or e[2].get("facility") != facility:
+                continue
+            if e[1] == "release" and day in e[2]["dates"]:
+                break   # a later release of the same date has its own row
+            if e[2].get("date") == day:
+                after.append(e)
+        detect = next((e[0] for e in after if e[1] == "times"), None)
+        end = next((e for e in after if e[1] in ("booked", "taken")), None)
+        booked = end[0] if end and end[1] == "booked" else None
+        taken = end[0] if end and end[1] == "taken" else None
+        releases.append({
+            "at": f"{profile.local_now(start + at):%a %H:%M}",
+            "facility": facility,
+            "date": day,
+            "detect_s": round(detect - at, 1) if detect is not None else None,
+            "capture_s": round(booked - at, 1) if booked is not None else None,
+            "outcome": "captured" if booked is not None else "missed" if taken is not None else "open",
+        })
+
+    hours = {h: {"checks": 0, "busy": 0} for h in range(24)}
+    hibernations, outside = 0, 0
+    for ts, kind, fields in log.events:
+        hour = profile.local_now(ts).hour
+        if kind == "check":
+            hours[hour]["checks"] += 1
+        elif kind == "outcome" and fields["outcome"] == BUSY:
+            hours[hour]["busy"] += 1
+            if profile.window(ts) is None:
+                outside += 1
+                # Same rule as PollScheduler.busy_outside_window and the browser loop
+                if config.hibernate_after_busy and outside == config.hibernate_after_busy + 2:
+                    hibernations += 1
+        elif kind == "outcome" and fields["outcome"] != ERROR:
+            outside = 0
+
+    captures = [r["capture_s"] for r in releases if r["capture_s"] is not None]
+    kinds = [e[1] for e in events]
+    return {
+        "simulated_h": round(duration / 3600, 1),
+        "elapsed_s": round(elapsed, 1),
+        "checks": sum(h["checks"] for h in hours.values()),
+        "requests": mock.requests_served,
+        "req_per_hour": round(mock.requests_served / duration * 3600, 1),
+        "busy_hits": kinds.count("busy"),
+        "logins": kinds.count("login"),
+        "session_expiries": kinds.count("expire"),
+        "heartbeats": sum(1 for _, key, _ in outbox.messages if key == "heartbeat"),
+        "hibernations": hibernations,
+        "captured": len(captures),
+        "missed": sum(1 for r in releases if r["outcome"] == "missed"),
+        "capture_p50_s": round(statistics.median(captures), 1) if captures else None,
+        "capture_max_s": max(captures) if captures else None,
+        "releases": releases,
+        "hours": hours,
+    }
+
+
+def print_report(result):
+    print(f"Simulated {result['simulated_h']} h in {result['elapsed_s']} s")
+    for key in ("checks", "requests", "req_per_hour", "busy_hits", "logins", "session_expiries", "heartbeats",
+                "hibernations", "captured", "missed", "capture_p50_s", "capture_max_s"):
+        print(f"  {key:<17} {result[key]}")
+    print("\nRelease     facility  date        detect_s  capture_s  outcome")
+    for r in result["releases"]:
+        print(f"{r['at']:<11} {r['facility']:<9} {r['date']:<11} {str(r['detect_s']):<9} "
+              f"{str(r['capture_s']):<10} {r['outcome']}")
+    print("\nHour  checks  busy")
+    for hour, counts in result["hours"].items():
+        if counts["checks"]:
+            print(f"{hour:02d}    {counts['checks']:<7} {counts['busy']}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay polling days in virtual time against the local AIS stand-in.")
+    parser.add_argument("--env-file", help="settings file (default: the nearest .env)")
+    parser.add_argument("-e", "--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="override a setting, e.g. -e RETRY_DELAY=30 (may be repeated)")
+    parser.add_argument("--scenario", help="scenario JSON (default: three daily releases and two busy windows)")
+    parser.add_argument("--hours", type=float, help="virtual hours to simulate (default 24)")
+    parser.add_argument("--days", type=float, help="virtual days to simulate")
+    parser.add_argument("--start", help="local start YYYY-MM-DD[THH:MM] in the profile's timezone (default: today 00:00)")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the scheduler's jitter")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="show the watcher's log")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.CRITICAL,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    load_dotenv(args.env_file)
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in args.set)
+    config = Config.from_env(env)
+
+    scenario = DEFAULT_SCENARIO
+    if args.scenario:
+        with open(args.scenario, encoding="utf-8") as f:
+            scenario = json.load(f)
+    tz = IntensityProfile.load(config.poll_profile).tz
+    local_start = datetime.fromisoformat(args.start) if args.start else datetime.combine(date.today(), tm())
+    duration = args.days * DAY if args.days else (args.hours or 24) * 3600
+
+    result = simulate(config, scenario, tz.localize(local_start).timestamp(), duration, args.seed)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
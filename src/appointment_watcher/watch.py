@@ -0,0 +1,148 @@
+"""Stay-on-page watch mode.
+
+The browser loop pays for a full ``driver.get`` of the appointment page,
+a facility selection and a calendar open on every check. ``PageWatch``
+loads the page once and then lets the page do the work:
+
+* ``install()`` hooks the page's own ``days/<facility>.json`` requests
+  (XHR and fetch) and registers a ``MutationObserver`` on the busy notice,
+  the datepicker and the time select. Everything they see is pushed onto
+  an in-page queue.
+* ``refresh()`` re-fires the facility ``change`` event, so the page issues
+  its usual availability request, and blocks in ``execute_async_script``
+  until the response has arrived. The check costs one small JSON request
+  and one WebDriver round trip, and returns milliseconds after the
+  response instead of after a page load.
+
+A navigation (session expiry, a recycled driver) drops the hooks;
+``refresh()`` then returns None and the caller reloads the page. Callers
+should also reload every few minutes anyway, as a safety net against a
+page that silently stopped working.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from selenium.common.exceptions import JavascriptException, TimeoutException
+
+FACILITY_SELECT_ID = "appointments_consulate_appointment_facility_id"
+
+_INSTALL_JS = """
+if (window.__visaWatch) return false;
+var w = window.__visaWatch = {queue: [], waiter: null, days: null};
+function push(event) {
+    w.queue.push(event);
+    if (w.queue.length > 100) w.queue.shift();
+    if (w.waiter && (event.kind === 'days' || event.kind === 'busy')) {
+        var done = w.waiter;
+        w.waiter = null;
+        done(w.queue.splice(0));
+    }
+}
+function onDays(text) {
+    var data;
+    try { data = JSON.parse(text); } catch (e) { return push({kind: 'busy'}); }
+    if (!Array.isArray(data)) return push({kind: 'busy'});
+    var days = data.map(function (d) { return d.date; }).sort();
+    var changed = JSON.stringify(days) !== JSON.stringify(w.days);
+    w.days = days;
+    push({kind: 'days', days: days, changed: changed});
+}
+var DAYS = /\\/days\\/\\d+\\.json/;
+var open = XMLHttpRequest.prototype.open;
+XMLHttpRequest.prototype.open = function (method, url) {
+    if (DAYS.test(url)) {
+        this.addEventListener('load', function () { onDays(this.responseText); });
+        this.addEventListener('error', function () { push({kind: 'busy'}); });
+    }
+    return open.apply(this, arguments);
+};
+if (window.fetch) {
+    var fetch = window.fetch;
+    window.fetch = function (input) {
+        var promise = fetch.apply(this, arguments);
+        if (DAYS.test(typeof input === 'string' ? input : input.url)) {
+            promise.then(function (r) { return r.clone().text(); }).then(onDays, function () { push({kind: 'busy'}); });
+        }
+        return promise;
+    };
+}
+var note = document.getElementById('consulate_date_time_not_available');
+var times = document.getElementById(arguments[0]);
+var picker = document.getElementById('ui-datepicker-div');
+var observer = new MutationObserver(function (records) {
+    records.forEach(function (r) {
+        if (note && (r.target === note || note.contains(r.target))) {
+            if (note.style.display !== 'none') push({kind: 'busy'});
+        } else if (times && r.target === times) {
+            var values = [];
+            for (var i = 0; i < times.options.length; i++) if (times.options[i].value) values.push(times.options[i].value);
+            push({kind: 'times', times: values});
+        } else if (!w.queue.length || w.queue[w.queue.length - 1].kind !== 'calendar') {
+            push({kind: 'calendar'});
+        }
+    });
+});
+if (note) observer.observe(note, {attributes: true, attributeFilter: ['style', 'class'], childList: true});
+if (times) observer.observe(times, {childList: true});
+if (picker) observer.observe(picker, {childList: true, subtree: true});
+return true;
+"""
+
+_REFRESH_JS = """
+var done = arguments[arguments.length - 1];
+var w = window.__visaWatch;
+var select = document.getElementById(arguments[1]);
+if (!w || !select) return done(null);
+// Stale results from before this refresh must not answer it
+w.queue = w.queue.filter(function (e) { return e.kind !== 'days' && e.kind !== 'busy'; });
+w.waiter = done;
+select.value = arguments[0];
+select.dispatchEvent(new Event('change', {bubbles: true}));
+"""
+
+
+@dataclass
+class WatchResult:
+    days: list = field(default_factory=list)   # ["YYYY-MM-DD", ...], empty when busy
+    busy: bool = False
+    changed: bool = False
+    events: list = field(default_factory=list)
+
+
+class PageWatch:
+    def __init__(self, driver, facility_id, time_select_id="appointments_consulate_appointment_time"):
+        self.driver = driver
+        self.facility_id = str(facility_id)
+        self.time_select_id = time_select_id
+        self.refreshes = 0
+
+    def install(self):
+        """Hook the current page; returns False if it was already hooked."""
+        return self.driver.execute_script(_INSTALL_JS, self.time_select_id)
+
+    def refresh(self, timeout=10):
+        """Trigger the page's availability request and wait for its answer.
+
+        Returns a ``WatchResult``, or None if the page lost its hooks (it
+        navigated away) and has to be reloaded. No answer within ``timeout``
+        counts as busy.
+        """
+        self.driver.set_script_timeout(timeout)
+        try:
+            events = self.driver.execute_async_script(_REFRESH_JS, self.facility_id, FACILITY_SELECT_ID)
+        except TimeoutException:
+            logging.warning(f"No availability response within {timeout:.1f}s")
+            return WatchResult(busy=True)
+        except JavascriptException as e:
+            logging.warning(f"Watch script failed: {e.msg}")
+            return None
+        if events is None:
+            return None
+        self.refreshes += 1
+        result = WatchResult(events=events)
+        for event in events:
+            if event["kind"] == "days":
+                result.days, result.changed, result.busy = event["days"], event["changed"], False
+            elif event["kind"] == "busy":
+                result.busy = True
+        return result
@@ -0,0 +1,233 @@
+"""Supervise the long-lived Chrome session.
+
+``DriverWatchdog`` owns the driver instead of the watcher:
+
+* every WebDriver command is timed (``driver.execute`` is wrapped), so call
+  latency shows up in the metrics and a call stuck for longer than
+  ``hard_timeout`` is detected by a monitor thread. The monitor kills
+  chromedriver and its Chrome children, which makes the stuck call fail
+  straight away instead of blocking the loop indefinitely.
+* after ``max_checks`` checks, or once chromedriver plus Chrome exceed
+  ``max_rss_mb``, the driver is recycled. The old one is quit (or
+  killed, if quitting hangs) and a new one is started.
+* ``on_recycle(driver)`` runs after every restart so the caller can put
+  the logged-in state back (cached cookies, or a fresh login).
+* ``recover(error)`` tells the caller whether a failed check was the
+  browser's fault (a dead or killed session); if so the driver has already
+  been replaced and the check can simply be repeated. More than
+  ``max_recoveries`` within ten minutes is treated as fatal.
+
+RSS needs the optional ``psutil`` package; without it only the check
+count triggers recycling and a hung session is killed through its
+chromedriver process alone.
+"""
+import logging
+import os
+import signal
+import threading
+import time
+from collections import deque
+
+from appointment_watcher.metrics import process_rss_bytes
+
+
+def _driver_pid(driver):
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None   # remote or injected driver without a local service
+
+
+# chromedriver reports a crashed or vanished browser as a plain WebDriverException with one of these messages
+_BROKEN_SESSION_MESSAGES = ("chrome not reachable", "disconnected:", "tab crashed", "session deleted")
+
+
+def is_driver_failure(error):
+    """True for errors that mean the browser session itself is broken.
+
+    Page-level errors (timeouts, script errors, intercepted clicks, missing
+    elements) are not: the loops handle those as ERROR or BUSY outcomes.
+    """
+    from selenium.common.exceptions import (InvalidSessionIdException, NoSuchWindowException,
+                                            SessionNotCreatedException, WebDriverException)
+    from urllib3.exceptions import HTTPError
+
+    if isinstance(error, (InvalidSessionIdException, NoSuchWindowException, SessionNotCreatedException)):
+        return True
+    # A killed chromedriver surfaces as a refused or reset connection rather than a WebDriverException
+    if isinstance(error, (HTTPError, ConnectionError)):
+        return True
+    return isinstance(error, WebDriverException) and any(m in (error.msg or "") for m in _BROKEN_SESSION_MESSAGES)
+
+
+def kill_process_tree(pid):
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil:
+        try:
+            proc = psutil.Process(pid)
+            for child in proc.children(recursive=True) + [proc]:
+                try:
+                    child.kill()
+                except psutil.Error:
+                    pass
+            return
+        except psutil.Error:
+            return
+    try:
+        os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+    except OSError:
+        pass
+
+
+class DriverWatchdog:
+    def __init__(self, factory, driver=None, max_checks=200, max_rss_mb=None, hard_timeout=90,
+                 on_recycle=None, metrics=None, max_recoveries=5, interval=1.0):
+        self.factory = factory
+        self.max_checks = max_checks
+        self.max_rss_mb = max_rss_mb
+        self.hard_timeout = hard_timeout
+        self.on_recycle = on_recycle
+        self.metrics = metrics
+        self.max_recoveries = max_recoveries
+        self.checks = 0
+        self.recycles = 0
+        self.killed = False
+        self._driver = None
+        self._call_started = None
+        self._recoveries = deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        if driver is not None:
+            self._adopt(driver)
+        self._monitor = threading.Thread(target=self._watch, args=(interval,), name="driver-watchdog", daemon=True)
+        self._monitor.start()
+
+    # -------- Driver --------
+    @property
+    def driver(self):
+        if self._driver is None:
+            self._adopt(self.factory())
+        return self._driver
+
+    @property
+    def has_driver(self):
+        return self._driver is not None
+
+    def _adopt(self, driver):
+        if self.hard_timeout:
+            try:
+                driver.set_page_load_timeout(self.hard_timeout)
+            except Exception as e:
+                logging.debug(f"Could not set page load timeout: {e}")
+        execute = driver.execute
+
+        def timed_execute(command, params=None):
+            started = self._call_started = time.monotonic()
+            try:
+                return execute(command, params)
+            finally:
+                self._call_started = None
+                if self.metrics:
+                    self.metrics.observe("visa_webdriver_call_seconds", time.monotonic() - started)
+
+        driver.execute = timed_execute
+        self._driver = driver
+        self.checks = 0
+        self.killed = False
+
+    # -------- Hung calls --------
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            started = self._call_started
+            if started is not None and self.hard_timeout and time.monotonic() - started > self.hard_timeout:
+                logging.error(f"WebDriver call stuck for over {self.hard_timeout:.0f}s; killing the browser")
+                self._kill()
+
+    def _kill(self):
+        with self._lock:
+            driver = self._driver
+            pid = _driver_pid(driver) if driver else None
+            self.killed = True
+            self._call_started = None
+        if pid:
+            kill_process_tree(pid)
+
+    # -------- Recycling --------
+    def rss_bytes(self):
+        pid = _driver_pid(self._driver) if self._driver else None
+        return process_rss_bytes(pid) if pid else None
+
+    def after_check(self, restart=True):
+        """Count a check and recycle the driver if it is due; returns the reason or None.
+
+        With ``restart=False`` a recycled driver is left to be created on next use.
+        """
+        if self._driver is None:
+            return None
+        if self.killed:
+            return self.recycle(f"WebDriver call hung for over {self.hard_timeout:.0f}s", "hung", restart)
+        self.checks += 1
+        rss = self.rss_bytes()
+        if rss is not None and self.metrics:
+            self.metrics.set("visa_driver_rss_bytes", rss)
+        if self.max_checks and self.checks >= self.max_checks:
+            return self.recycle(f"{self.checks} checks", "checks", restart)
+        if self.max_rss_mb and rss is not None and rss > self.max_rss_mb * 1024 * 1024:
+            return self.recycle(f"RSS {rss / 1024 / 1024:.0f} MB > {self.max_rss_mb:.0f} MB", "rss", restart)
+        return None
+
+    def recover(self, error):
+        """Replace the driver after ``error`` if it was a browser failure; False means re-raise."""
+        if not (self.killed or is_driver_failure(error)):
+            return False
+        now = time.monotonic()
+        self._recoveries.append(now)
+        while self._recoveries and now - self._recoveries[0] > 600:
+            self._recoveries.popleft()
+        if len(self._recoveries) > self.max_recoveries:
+            logging.critical(f"Browser failed {len(self._recoveries)} times in 10 minutes; giving up")
+            return False
+        if self.killed:
+            self.recycle(f"WebDriver call hung for over {self.hard_timeout:.0f}s", "hung")
+        else:
+            self.recycle(f"{error.__class__.__name__}: {str(error).strip()[:200]}", "error")
+        return True
+
+    def recycle(self, reason, label="manual", restart=True):
+        """Quit (or kill) the current driver, then start a new one and run ``on_recycle`` if ``restart``."""
+        logging.warning(f"♻️ Recycling browser: {reason}")
+        if self.metrics:
+            self.metrics.inc("visa_driver_recycles_total", {"reason": label})
+        self.recycles += 1
+        self._quit()
+        if restart:
+            driver = self.driver
+            if self.on_recycle:
+                self.on_recycle(driver)
+        return reason
+
+    def _quit(self):
+        driver, self._driver = self._driver, None
+        if driver is None:
+            return
+        pid = _driver_pid(driver)
+        quitter = threading.Thread(target=self._quit_quietly, args=(driver,), daemon=True)
+        quitter.start()
+        quitter.join(min(30, self.hard_timeout or 30))
+        if quitter.is_alive() and pid:
+            logging.warning("driver.quit() hung; killing the browser")
+            kill_process_tree(pid)
+
+    @staticmethod
+    def _quit_quietly(driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"driver.quit() failed: {e}")
+
+    def close(self):
+        self._stop.set()
+        self._quit()
@@ -0,0 +1,947 @@
+"""The single-schedule watcher behind ``visa_checker.py``.
+
+Importing this module starts nothing. The Chrome driver is created on
+first use (or injected), and Selenium itself is only imported when a
+browser is actually needed, so HTTP polling on a cached session, tools
+and tests start in milliseconds::
+
+    python -m appointment_watcher            # same as python src/visa_checker.py
+"""
+import argparse
+import logging
+import os
+import platform
+import subprocess
+import sys
+
+import requests
+from dotenv import load_dotenv
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+from appointment_watcher.calendar_diff import SnapshotCache
+from appointment_watcher.clock import SYSTEM_CLOCK
+from appointment_watcher.config import Config
+from appointment_watcher.control import Control, StatusServer, TelegramCommands
+from appointment_watcher.coordination import LocalCoordinator, SQLiteCoordinator
+from appointment_watcher.diagnostics import Diagnostics
+from appointment_watcher.events import EventLog, NullEventLog, setup_logging
+from appointment_watcher.facilities import FacilityIndex, parse_options, rank_facilities
+from appointment_watcher.history import HistoryStore, months_from_calendar, months_from_dates
+from appointment_watcher.latency import LatencyBudget
+from appointment_watcher.metrics import Metrics
+from appointment_watcher.notify import BackgroundNotifier
+from appointment_watcher.policy import parse_windows
+from appointment_watcher.scan import get_strategy
+from appointment_watcher.scheduler import BUSY, ERROR, FOUND, OK, IntensityProfile, PollScheduler, ReleaseHistory
+from appointment_watcher.session_cache import SessionCache
+from appointment_watcher.session_keeper import SessionKeeper
+from appointment_watcher.watchdog import DriverWatchdog, is_driver_failure
+
+IS_WINDOWS = platform.system() == "Windows"
+IS_MAC = platform.system() == "Darwin"
+
+
+# -------- Keep machine awake --------
+def keep_awake():
+    if IS_WINDOWS:
+        import ctypes
+        ctypes.windll.kernel32.SetThreadExecutionState(0x80000002)
+    elif IS_MAC:
+        # Prevent sleep on Mac using caffeinate (optional, runs in background)
+        subprocess.Popen(["caffeinate", "-dimsu"])  # This will keep the system awake while script runs
+
+
+def hibernate():
+    if IS_WINDOWS:
+        os.system("shutdown /h")  # Windows Hibernate
+    elif IS_MAC:
+        os.system("pmset sleepnow") # On Mac, use pmset to sleep
+
+
+def _browser():
+    # Deferred so that importing the watcher (or polling over HTTP) never loads Selenium
+    from appointment_watcher import browser
+    return browser
+
+
+def _booked_message(earliest_date, facility=None):
+    where = f" in {facility}" if facility else ""
+    return f"✅ Visa slot confirmed for {earliest_date.strftime('%B %d, %Y')} at {earliest_date.strftime('%H:%M')}{where}"
+
+
+class Watcher:
+    """Watch one schedule (browser, HTTP or stay-on-page watch mode) and book the first acceptable slot.
+
+    ``driver`` injects a ready WebDriver; otherwise ``driver_factory`` (by
+    default Chrome built from the config) is called the first time
+    ``self.driver`` is used; a ``DriverWatchdog`` owns it from then on and
+    recycles or kills it when needed. ``events`` receives the structured event
+    stream (see ``events.EventLog``); ``coordinator`` shares polling turns,
+    the request budget and the booking grant with other nodes (see
+    ``coordination``). ``clock`` is the time source of the whole poll loop
+    (see ``clock``; ``simulate`` passes a virtual one).
+    """
+
+    def __init__(self, config, driver=None, driver_factory=None, notifier=None, metrics=None, events=None,
+                 coordinator=None, clock=None):
+        self.config = config
+        self.clock = clock or SYSTEM_CLOCK
+        self.events = events or NullEventLog()
+        self.coordinator = coordinator or LocalCoordinator()
+        # A sweep polls and books across facilities, so its lease and grant cover the whole schedule
+        sweeping = config.sweep_facilities and config.poll_mode == "http"
+        self.lease_key = f"{config.schedule_id}:{'sweep' if sweeping else config.facility_id}"
+        # A schedule holds one appointment, whichever facility it was found at
+        self.booking_key = str(config.schedule_id)
+        self._booking_grant = False
+        self.metrics = metrics or Metrics()
+        self.watchdog = DriverWatchdog(
+            driver_factory or self._create_driver, driver, max_checks=config.driver_max_checks,
+            max_rss_mb=config.driver_max_rss_mb, hard_timeout=config.driver_hard_timeout,
+            on_recycle=self._restore_session, metrics=self.metrics)
+        self.notifier = notifier or BackgroundNotifier(
+            config.telegram_bot_token, config.telegram_chat_id, config.telegram_api_url,
+            on_failure=lambda message: self.metrics.inc("visa_telegram_failures_total"))
+        self.metrics.describe("visa_phase_seconds", "histogram", "Duration of each check phase.")
+        self.metrics.describe("visa_attempts_total", "counter", "Availability checks started.")
+        self.metrics.describe("visa_check_outcomes_total", "counter", "Check results by outcome and failure branch.")
+        self.metrics.describe("visa_busy_total", "counter", "System Busy responses.")
+        self.metrics.describe("visa_session_expired_total", "counter", "Session expiries detected.")
+        self.metrics.describe("visa_telegram_failures_total", "counter", "Telegram alerts that failed to send.")
+        self.metrics.describe("visa_driver_rss_bytes", "gauge", "RSS of chromedriver and its browser processes.")
+        self.metrics.describe("visa_driver_recycles_total", "counter", "Browser restarts by reason (checks, rss, hung, error).")
+        self.metrics.describe("visa_webdriver_call_seconds", "histogram", "Latency of single WebDriver commands.")
+        self.metrics.describe("visa_session_renewals_total", "counter", "Sessions replaced by the keeper, by reason.")
+        self.metrics.describe("visa_session_age_seconds", "gauge", "Age of the session in use.")
+        self.metrics.describe("visa_page_bytes_total", "counter", "Bytes transferred by the appointment page and its requests.")
+        self.metrics.describe("visa_page_load_seconds", "histogram", "Appointment page load time up to DOMContentLoaded.")
+        self.budget = LatencyBudget(config.phase_timeouts, config.check_budget, observer=self._observe_phase)
+        self.history = HistoryStore(config.history_db) if config.history_db else None
+        self.diagnostics = Diagnostics(config.diagnostics_dir, config.diagnostics_max_mb * 1024 * 1024)
+        self.calendar_cache = SnapshotCache()
+        self._pending = {}          # facility -> wanted open days that have not been booked
+        self._retries = {}          # (facility, day) -> (failed bookings, retry at, failure reasons alerted)
+        self._fresh_days = False    # whether this check saw a wanted day open
+        self._found = None          # FOUND or "grant_refused" once a browser check offered wanted days
+        self._requests = 0          # HTTP requests this check sent; charged to both request budgets
+        self.facility_index = FacilityIndex(config.facility_index_path, config.country_code)
+        self._sweep = None
+        self.policy = config.date_policy()
+        self.strategy = get_strategy(config.scan_strategy, config.preferred_month)
+        self.session_cache = SessionCache(config.session_cache_path, config.session_cache_key, clock=self.clock.time)
+        self.sessions = SessionKeeper(
+            config.login_url, config.appointment_url, config.facility_id, config.email, config.password,
+            cache=self.session_cache, refresh_after=config.session_refresh_after,
+            check_interval=config.session_check_interval, standby=config.session_standby, on_renew=self._on_renew,
+            clock=self.clock.time)
+        self._session_generation = 0
+        self.scheduler = PollScheduler(
+            base_delay=config.retry_delay, max_per_hour=config.max_requests_per_hour,
+            profile=IntensityProfile.load(config.poll_profile),
+            history=ReleaseHistory(config.release_history_path) if config.release_history_path else None,
+            clock=self.clock.time)
+        self._cached_session = None
+        self._times_client = None
+        self.control = Control(self.clock)
+        self._control_services = []
+        self._started_at = self.clock.time()
+        self._attempt = 0
+        self._last_check = None
+        self._last_outcome = None
+        self._next_check_at = None
+
+    # -------- Driver --------
+    def _create_driver(self):
+        return _browser().create_driver(self.config.chrome_driver_path, headless=self.config.headless,
+                                        lean=self.config.browser_profile == "lean")
+
+    @property
+    def driver(self):
+        return self.watchdog.driver
+
+    @property
+    def has_driver(self):
+        return self.watchdog.has_driver
+
+    def _restore_session(self, driver):
+        """Log a freshly recycled browser back in, from the session cache if it is still valid."""
+        entry = self.sessions.current or self.session_cache.load()
+        if self.session_cache.is_alive(entry, self.config.appointment_url, self.config.facility_id):
+            _browser().restore_cookies(driver, entry["cookies"], self.config.appointment_url)
+            if "sign_in" not in driver.current_url:
+                self._session_generation = self.sessions.generation
+                self.events.emit("session_restored", age_s=round(self.clock.time() - entry["saved_at"]))
+                return
+        self.login()
+
+    # -------- Check Session --------
+    def check_if_session_expired(self):
+        current_url = self.driver.current_url
+        if "sign_in" in current_url or "login" in current_url:
+            logging.warning("Session expired or redirected to login.")
+            self.metrics.inc("visa_session_expired_total")
+            self.events.emit("session_expired", mode="browser")
+            self.send_telegram_alert("🔐 Session expired. Re-logging in.")
+            self._replace_session()
+
+    # -------- Send Telegram Alert --------
+    def send_telegram_alert(self, message, key=None):
+        self.notifier(message, key)   # queued; never waits on the Telegram API
+
+    # -------- Metrics --------
+    def _observe_phase(self, phase, seconds):
+        self.metrics.observe("visa_phase_seconds", seconds, {"phase": phase})
+        self.events.emit("phase", phase=phase, seconds=round(seconds, 4))
+
+    def record_outcome(self, outcome, reason=None):
+        self._last_outcome = reason or outcome
+        requests = max(1, self._requests)
+        if requests > 1:
+            # _wait_for_turn took one request from the shared budget; a sweep and times lookups send more
+            self.coordinator.take_request(requests - 1)
+        # Days retried while they stay open are not new releases for the scheduler's release history
+        self.scheduler.record(OK if outcome == FOUND and not self._fresh_days else outcome, requests)
+        self.events.emit("outcome", outcome=outcome, reason=reason or outcome)
+        self.metrics.inc("visa_check_outcomes_total", {"outcome": outcome, "reason": reason or outcome})
+        if outcome == BUSY:
+            self.metrics.inc("visa_busy_total")
+
+    def export_metrics(self):
+        age = self.sessions.age()
+        if age is not None:
+            self.metrics.set("visa_session_age_seconds", round(age))
+        try:
+            if self.config.metrics_prom_path:
+                self.metrics.write_prometheus(self.config.metrics_prom_path)
+            if self.config.metrics_jsonl_path:
+                self.metrics.append_jsonl(self.config.metrics_jsonl_path)
+        except OSError as e:
+            logging.error(f"Failed to export metrics: {e}")
+
+    def record_page_stats(self):
+        """Report what the page of the previous check cost, including its calendar requests."""
+        stats = _browser().page_stats(self.driver)
+        if not stats:
+            return
+        self.metrics.inc("visa_page_bytes_total", stats["bytes"])
+        self.events.emit("page", **stats)
+        if stats["load_ms"] is not None:
+            self.metrics.observe("visa_page_load_seconds", stats["load_ms"] / 1000)
+        logging.info(f"Page: {stats['bytes'] / 1024:.0f} KB in {stats['requests']} requests, "
+                     f"loaded in {stats['load_ms'] or 0:.0f} ms")
+
+    # -------- Control plane --------
+    def start_control(self):
+        """Start the status endpoint and the Telegram command listener, if configured."""
+        if self.config.control_port:
+            self._control_services.append(StatusServer(
+                self.status, self.metrics.to_prometheus, self.config.control_host, self.config.control_port).start())
+        if self.config.telegram_commands and self.config.telegram_bot_token:
+            self._control_services.append(TelegramCommands(
+                self.config.telegram_bot_token, self.config.telegram_chat_id, self.handle_command,
+                self.send_telegram_alert, self.config.telegram_api_url).start())
+
+    def status(self):
+        now = self.clock.time()
+        return {
+            "node": self.coordinator.node_id,
+            "mode": self.config.poll_mode,
+            "facility": self.config.facility_id,
+            "sweep": [name for _, name in self._sweep] if self._sweep else None,
+            "paused": self.control.paused,
+            "uptime_s": round(now - self._started_at),
+            "attempt": self._attempt,
+            "last_check_s_ago": round(now - self._last_check) if self._last_check else None,
+            "last_outcome": self._last_outcome,
+            "next_check_in_s": max(0, round(self._next_check_at - now)) if self._next_check_at else None,
+            "policy": self.policy.describe(),
+            "intensity": round(self.scheduler.intensity(), 2),
+            "session_age_s": round(self.sessions.age()) if self.sessions.age() is not None else None,
+            "driver": self.has_driver,
+            "driver_recycles": self.watchdog.recycles,
+        }
+
+    def handle_command(self, command, args=""):
+        """Run an operator command (``/status``, ``/pause`` ...) and return the reply text."""
+        if command == "status":
+            return "\n".join(f"{key}: {value}" for key, value in self.status().items())
+        if command == "pause":
+            self.control.pause()
+            return "⏸️ Pausing after the current check."
+        if command == "resume":
+            self.control.resume()
+            return "▶️ Resuming."
+        if command == "scan_now":
+            self.control.scan_now()
+            return "🔎 Checking now."
+        if command == "window":
+            if args:
+                self.config.date_windows = [] if args == "reset" else parse_windows(args)
+                self.policy = self.config.date_policy()
+                self.calendar_cache = SnapshotCache()   # days outside the old window may now be wanted
+                self._pending = {}
+                self._retries = {}
+            return f"📅 Date policy: {self.policy.describe()}"
+        if command == "intensity":
+            if args:
+                self.scheduler.override = None if args == "auto" else float(args)
+            return f"⏱️ Intensity {self.scheduler.intensity():.2f} (override: {self.scheduler.override or 'none'})"
+        return "Commands: /status /pause /resume /scan_now /window [SPEC|reset] /intensity [X|auto]"
+
+    def _begin_check(self, attempt):
+        self._attempt = attempt
+        self._last_check = self.clock.time()
+        self._next_check_at = None
+        self._fresh_days = False
+        self._found = None
+        self._requests = 0
+        self.events.emit("check", attempt=attempt, mode=self.config.poll_mode)
+
+    def _wait(self, delay):
+        """Sleep until the next check; cut short by /scan_now and held while paused."""
+        self._next_check_at = self.clock.time() + delay
+        # Paused nodes give their polling turn to the others
+        self.control.sleep(delay, on_pause=lambda: self.coordinator.release_poll(self.lease_key))
+        self._next_check_at = None
+
+    # -------- Login Session --------
+    def login(self):
+        keep_awake()
+        _browser().login(self.driver, self.config.email, self.config.password, self.config.login_url,
+                         self.send_telegram_alert, LatencyBudget(self.config.phase_timeouts, self.config.check_budget))
+        ok = "sign_in" not in self.driver.current_url
+        self.events.emit("login", ok=ok)
+        if ok:
+            self.sessions.adopt(self.session_cache.save_from_driver(self.driver))
+            self._session_generation = self.sessions.generation
+
+    # -------- Session renewal --------
+    def _on_renew(self, reason, entry):
+        # Runs on the keeper's thread: only count it; the poller switches over at its next check
+        self.metrics.inc("visa_session_renewals_total", {"reason": reason})
+        self.events.emit("session_renewed", reason=reason)
+
+    def _sync_session(self):
+        """Return the session the keeper renewed in the background, or None if the current one is still in use."""
+        if self._session_generation == self.sessions.generation:
+            return None
+        self._session_generation = self.sessions.generation
+        entry = self.sessions.current
+        if self.has_driver:
+            _browser().restore_cookies(self.driver, entry["cookies"])
+        return entry
+
+    def _replace_session(self):
+        """Swap in the standby (or a fresh HTTP sign-in) for a dead session; a browser login is the last resort.
+
+        Returns the new entry, or None after a browser login.
+        """
+        if self.sessions.take_over():
+            return self._sync_session()
+        self.login()
+        return None
+
+    # -------- Restore cached session --------
+    def restore_or_login(self):
+        entry = self.session_cache.load()
+        if self.session_cache.is_alive(entry, self.config.appointment_url, self.config.facility_id):
+            keep_awake()
+            self._cached_session = entry
+            self.sessions.adopt(entry)
+            self._session_generation = self.sessions.generation
+            if self.config.poll_mode != "http":
+                # HTTP polling rides on the cached cookies; the browser waits until there is something to book
+                _browser().restore_cookies(self.driver, entry["cookies"], self.config.appointment_url)
+            logging.info("Skipped login using cached session.")
+            self.events.emit("session_restored", age_s=round(self.clock.time() - entry["saved_at"]))
+            return
+        self.login()
+
+    # -------Select location from dropdown-------
+    def select_location(self, facility=None):
+        """Select ``facility`` (an id or name; default the configured one) by its option value."""
+        _browser().select_location(self.driver, facility or self.config.facility_name, self.budget, self.facility_index)
+
+    # --------Click to open the date picker-----
+    def open_calendar(self):
+        _browser().open_calendar(self.driver, self.budget)
+
+    # --------Fetch Earliest Avail date-----
+    def is_wanted_month(self, month):
+        return self.policy.accepts_month(month.year, month.month, self.clock.today())
+
+    def is_wanted_date(self, date):
+        return self.policy.accepts(date, self.clock.today())
+
+    def get_earliest_available_date(self, attempt=0):
+        scan = self.policy.scan_range(self.clock.today())
+        if scan is None:
+            logging.warning(f"No acceptable dates left under the date policy ({self.policy.describe()})")
+            return None
+        start, months, skip = scan
+        if self.config.partial_rescan:
+            skip = skip + list(self.calendar_cache.months_to_skip(self.config.facility_id, attempt))
+        # Reading starts at the first acceptable month, so earlier months are never paged through
+        earliest_date = None
+        try:
+            earliest_date = _browser().book_earliest(
+                self.driver, self.is_wanted_month, self.send_telegram_alert, months=months, budget=self.budget,
+                on_scan=self.on_calendar_scan, skip=skip, start=start, strategy=self.strategy,
+                is_wanted_date=self.is_wanted_date, **self._booking_options(self._prefetch_times))
+        finally:
+            self._release_booking(earliest_date)
+        return earliest_date
+
+    def _browser_broken(self, error):
+        """True if ``error`` needs a new browser (``run`` recycles it); False for a page-level failure."""
+        return self.watchdog.killed or is_driver_failure(error)
+
+    # -------- Coordination --------
+    def _wait_for_turn(self):
+        """Block until this node holds the polling lease and a request from the shared budget.
+
+        Returns False once another node has booked this schedule.
+        """
+        while self.coordinator.acquire_poll(self.lease_key) is None:
+            if self.coordinator.is_booked(self.booking_key):
+                return False
+            self.clock.sleep(min(self.config.retry_delay, self.config.lease_seconds))
+        delay = self.coordinator.take_request()
+        if delay:
+            logging.info(f"Shared request budget exhausted; waiting {delay:.1f}s")
+            self.clock.sleep(delay)
+        return not self.coordinator.is_booked(self.booking_key)
+
+    def _acquire_booking(self):
+        self._booking_grant = self.coordinator.acquire_booking(self.booking_key)
+        if not self._booking_grant:
+            # The days stay pending (see apply_scan): if the holder gives the grant back
+            # without booking, this node offers them again on its next check
+            logging.info("Another node holds the booking grant; not booking.")
+        self.events.emit("booking_grant", granted=self._booking_grant, node=self.coordinator.node_id)
+        return self._booking_grant
+
+    def _release_booking(self, earliest_date):
+        if self._booking_grant:
+            self.coordinator.release_booking(self.booking_key, booked=bool(earliest_date) and not self.config.dry_run)
+            self._booking_grant = False
+
+    # -------- Booking --------
+    def _booking_options(self, times_for, facility_id=None):
+        return {"confirm": not self.config.dry_run,
+                "times_for": times_for if self.config.prefetch_times else None,
+                "attempt_timeout": self.config.booking_attempt_timeout,
+                "max_attempts": self.config.booking_max_attempts,
+                "diagnostics": self.diagnostics,
+                "on_failure": lambda day, reason: self._day_failed(day, reason, facility_id)}
+
+    def _prefetch_times(self, day):
+        # Runs on the booking engine's worker thread; only the HTTP client is touched here
+        client = self._times_client
+        if client:
+            self._requests += 1
+        return client.get_available_times(self.config.facility_id, day.strftime("%Y-%m-%d")) if client else None
+
+    # -------- Calendar changes --------
+    def apply_scan(self, months, complete=False, facility_id=None):
+        """Record a scan and return the wanted open days that are still to be booked, earliest first.
+
+        Only changes are logged, so a day that stays open is announced once,
+        but it stays pending until it is booked or closes: an attempt that
+        timed out, a refused grant or a day shown without times must not
+        lose it. A day whose booking failed is offered again only after a
+        back-off (see ``_day_failed``).
+        """
+        facility_id = facility_id or self.config.facility_id
+        if self.history:
+            self.history.record(facility_id, months, complete=complete, ts=self.clock.time())
+        diff = self.calendar_cache.update(facility_id, months, complete=complete)
+        if diff:
+            logging.info(f"Calendar changed ({self.facility_index.name(facility_id)}): {diff.summary()}")
+            self.events.emit("calendar_diff", facility=facility_id,
+                             opened=[f"{d:%Y-%m-%d}" for d in diff.opened], closed=[f"{d:%Y-%m-%d}" for d in diff.closed])
+        opened = {d for d in diff.opened if self.is_wanted_date(d)}
+        self._fresh_days = self._fresh_days or bool(opened)
+        pending = (self._pending.get(facility_id, set()) - set(diff.closed)) | opened
+        self._pending[facility_id] = {d for d in pending if self.is_wanted_date(d)}
+        self._retries = {(f, d): retry for (f, d), retry in self._retries.items()
+                         if f != facility_id or d in self._pending[facility_id]}
+        now = self.clock.time()
+        return sorted(d for d in self._pending[facility_id] if self._retries.get((facility_id, d), (0, 0))[1] <= now)
+
+    def _day_failed(self, day, reason, facility_id=None):
+        """Back off a pending day that could not be booked; False if ``reason`` was already reported for it."""
+        key = (facility_id or self.config.facility_id, day.replace(hour=0, minute=0, second=0, microsecond=0))
+        failures, _, reported = self._retries.get(key, (0, 0, frozenset()))
+        failures += 1
+        delay = min(1800, self.config.retry_delay * 2 ** (failures - 1))
+        self._retries[key] = (failures, self.clock.time() + delay, reported | {reason})
+        logging.info(f"Could not book {day:%Y-%m-%d} ({reason}); offering it again in {delay:.0f}s")
+        return reason not in reported
+
+    def on_calendar_scan(self, months):
+        opened = self.apply_scan(months_from_calendar(months))
+        if opened and not self._acquire_booking():
+            self._found = "grant_refused"
+            return []
+        if opened:
+            self._found = FOUND
+        if len(opened) > 1 and self.config.prefetch_times:
+            # Several candidates: give the booking engine an HTTP client on the page's session to prefetch times
+            if self._times_client:
+                self._times_client.close()
+            self._times_client = AISClient.from_driver(self.driver, self.config.appointment_url, timeout=2)
+        return opened
+
+    def _heartbeat(self, attempt):
+        self.record_outcome(OK)
+        logging.info(f"No available dates within {self.policy.describe()}")
+        if attempt % 30 == 0:
+            attempt_msg = f"🔄 Attempt #{attempt}: No Earliest dates Avail. Still checking for visa slots..."
+            self.send_telegram_alert(attempt_msg, key="heartbeat")
+            logging.info(attempt_msg)
+
+    def _booked(self, earliest_date, facility_id=None):
+        self.record_outcome(FOUND)
+        facility_id = facility_id or self.config.facility_id
+        self._pending.get(facility_id, set()).discard(earliest_date.replace(hour=0, minute=0, second=0, microsecond=0))
+        msg = _booked_message(earliest_date, self.facility_index.name(facility_id) if self._sweep else None)
+        self.events.emit("booked", slot=f"{earliest_date:%Y-%m-%d %H:%M}", facility=facility_id,
+                         dry_run=self.config.dry_run)
+        self.send_telegram_alert(msg)
+        logging.info(msg)
+        logging.info("Exiting program after successful booking.")
+        return earliest_date
+
+    # -------- Browser loop --------
+    def check_visa_availability(self):
+        """Check through the appointment page until a slot is booked (returned) or the machine hibernates (None)."""
+        from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+        attempt = 1
+
+        while True:
+            if not self._wait_for_turn():
+                logging.info("Another node booked this schedule; stopping.")
+                return None
+            self.watchdog.after_check()
+            self._sync_session()
+            self.record_page_stats()
+            self.export_metrics()
+            self.metrics.inc("visa_attempts_total")
+            self._begin_check(attempt)
+            self.budget.start()
+            try:
+                _browser().open_appointment_page(self.driver, self.config.appointment_url, self.budget)
+            except WebDriverException as e:
+                if self._browser_broken(e):
+                    raise
+                logging.warning(f"Appointment page did not load: {e.__class__.__name__}")
+                attempt += 1
+                self.record_outcome(ERROR, "page_not_loaded")
+                self._wait(self.scheduler.next_delay())
+                continue
+
+            logging.info(f"Attempt {attempt}: Checking appointment page...")
+
+            # --- Select location ---
+            try:
+                self.select_location()
+                self.sessions.mark_valid()
+                logging.info(f"Selected {self.config.facility_name} in dropdown.")
+            except NoSuchElementException:
+                logging.warning("Webpage did not load during retry")
+                attempt += 1
+                self.record_outcome(ERROR, "page_not_loaded")
+                self._wait(self.scheduler.next_delay())
+                self.check_if_session_expired()
+                continue
+            except Exception as e:
+                if self._browser_broken(e):
+                    raise
+                logging.error(f"Failed to select {self.config.facility_name}: {e}")
+                attempt += 1
+                self.record_outcome(ERROR, "location")
+                self._wait(self.scheduler.next_delay())
+                self.check_if_session_expired()      # future - this is not req
+                continue
+
+            # --- open calendar widget ---
+            try:
+                self.open_calendar()
+                logging.info("Opened calendar widget.")
+            except Exception as e:
+                if self._browser_broken(e):
+                    raise
+                logging.error("Failed to open calendar / System Busy")
+                self.record_outcome(BUSY, "calendar")
+                # Outside the profile's release windows, the busy response that follows more than
+                # HIBERNATE_AFTER_BUSY others (out-of-window ones only) hibernates the machine
+                hibernate_after = self.config.hibernate_after_busy
+                busy = self.scheduler.busy_outside_window
+                if hibernate_after and busy > hibernate_after + 1 and not self.scheduler.in_window():
+                    msg = f"🌙 System busy {busy} times in a row outside the release windows. Exiting and Hibernating machine."
+                    self.send_telegram_alert(msg)
+                    logging.critical(msg)
+                    self.notifier.flush(timeout=5)
+                    hibernate()
+                    return None
+                attempt += 1
+                self._wait(self.scheduler.next_delay())  # backs off while the System is Busy
+                continue
+
+            # --- Get and select earliest available appointment ---
+            try:
+                earliest_date = self.get_earliest_available_date(attempt)
+            except WebDriverException as e:
+                if self._browser_broken(e):
+                    raise
+                logging.error(f"Reading the calendar failed: {e.__class__.__name__}: {e}")
+                attempt += 1
+                self.record_outcome(ERROR, "calendar_read")
+                self._wait(self.scheduler.next_delay())
+                continue
+            if earliest_date:
+                return self._booked(earliest_date)
+            if self._found:
+                # Wanted days were open but not booked: a release, not an empty check
+                self.record_outcome(FOUND, self._found)
+            else:
+                self._heartbeat(attempt)
+
+            # 🔄 Retry loop
+            delay = self.scheduler.next_delay()
+            logging.info(f"Waiting {delay:.0f}s before next retry...\n")
+            attempt += 1
+            self._wait(delay)
+
+    # -------- HTTP fast path --------
+    def has_time_slots(self, client, date, facility_id=None):
+        """Fetch the times for an open wanted day; a day AIS shows without any slot is skipped this time."""
+        facility_id = facility_id or self.config.facility_id
+        key = date.strftime("%Y-%m-%d")
+        self._requests += 1
+        try:
+            times = client.get_available_times(facility_id, key)
+        except (SessionExpired, SystemBusy, requests.RequestException) as e:
+            logging.warning(f"Could not fetch times for {key}: {e}")
+            return True   # let the browser find out
+        if self.history:
+            self.history.record_times(facility_id, key, times, ts=self.clock.time())
+        diff = self.calendar_cache.update_times(facility_id, key, times)
+        if diff:
+            logging.info(f"Calendar changed: {diff.summary()}")
+        return bool(times)
+
+    def _client_for(self, entry):
+        return AISClient.from_cookies(entry["cookies"], self.config.appointment_url, entry.get("csrf_token"),
+                                      entry.get("user_agent"))
+
+    def _http_client(self):
+        if self._cached_session:
+            entry, self._cached_session = self._cached_session, None
+            return self._client_for(entry)
+        self.driver.get(self.config.appointment_url)
+        return AISClient.from_driver(self.driver, self.config.appointment_url)
+
+    def _hand_over(self, client):
+        """Bring the browser onto the appointment page with the poller's session."""
+        if not self.has_driver:
+            _browser().restore_cookies(self.driver, client.session.cookies.get_dict(), self.config.appointment_url)
+            if "sign_in" in self.driver.current_url:
+                self.login()
+        _browser().open_appointment_page(self.driver, self.config.appointment_url, self.budget)
+
+    # -------- Stay-on-page watch --------
+    def _load_watch(self):
+        """Full load of the appointment page, facility selected, with the in-page hooks installed."""
+        from appointment_watcher.watch import PageWatch
+
+        _browser().open_appointment_page(self.driver, self.config.appointment_url, self.budget)
+        self.select_location()
+        watch = PageWatch(self.driver, self.config.facility_id)
+        watch.install()
+        return watch
+
+    def check_visa_availability_watch(self):
+        """Keep the appointment page open and let it re-fetch availability in place; reload only as a safety net."""
+        from selenium.common.exceptions import WebDriverException
+
+        attempt = 1
+        watch = None
+        loaded_at = 0.0
+
+        while True:
+            if not self._wait_for_turn():
+                logging.info("Another node booked this schedule; stopping.")
+                return None
+            self.watchdog.after_check()
+            if self._sync_session() or (watch and watch.driver is not self.driver):
+                watch = None   # new cookies or a new browser: the hooked page is gone
+            self.export_metrics()
+            self.metrics.inc("visa_attempts_total")
+            self._begin_check(attempt)
+            self.budget.start()
+            try:
+                if watch is None or self.clock.time() - loaded_at >= self.config.watch_reload_seconds:
+                    logging.info(f"Attempt {attempt}: Loading appointment page (watch mode)...")
+                    watch = self._load_watch()
+                    loaded_at = self.clock.time()
+                else:
+                    logging.info(f"Attempt {attempt}: Refreshing availability in page...")
+                with self.budget.phase("poll") as timeout:
+                    result = watch.refresh(timeout)
+            except WebDriverException as e:
+                if self._browser_broken(e):
+                    raise
+                logging.warning(f"Webpage did not load during retry: {e.__class__.__name__}")
+                watch = None
+                attempt += 1
+                self.record_outcome(ERROR, "page_not_loaded")
+                self.check_if_session_expired()
+                self._wait(self.scheduler.next_delay())
+                continue
+
+            if result is None:
+                logging.warning("Watched page navigated away; reloading.")
+                watch = None
+                attempt += 1
+                self.record_outcome(ERROR, "page_lost")
+                self.check_if_session_expired()
+                self._wait(self.scheduler.next_delay())
+                continue
+            if result.busy:
+                logging.error("In-page refresh failed / System Busy")
+                self.record_outcome(BUSY, "watch")
+                attempt += 1
+                self._wait(self.scheduler.next_delay())
+                continue
+            self.sessions.mark_valid()
+
+            wanted = self.apply_scan(months_from_dates(result.days), complete=True)
+            if wanted and self._acquire_booking():
+                logging.info(f"Page shows {len(wanted)} wanted date(s), earliest {wanted[0]:%Y-%m-%d}. Booking.")
+                earliest_date = None
+                try:
+                    self.open_calendar()
+                    earliest_date = _browser().book_dates(self.driver, self.strategy(wanted), self.send_telegram_alert,
+                                                          self.budget, **self._booking_options(None))
+                except WebDriverException as e:
+                    if self._browser_broken(e):
+                        raise
+                    logging.error(f"Booking from the watched page failed: {e.__class__.__name__}: {e}")
+                    watch = None   # the page is in an unknown state after a failed booking
+                finally:
+                    self._release_booking(earliest_date)
+                if earliest_date:
+                    return self._booked(earliest_date)
+                self.record_outcome(FOUND)
+            elif wanted:
+                self.record_outcome(FOUND, "grant_refused")
+            else:
+                self._heartbeat(attempt)
+
+            attempt += 1
+            self._wait(self.scheduler.next_delay())
+
+    def _facilities(self, client):
+        """``[(id, name), ...]`` polled over HTTP: ``SWEEP_FACILITIES``, or just the configured facility."""
+        if not self.config.sweep_facilities:
+            return [(self.config.facility_id, self.config.facility_name)]
+        if self._sweep is None:
+            if not all(self.facility_index.value(name) for name in self.config.sweep_facilities):
+                # The appointment page lists every facility; one GET on the session fills the index
+                self._requests += 1
+                page = client.session.get(self.config.appointment_url, timeout=client.timeout)
+                self.facility_index.update(parse_options(page.text))
+            resolved = self.facility_index.resolve(self.config.sweep_facilities)
+            if not resolved:
+                # Not cached: the index may fill on a later check (the page can come back without options)
+                logging.warning("No SWEEP_FACILITIES resolved; polling the configured facility this time.")
+                return [(self.config.facility_id, self.config.facility_name)]
+            self._sweep = resolved
+            logging.info(f"Sweeping {len(self._sweep)} facilities: {', '.join(name for _, name in self._sweep)}")
+        return self._sweep
+
+    def _poll_days(self, client):
+        """``{facility id: [YYYY-MM-DD, ...]}`` for every polled facility; raises only if none answered."""
+        found, error = {}, None
+        for facility_id, name in self._facilities(client):
+            self._requests += 1
+            try:
+                found[facility_id] = client.get_available_days(facility_id)
+            except (SystemBusy, requests.RequestException) as e:
+                logging.warning(f"Polling {name} failed: {e}")
+                error = e
+        if not found:
+            raise error
+        return found
+
+    def _book_ranked(self, client, candidates):
+        """Book at the facility with the earliest wanted date, falling back to the next; returns (datetime, facility)."""
+        from selenium.common.exceptions import WebDriverException
+
+        self.budget.start()
+        try:
+            self._hand_over(client)
+        except WebDriverException as e:
+            if self._browser_broken(e):
+                raise
+            logging.error(f"Could not open the appointment page to book: {e.__class__.__name__}: {e}")
+            return None, None
+        for i, (facility_id, wanted) in enumerate(candidates):
+            if i:
+                self.budget.start()   # a fallback facility gets a fresh booking budget
+            times_for = lambda day, f=facility_id: client.get_available_times(f, day.strftime("%Y-%m-%d"))
+            try:
+                self.select_location(facility_id)
+                self.open_calendar()
+                earliest_date = _browser().book_dates(self.driver, self.strategy(wanted), self.send_telegram_alert,
+                                                      self.budget, **self._booking_options(times_for, facility_id))
+            except WebDriverException as e:
+                if self._browser_broken(e):
+                    raise
+                logging.error(f"Booking at {self.facility_index.name(facility_id)} failed: {e.__class__.__name__}: {e}")
+                continue
+            if earliest_date:
+                return earliest_date, facility_id
+        return None, None
+
+    def check_visa_availability_http(self):
+        """Polls the days JSON endpoint with the session's cookies; the driver is only used to book."""
+        attempt = 1
+        client = self._http_client()
+
+        while True:
+            if not self._wait_for_turn():
+                logging.info("Another node booked this schedule; stopping.")
+                return None
+            self.watchdog.after_check(restart=False)   # the browser is only needed again to book
+            renewed = self._sync_session()
+            if renewed:
+                client.close()
+                client = self._client_for(renewed)
+            self.export_metrics()
+            self.metrics.inc("visa_attempts_total")
+            self._begin_check(attempt)
+            logging.info(f"Attempt {attempt}: Polling available days (http)...")
+            try:
+                self.budget.start()
+                with self.budget.phase("poll"):
+                    found = self._poll_days(client)
+                self.sessions.mark_valid()
+            except SessionExpired as e:
+                logging.warning(f"Session expired during http poll: {e}")
+                self.metrics.inc("visa_session_expired_total")
+                self.events.emit("session_expired", mode="http")
+                self.send_telegram_alert("🔐 Session expired. Re-logging in.")
+                client.close()
+                entry = self._replace_session()
+                client = self._client_for(entry) if entry else self._http_client()
+                # A login that keeps failing (bad credentials, throttling) must not be retried back to back
+                self.record_outcome(ERROR, "session_expired")
+                attempt += 1
+                self._wait(self.scheduler.next_delay())
+                continue
+            except (SystemBusy, requests.RequestException) as e:
+                logging.error(f"Http poll failed / System Busy: {e}")
+                if isinstance(e, SystemBusy):
+                    self.record_outcome(BUSY, "poll")
+                else:
+                    self.record_outcome(ERROR, "poll")
+                attempt += 1
+                self._wait(self.scheduler.next_delay())
+                continue
+
+            candidates = rank_facilities({
+                facility_id: [d for d in self.apply_scan(months_from_dates(days), complete=True, facility_id=facility_id)
+                              if self.has_time_slots(client, d, facility_id)]
+                for facility_id, days in found.items()})
+            if candidates and not self._acquire_booking():
+                self.record_outcome(FOUND, "grant_refused")
+            elif candidates:
+                ranking = ", ".join(f"{self.facility_index.name(f)} {min(d):%Y-%m-%d}" for f, d in candidates)
+                logging.info(f"Http poll found wanted date(s): {ranking}. Handing over to browser.")
+                earliest_date = None
+                try:
+                    earliest_date, facility_id = self._book_ranked(client, candidates)
+                finally:
+                    self._release_booking(earliest_date)
+                if earliest_date:
+                    return self._booked(earliest_date, facility_id)
+                self.record_outcome(FOUND)
+                if self.has_driver:
+                    # The browser page may have rotated the CSRF token
+                    client.close()
+                    client = AISClient.from_driver(self.driver, self.config.appointment_url)
+                    self._session_generation = self.sessions.generation
+            else:
+                self._heartbeat(attempt)
+
+            attempt += 1
+            self._wait(self.scheduler.next_delay())
+
+    # -------- Run --------
+    def run(self):
+        """Log in (or reuse the cached session) and watch until a slot is booked; returns its datetime or None."""
+        logging.info(f"Date policy: {self.policy.describe()}; scan strategy: {self.config.scan_strategy}"
+                     f"{' (dry run)' if self.config.dry_run else ''}")
+        self.events.emit("run_start", mode=self.config.poll_mode, facility=self.config.facility_id,
+                         policy=self.policy.describe(), strategy=self.config.scan_strategy, dry_run=self.config.dry_run)
+        self.start_control()
+        self.restore_or_login()
+        self.sessions.start()
+        loop = {"http": self.check_visa_availability_http,
+                "watch": self.check_visa_availability_watch}.get(self.config.poll_mode, self.check_visa_availability)
+        while True:
+            try:
+                return loop()
+            except Exception as e:
+                # A dead or hung browser is replaced (and logged back in) and the loop starts over
+                if not self.watchdog.recover(e):
+                    raise
+                self.events.emit("driver_recycled", error=e.__class__.__name__, recycles=self.watchdog.recycles)
+
+    def close(self, final_message="⚠️ Script is Exiting Program"):
+        self.events.emit("run_end")
+        for service in self._control_services:
+            service.stop()
+        self.sessions.stop()
+        self.coordinator.release_poll(self.lease_key)
+        self.coordinator.close()
+        if self.history:
+            self.history.close()
+        if self._times_client:
+            self._times_client.close()
+        self.diagnostics.close()
+        self.notifier.close(final_message)
+        self.watchdog.close()
+
+
+#------- Main Loop --------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Watch a visa appointment schedule and book the earliest acceptable slot.")
+    parser.add_argument("--env-file", help="settings file (default: the nearest .env)")
+    args = parser.parse_args(argv)
+
+    load_dotenv(args.env_file)
+    config = Config.from_env()
+    events = EventLog(config.event_log_dir, max_bytes=config.event_log_max_mb * 1024 * 1024) \
+        if config.event_log_dir else NullEventLog()
+    listener = setup_logging(config.log_dir, events)
+    coordinator = SQLiteCoordinator(config.coordination_db, config.node_id, config.lease_seconds,
+                                    config.cluster_requests_per_hour) if config.coordination_db else None
+    watcher = Watcher(config, events=events, coordinator=coordinator)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        logging.warning("Stopped by user.")
+    finally:
+        watcher.close()
+        listener.stop()
+        events.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import pytest
+
+from appointment_watcher.ais_api import AISClient, SessionExpired, SystemBusy
+from appointment_watcher.mock_ais import MockAIS
+
+EMAIL = "user@example.com"
+PASSWORD = "secret"
+
+
+@pytest.fixture
+def mock():
+    slots = {"94": {"2026-11-16": ["09:00", "08:15"], "2026-12-01": ["10:30"]}, "92": {}}
+    with MockAIS(slots=slots, email=EMAIL, password=PASSWORD) as server:
+        yield server
+
+
+@pytest.fixture
+def client(mock):
+    client = AISClient.sign_in(f"{mock.base_url}/en-ca/niv/users/sign_in", EMAIL, PASSWORD,
+                               mock.appointment_url(), timeout=5)
+    yield client
+    client.close()
+
+
+def test_sign_in_reads_csrf_token(client):
+    assert client.csrf_token == "mock-csrf-token"
+
+
+def test_sign_in_with_wrong_password_is_rejected(mock):
+    with pytest.raises(SessionExpired):
+        AISClient.sign_in(f"{mock.base_url}/en-ca/niv/users/sign_in", EMAIL, "wrong", mock.appointment_url(), timeout=5)
+
+
+def test_available_days(client):
+    assert client.get_available_days("94") == ["2026-11-16", "2026-12-01"]
+    assert client.get_available_days("92") == []
+
+
+def test_available_times(client):
+    assert client.get_available_times("94", "2026-11-16") == ["09:00", "08:15"]
+    assert client.get_available_times("94", "2026-11-17") == []
+
+
+def test_expired_session(mock, client):
+    mock.expire_session()
+    with pytest.raises(SessionExpired):
+        client.get_available_days("94")
+
+
+def test_busy_page_served_as_200(mock, client):
+    mock.busy = True
+    with pytest.raises(SystemBusy):
+        client.get_available_days("94")
+    mock.busy = False
+    assert client.get_available_days("94")
+
+
+def test_cookie_round_trip(mock, client):
+    copy = AISClient.from_cookies(client.cookie_dicts(), mock.appointment_url(), client.csrf_token, timeout=5)
+    try:
+        assert copy.get_available_days("94") == ["2026-11-16", "2026-12-01"]
+    finally:
+        copy.close()
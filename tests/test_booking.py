@@ -0,0 +1,145 @@
+from datetime import datetime
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+from selenium.webdriver.common.by import By
+
+from appointment_watcher import booking
+from appointment_watcher.booking import BookingEngine
+
+
+class FakePage:
+    """Just enough of a driver on the appointment page: a datepicker, the time select and the confirm button."""
+
+    def __init__(self, slots, gone=(), clickable=True):
+        self.slots = slots              # datetime -> ["HH:MM", ...]
+        self.gone = set(gone)           # times whose option goes stale when selected
+        self.clickable = clickable
+        self.day = None
+        self.time = None
+        self.confirmed = []
+
+    def execute_script(self, script, *args):
+        if script == booking._TIME_OPTIONS_JS:
+            return [[t, t] for t in self.slots.get(self.day, [])]
+        day = datetime(*args[1:4])      # select_day(driver, date): input id, year, month, day
+        if day not in self.slots:
+            return False
+        self.day = day
+        return True
+
+    def find_element(self, by, value):
+        if by == By.ID:
+            return self
+        if not self.clickable:
+            raise NoSuchElementException(value)
+        return FakeButton(self)
+
+
+class FakeButton:
+    def __init__(self, page):
+        self.page = page
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+    def click(self):
+        self.page.confirmed.append((self.page.day, self.page.time))
+
+
+class FakeSelect:
+    def __init__(self, page):
+        self.page = page
+
+    def select_by_value(self, value):
+        if value in self.page.gone:
+            raise StaleElementReferenceException(value)
+        self.page.time = value
+
+
+class FakeDiagnostics:
+    def __init__(self):
+        self.captured = []
+
+    def capture(self, driver, reason):
+        self.captured.append(reason)
+
+
+@pytest.fixture(autouse=True)
+def fake_select(monkeypatch):
+    monkeypatch.setattr(booking, "Select", FakeSelect)
+
+
+NOV_16 = datetime(2026, 11, 16)
+DEC_1 = datetime(2026, 12, 1)
+
+
+def test_books_earliest_time_of_first_date():
+    page = FakePage({NOV_16: ["09:00", "08:15"], DEC_1: ["07:00"]})
+    messages = []
+    booked = BookingEngine(page, notify=messages.append).book([NOV_16, DEC_1])
+    assert booked == datetime(2026, 11, 16, 8, 15)
+    assert page.confirmed == [(NOV_16, "08:15")]
+    assert messages == ["Selected earliest date: November 16, 2026"]
+
+
+def test_unselectable_date_falls_through_to_next():
+    page = FakePage({DEC_1: ["07:00"]})
+    assert BookingEngine(page).book([NOV_16, DEC_1]) == datetime(2026, 12, 1, 7, 0)
+
+
+def test_vanished_time_tries_next_time():
+    page = FakePage({NOV_16: ["08:15", "09:00"]}, gone={"08:15"})
+    engine = BookingEngine(page)
+    assert engine.book([NOV_16]) == datetime(2026, 11, 16, 9, 0)
+    assert engine.attempts == 2
+
+
+def test_dry_run_never_confirms():
+    page = FakePage({NOV_16: ["08:15"]})
+    assert BookingEngine(page, confirm=False).book([NOV_16]) == datetime(2026, 11, 16, 8, 15)
+    assert page.confirmed == []
+
+
+def test_max_attempts():
+    page = FakePage({NOV_16: ["08:15", "08:30", "08:45"], DEC_1: ["07:00"]}, gone={"08:15", "08:30", "08:45"})
+    engine = BookingEngine(page, max_attempts=2)
+    assert engine.book([NOV_16, DEC_1]) is None
+    assert engine.attempts == 2
+
+
+def test_confirm_timeout_captures_diagnostics():
+    page = FakePage({NOV_16: ["08:15"]}, clickable=False)
+    diagnostics = FakeDiagnostics()
+    messages = []
+    engine = BookingEngine(page, notify=messages.append, attempt_timeout=0.2, diagnostics=diagnostics)
+    assert engine.book([NOV_16]) is None
+    assert engine.timed_out
+    assert diagnostics.captured == ["timeout"]
+    assert messages == ["⚠️ Time slot selection timed out."]
+
+
+def test_day_listed_without_times_is_not_a_timeout():
+    page = FakePage({NOV_16: [], DEC_1: ["07:00"]})
+    diagnostics = FakeDiagnostics()
+    failures = []
+    engine = BookingEngine(page, attempt_timeout=0.2, diagnostics=diagnostics,
+                           on_failure=lambda day, reason: failures.append((day, reason)))
+    assert engine.book([NOV_16, DEC_1]) == datetime(2026, 12, 1, 7, 0)
+    assert not engine.timed_out
+    assert failures == [(NOV_16, "no_times")]
+    assert diagnostics.captured == []
+
+
+def test_timeout_already_reported_is_not_alerted_again():
+    page = FakePage({NOV_16: ["08:15"]}, clickable=False)
+    diagnostics = FakeDiagnostics()
+    messages = []
+    engine = BookingEngine(page, notify=messages.append, attempt_timeout=0.2, diagnostics=diagnostics,
+                           on_failure=lambda day, reason: False)
+    assert engine.book([NOV_16]) is None
+    assert engine.timed_out
+    assert diagnostics.captured == [] and messages == []
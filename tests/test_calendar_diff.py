@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from appointment_watcher.calendar_diff import SnapshotCache
+
+
+def test_first_scan_opens_every_day():
+    cache = SnapshotCache()
+    diff = cache.update("94", {"2026-11": [16, 3], "2026-12": [1]})
+    assert diff.opened == [datetime(2026, 11, 3), datetime(2026, 11, 16), datetime(2026, 12, 1)]
+    assert not diff.closed
+
+
+def test_unchanged_scan_is_empty():
+    cache = SnapshotCache()
+    cache.update("94", {"2026-11": [16]})
+    diff = cache.update("94", {"2026-11": [16]})
+    assert not diff
+    assert diff.summary() == "no change"
+
+
+def test_opened_and_closed():
+    cache = SnapshotCache()
+    cache.update("94", {"2026-11": [16, 20]})
+    diff = cache.update("94", {"2026-11": [20, 25]})
+    assert diff.opened == [datetime(2026, 11, 25)]
+    assert diff.closed == [datetime(2026, 11, 16)]
+    assert cache.open_days("94") == [datetime(2026, 11, 20), datetime(2026, 11, 25)]
+
+
+def test_partial_scan_keeps_missing_months():
+    cache = SnapshotCache()
+    cache.update("94", {"2026-11": [16], "2026-12": [1]})
+    assert not cache.update("94", {"2026-11": [16]})
+    diff = cache.update("94", {"2026-11": [16]}, complete=True)
+    assert diff.closed == [datetime(2026, 12, 1)]
+
+
+def test_facilities_are_separate():
+    cache = SnapshotCache()
+    cache.update("94", {"2026-11": [16]})
+    assert cache.update(92, {"2026-11": [16]}).opened == [datetime(2026, 11, 16)]
+
+
+def test_times_changed():
+    cache = SnapshotCache()
+    assert cache.update_times("94", "2026-11-16", ["09:00", "08:15"]).times_changed == \
+        {"2026-11-16": ((), ("08:15", "09:00"))}
+    assert not cache.update_times("94", "2026-11-16", ["08:15", "09:00"])
+
+
+def test_closed_day_forgets_its_times():
+    cache = SnapshotCache()
+    cache.update("94", {"2026-11": [16]})
+    cache.update_times("94", "2026-11-16", ["09:00"])
+    cache.update("94", {"2026-11": []})
+    assert cache.update_times("94", "2026-11-16", ["09:00"]).times_changed
+
+
+def test_months_to_skip_after_empty_streak():
+    cache = SnapshotCache(empty_streak=2, revisit_every=5)
+    for _ in range(2):
+        cache.update("94", {"2026-11": [], "2026-12": [1]})
+    assert cache.months_to_skip("94", attempt=1) == [(2026, 11)]
+    assert cache.months_to_skip("94", attempt=5) == []
+    cache.update("94", {"2026-11": [3]})
+    assert cache.months_to_skip("94", attempt=1) == []
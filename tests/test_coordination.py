@@ -0,0 +1,95 @@
+import pytest
+
+from appointment_watcher.clock import SimulatedClock
+from appointment_watcher.coordination import Coordinator, LocalCoordinator, SQLiteCoordinator
+
+
+@pytest.fixture
+def clock():
+    return SimulatedClock(start=1_000_000)
+
+
+@pytest.fixture
+def nodes(tmp_path, clock):
+    path = str(tmp_path / "coord.db")
+    a = SQLiteCoordinator(path, "node-a", lease_seconds=60, clock=clock.time)
+    b = SQLiteCoordinator(path, "node-b", lease_seconds=60, clock=clock.time)
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_coordinator_is_abstract():
+    with pytest.raises(TypeError):
+        Coordinator()
+
+
+def test_booking_grant_is_exclusive(nodes):
+    a, b = nodes
+    assert a.acquire_booking("1")
+    assert not b.acquire_booking("1")
+    assert a.acquire_booking("1")   # the holder may renew
+
+
+def test_grant_released_without_booking_passes_on(nodes):
+    a, b = nodes
+    a.acquire_booking("1")
+    a.release_booking("1")
+    assert b.acquire_booking("1")
+
+
+def test_expired_grant_passes_on(nodes, clock):
+    a, b = nodes
+    a.acquire_booking("1", ttl=120)
+    clock.sleep(121)
+    assert b.acquire_booking("1")
+
+
+def test_booking_closes_key_for_everyone(nodes):
+    a, b = nodes
+    a.acquire_booking("1")
+    a.release_booking("1", booked=True)
+    assert b.is_booked("1")
+    assert not a.acquire_booking("1")
+    assert not b.acquire_booking("1")
+    assert b.acquire_booking("2")   # another schedule
+
+
+def test_release_by_non_holder_is_ignored(nodes):
+    a, b = nodes
+    a.acquire_booking("1")
+    b.release_booking("1", booked=True)
+    assert not a.is_booked("1")
+    assert not b.acquire_booking("1")
+
+
+def test_polling_lease_passes_to_waiting_node(nodes, clock):
+    a, b = nodes
+    assert a.acquire_poll("1:94").holder == "node-a"
+    assert b.acquire_poll("1:94") is None
+    clock.sleep(61)
+    # The slice is over: b has been waiting, so a cannot renew
+    assert a.acquire_poll("1:94") is None
+    lease = b.acquire_poll("1:94")
+    assert lease.holder == "node-b" and lease.token == 2
+
+
+def test_shared_budget(nodes, clock):
+    a, b = nodes
+    a.requests_per_hour = b.requests_per_hour = 60   # burst of one, then one a minute
+    assert a.take_request() == 0
+    assert b.take_request() == pytest.approx(60)
+
+
+def test_shared_budget_charges_count(nodes):
+    a, b = nodes
+    a.requests_per_hour = b.requests_per_hour = 3600   # burst of 60, then one a second
+    assert a.take_request(count=60) == 0
+    assert b.take_request(count=3) == pytest.approx(3)
+
+
+def test_local_coordinator_grants_until_booked():
+    local = LocalCoordinator("solo")
+    assert local.acquire_poll("1:94") and local.acquire_booking("1")
+    local.release_booking("1", booked=True)
+    assert not local.acquire_booking("1")
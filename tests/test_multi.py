@@ -0,0 +1,57 @@
+import calendar
+from datetime import date, datetime
+
+import pytest
+
+from appointment_watcher import browser
+from appointment_watcher.calendar_reader import CalendarMonth
+from appointment_watcher.multi import MultiScheduleWatcher, ScheduleConfig
+from appointment_watcher.policy import add_months
+
+# Two months ahead: inside the policy's horizon whatever the date today
+YEAR, MONTH = add_months(date.today().year, date.today().month, 2)
+WINDOW = f"{YEAR}-{MONTH:02d}-01..{YEAR}-{MONTH:02d}-{calendar.monthrange(YEAR, MONTH)[1]}"
+
+
+class FakeDriver:
+    current_url = "https://ais.example/en-ca/niv/schedule/1/appointment"
+
+
+class FakeClient:
+    class session:
+        class cookies:
+            @staticmethod
+            def get_dict():
+                return {}
+
+
+@pytest.fixture
+def booked(monkeypatch):
+    tried = []
+
+    def book_dates(driver, dates, *args, **kwargs):
+        tried.extend(dates)
+        return dates[0].replace(hour=9) if dates else None
+
+    monkeypatch.setattr(browser, "restore_cookies", lambda *args, **kwargs: None)
+    monkeypatch.setattr(browser, "select_location", lambda *args, **kwargs: None)
+    monkeypatch.setattr(browser, "open_calendar", lambda *args, **kwargs: None)
+    monkeypatch.setattr(browser, "read_calendar", lambda *args, **kwargs: [CalendarMonth(YEAR, MONTH, [10, 12])])
+    monkeypatch.setattr(browser, "book_dates", book_dates)
+    return tried
+
+
+def test_excluded_day_in_a_wanted_month_is_not_booked(booked):
+    schedule = ScheduleConfig("a", "user@example.com", "secret", "1",
+                              date_windows=WINDOW, exclude_dates=f"{YEAR}-{MONTH:02d}-10")
+    watcher = MultiScheduleWatcher([schedule], notify=lambda message, key=None: None, driver_factory=FakeDriver)
+    assert watcher._book(FakeDriver(), schedule, FakeClient()) == datetime(YEAR, MONTH, 12, 9, 0)
+    assert booked == [datetime(YEAR, MONTH, 12)]
+
+
+def test_day_on_or_after_current_appointment_is_not_booked(booked):
+    schedule = ScheduleConfig("a", "user@example.com", "secret", "1",
+                              date_windows=WINDOW, current_appointment=f"{YEAR}-{MONTH:02d}-12")
+    watcher = MultiScheduleWatcher([schedule], notify=lambda message, key=None: None, driver_factory=FakeDriver)
+    assert watcher._book(FakeDriver(), schedule, FakeClient()) == datetime(YEAR, MONTH, 10, 9, 0)
+    assert booked == [datetime(YEAR, MONTH, 10)]
@@ -0,0 +1,51 @@
+from datetime import date, datetime
+
+from appointment_watcher.policy import DatePolicy, parse_windows, windows_from_months
+
+TODAY = date(2026, 10, 17)
+
+
+def test_parse_windows():
+    assert parse_windows("2026-11-01..2026-12-31, 2027-03-01..2027-03-31") == [
+        (date(2026, 11, 1), date(2026, 12, 31)), (date(2027, 3, 1), date(2027, 3, 31))]
+    assert parse_windows("") == []
+
+
+def test_windows_from_months_merges_adjacent_months():
+    assert windows_from_months(["November", "December", "March"], [2026]) == [
+        (date(2026, 3, 1), date(2026, 3, 31)), (date(2026, 11, 1), date(2026, 12, 31))]
+
+
+def test_any_date_without_windows():
+    assert DatePolicy().accepts(date(2027, 1, 5), TODAY)
+
+
+def test_windows_exclusions_and_lead_time():
+    policy = DatePolicy(windows=parse_windows("2026-11-01..2026-12-31"), exclude={"2026-11-20"}, min_lead_days=30)
+    assert policy.accepts(datetime(2026, 11, 16, 9, 0), TODAY)
+    assert not policy.accepts(date(2026, 11, 10), TODAY)    # 24 days ahead
+    assert not policy.accepts(date(2026, 11, 20), TODAY)    # excluded
+    assert not policy.accepts(date(2027, 1, 4), TODAY)      # outside the window
+
+
+def test_current_appointment_cutoff():
+    policy = DatePolicy(current_appointment="2026-12-01")
+    assert policy.accepts(date(2026, 11, 30), TODAY)
+    assert not policy.accepts(date(2026, 12, 1), TODAY)
+
+
+def test_beyond_horizon_is_still_checked():
+    policy = DatePolicy(windows=parse_windows("2028-01-01..2028-01-31"), horizon_days=30)
+    assert policy.accepts(date(2028, 1, 10), TODAY)
+    assert not policy.accepts(date(2028, 2, 10), TODAY)
+
+
+def test_scan_range_skips_unwanted_months():
+    policy = DatePolicy(windows=parse_windows("2026-11-01..2026-11-30,2027-02-01..2027-02-28"))
+    assert policy.scan_range(TODAY) == ((2026, 11), 4, [(2026, 12), (2027, 1)])
+    assert policy.accepts_month(2027, 2, TODAY)
+    assert not policy.accepts_month(2027, 1, TODAY)
+
+
+def test_scan_range_none_when_nothing_is_acceptable():
+    assert DatePolicy(windows=parse_windows("2026-01-01..2026-01-31")).scan_range(TODAY) is None
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+
+from appointment_watcher.scan import get_strategy, parse_month
+
+DATES = [datetime(2027, 1, 20), datetime(2026, 11, 16), datetime(2026, 12, 3), datetime(2026, 11, 2),
+         datetime(2027, 1, 4)]
+
+
+def test_forward():
+    assert get_strategy("forward")(DATES) == sorted(DATES)
+
+
+def test_backward_keeps_days_in_order_within_a_month():
+    assert get_strategy("backward")(DATES) == [
+        datetime(2027, 1, 4), datetime(2027, 1, 20), datetime(2026, 12, 3), datetime(2026, 11, 2), datetime(2026, 11, 16)]
+
+
+def test_first_takes_only_the_earliest():
+    assert get_strategy("first")(DATES) == [datetime(2026, 11, 2)]
+
+
+def test_bidirectional_starts_at_preferred_month():
+    order = get_strategy("bidirectional", parse_month("2026-12"))(DATES)
+    # Equal distance: the earlier month wins
+    assert order == [datetime(2026, 12, 3), datetime(2026, 11, 2), datetime(2026, 11, 16),
+                     datetime(2027, 1, 4), datetime(2027, 1, 20)]
+
+
+def test_bidirectional_without_preference_is_forward():
+    assert get_strategy("bidirectional")(DATES) == sorted(DATES)
+
+
+def test_unknown_strategy():
+    with pytest.raises(ValueError):
+        get_strategy("sideways")
+
+
+def test_parse_month():
+    assert parse_month("2026-11") == (2026, 11)
+    assert parse_month("") is None
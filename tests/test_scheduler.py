@@ -0,0 +1,98 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from appointment_watcher.clock import SimulatedClock
+from appointment_watcher.scheduler import BUSY, ERROR, FOUND, OK, IntensityProfile, PollScheduler, TokenBucket
+
+NOON = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc).timestamp()
+
+
+@pytest.fixture
+def clock():
+    return SimulatedClock(start=NOON)
+
+
+def scheduler(clock, **kwargs):
+    profile = IntensityProfile("UTC", windows=[{"start": "16:00", "end": "18:00", "intensity": 2.0}])
+    return PollScheduler(base_delay=60, busy_delay=60, error_delay=5, max_delay=600, min_delay=5, jitter=0,
+                         profile=profile, clock=clock.time, **kwargs)
+
+
+def test_token_bucket_allows_a_burst_then_waits(clock):
+    bucket = TokenBucket(120, clock.time)   # capacity 10, one token every 30s
+    for _ in range(10):
+        assert bucket.wait_time() == 0
+        bucket.take()
+    assert bucket.wait_time() == pytest.approx(30)
+    assert bucket.wait_time(after=20) == pytest.approx(10)
+    clock.sleep(30)
+    assert bucket.wait_time() == 0
+
+
+def test_token_bucket_refill_is_capped(clock):
+    bucket = TokenBucket(120, clock.time)
+    clock.sleep(3600)
+    for _ in range(10):
+        bucket.take()
+    assert bucket.wait_time() > 0
+
+
+def test_base_delay(clock):
+    assert scheduler(clock).next_delay() == 60
+
+
+def test_busy_backs_off_exponentially_up_to_max(clock):
+    s = scheduler(clock)
+    delays = []
+    for _ in range(6):
+        s.record(BUSY)
+        delays.append(s.next_delay())
+    assert delays == [60, 120, 240, 480, 600, 600]
+    s.record(OK)
+    assert s.next_delay() == 60
+
+
+def test_errors_back_off_from_error_delay(clock):
+    s = scheduler(clock)
+    s.record(ERROR)
+    s.record(ERROR)
+    assert s.next_delay() == 10
+
+
+def test_window_intensity_shortens_delay(clock):
+    s = scheduler(clock)
+    clock.sleep(4.5 * 3600)   # 16:30 UTC
+    assert s.in_window()
+    assert s.next_delay() == 30
+
+
+def test_busy_outside_window_counts_only_out_of_window_busy(clock):
+    s = scheduler(clock)
+    s.record(BUSY)
+    s.record(ERROR)
+    s.record(BUSY)
+    assert s.busy_outside_window == 2
+    clock.sleep(4.5 * 3600)
+    s.record(BUSY)
+    assert s.busy_outside_window == 2
+    s.record(FOUND)
+    assert s.busy_outside_window == 0
+
+
+def test_request_cap_delays_next_poll(clock):
+    s = scheduler(clock, max_per_hour=12)   # capacity 1, one request every 300s
+    s.record(OK)
+    assert s.next_delay() == pytest.approx(300)
+
+
+def test_record_charges_every_request(clock):
+    s = scheduler(clock, max_per_hour=120)   # capacity 10
+    s.record(OK, requests=4)
+    assert s.bucket.tokens == pytest.approx(6)
+
+
+def test_operator_override(clock):
+    s = scheduler(clock)
+    s.override = 4
+    assert s.next_delay() == 15
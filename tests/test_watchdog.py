@@ -0,0 +1,18 @@
+import pytest
+from selenium.common.exceptions import (InvalidSessionIdException, JavascriptException, NoSuchWindowException,
+                                        TimeoutException, WebDriverException)
+
+from appointment_watcher.watchdog import is_driver_failure
+
+
+@pytest.mark.parametrize("error, broken", [
+    (TimeoutException("slow"), False),
+    (JavascriptException("undefined"), False),
+    (WebDriverException("unknown error"), False),
+    (InvalidSessionIdException("gone"), True),
+    (NoSuchWindowException("closed"), True),
+    (WebDriverException("chrome not reachable"), True),
+    (ConnectionRefusedError(), True),
+])
+def test_only_broken_sessions_are_driver_failures(error, broken):
+    assert is_driver_failure(error) is broken
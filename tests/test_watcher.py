@@ -0,0 +1,200 @@
+from datetime import date, datetime, timezone
+
+import pytest
+from selenium.common.exceptions import InvalidSessionIdException, TimeoutException
+
+from appointment_watcher.clock import SimulatedClock
+from appointment_watcher.config import Config
+from appointment_watcher.coordination import LocalCoordinator, SQLiteCoordinator
+from appointment_watcher.calendar_reader import CalendarMonth
+from appointment_watcher.scheduler import FOUND, OK
+from appointment_watcher.watcher import Watcher
+
+START = datetime(2026, 10, 17, 12, 0, tzinfo=timezone.utc).timestamp()
+NOV_16 = datetime(2026, 11, 16)
+NOV_20 = datetime(2026, 11, 20)
+
+
+class FakeDriver:
+    def execute(self, *args, **kwargs):
+        return {"value": None}
+
+    def quit(self):
+        pass
+
+
+def make_watcher(tmp_path, **overrides):
+    config = Config(schedule_id="1", history_db=None, diagnostics_dir=str(tmp_path / "diagnostics"),
+                    session_cache_path=str(tmp_path / "session.json"), facility_index_path=str(tmp_path / "index.json"),
+                    date_windows=[(date(2026, 11, 1), date(2026, 12, 31))], **overrides)
+    return Watcher(config, driver=FakeDriver(), clock=SimulatedClock(start=START))
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    return make_watcher(tmp_path)
+
+
+def test_open_day_stays_pending_until_it_closes(watcher):
+    assert watcher.apply_scan({"2026-11": [16]}, complete=True) == [NOV_16]
+    # Booking it failed: the next scan still offers it although nothing changed
+    assert watcher.apply_scan({"2026-11": [16]}, complete=True) == [NOV_16]
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_16, NOV_20]
+    assert watcher.apply_scan({"2026-11": [20]}, complete=True) == [NOV_20]
+
+
+def test_unwanted_days_are_never_pending(watcher):
+    assert watcher.apply_scan({"2027-03": [2]}, complete=True) == []
+
+
+def test_booked_day_is_no_longer_pending(watcher):
+    watcher.apply_scan({"2026-11": [16, 20]}, complete=True)
+    watcher._booked(datetime(2026, 11, 16, 8, 15))
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_20]
+
+
+def test_failed_day_backs_off_but_stays_pending(watcher):
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_16, NOV_20]
+    assert watcher._day_failed(NOV_16, "timeout")
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_20]
+    watcher.clock.sleep(watcher.config.retry_delay)
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_16, NOV_20]
+    # The same failure again: longer back-off, and no second alert
+    assert not watcher._day_failed(NOV_16, "timeout")
+    watcher.clock.sleep(watcher.config.retry_delay)
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_20]
+    watcher.clock.sleep(watcher.config.retry_delay)
+    assert watcher.apply_scan({"2026-11": [16, 20]}, complete=True) == [NOV_16, NOV_20]
+
+
+def test_reopened_day_is_offered_at_once(watcher):
+    watcher.apply_scan({"2026-11": [16]}, complete=True)
+    watcher._day_failed(NOV_16, "no_times")
+    watcher.apply_scan({"2026-11": []}, complete=True)
+    assert watcher.apply_scan({"2026-11": [16]}, complete=True) == [NOV_16]
+
+
+def test_refused_node_offers_days_once_grant_is_free(tmp_path):
+    path = str(tmp_path / "coord.db")
+    holder, refused = make_watcher(tmp_path / "a"), make_watcher(tmp_path / "b")
+    holder.coordinator = SQLiteCoordinator(path, "a")
+    refused.coordinator = SQLiteCoordinator(path, "b")
+    assert holder._acquire_booking()
+    assert refused.apply_scan({"2026-11": [16]}, complete=True) == [NOV_16]
+    assert not refused._acquire_booking()
+    holder._release_booking(None)
+    assert refused.apply_scan({"2026-11": [16]}, complete=True) == [NOV_16]
+    assert refused._acquire_booking()
+    holder.coordinator.close()
+    refused.coordinator.close()
+
+
+def test_page_error_falls_back_to_next_facility(watcher, monkeypatch):
+    from appointment_watcher import watcher as watcher_module
+
+    def select_location(facility=None):
+        if facility == "94":
+            raise TimeoutException("calendar did not load")
+
+    class Browser:
+        @staticmethod
+        def book_dates(driver, dates, notify, budget, **options):
+            return dates[0].replace(hour=9)
+
+    monkeypatch.setattr(watcher, "_hand_over", lambda client: None)
+    monkeypatch.setattr(watcher, "select_location", select_location)
+    monkeypatch.setattr(watcher, "open_calendar", lambda: None)
+    monkeypatch.setattr(watcher_module, "_browser", lambda: Browser)
+    assert watcher._book_ranked(None, [("94", [NOV_16]), ("92", [NOV_20])]) == (NOV_20.replace(hour=9), "92")
+
+
+def test_broken_session_reaches_run(watcher, monkeypatch):
+    def select_location(facility=None):
+        raise InvalidSessionIdException("gone")
+
+    monkeypatch.setattr(watcher, "_hand_over", lambda client: None)
+    monkeypatch.setattr(watcher, "select_location", select_location)
+    with pytest.raises(InvalidSessionIdException):
+        watcher._book_ranked(None, [("94", [NOV_16])])
+
+
+def test_one_booking_grant_per_schedule_across_facilities(tmp_path):
+    path = str(tmp_path / "coord.db")
+    toronto = make_watcher(tmp_path / "a", facility_id="94")
+    ottawa = make_watcher(tmp_path / "b", facility_id="92", facility_name="Ottawa")
+    toronto.coordinator = SQLiteCoordinator(path, "a")
+    ottawa.coordinator = SQLiteCoordinator(path, "b")
+    assert toronto.lease_key != ottawa.lease_key
+    assert toronto._acquire_booking()
+    assert not ottawa._acquire_booking()
+    toronto._release_booking(datetime(2026, 11, 16, 8, 15))
+    assert not ottawa._acquire_booking()
+    assert not ottawa._wait_for_turn()   # the schedule is booked: stop polling
+    toronto.coordinator.close()
+    ottawa.coordinator.close()
+
+
+class CountingCoordinator(LocalCoordinator):
+    def __init__(self):
+        super().__init__("counting")
+        self.taken = 0
+
+    def take_request(self, count=1):
+        self.taken += count
+        return 0.0
+
+
+class SweepClient:
+    def get_available_days(self, facility_id):
+        return ["2026-11-16"] if facility_id == "94" else []
+
+    def get_available_times(self, facility_id, date):
+        return ["09:00"]
+
+
+def test_sweep_charges_every_request_to_both_budgets(tmp_path):
+    watcher = make_watcher(tmp_path, poll_mode="http", max_requests_per_hour=120,
+                           sweep_facilities=["Toronto", "Ottawa", "Montreal"])
+    watcher.coordinator = CountingCoordinator()
+    watcher._sweep = [("94", "Toronto"), ("92", "Ottawa"), ("91", "Montreal")]
+    assert watcher._wait_for_turn()
+    watcher._begin_check(1)
+    watcher._poll_days(SweepClient())
+    assert watcher.has_time_slots(SweepClient(), NOV_16, "94")
+    watcher.record_outcome(OK)
+    assert watcher.coordinator.taken == 4
+    assert watcher.scheduler.bucket.tokens == pytest.approx(10 - 4)
+
+
+class CheckDone(Exception):
+    pass
+
+
+@pytest.mark.parametrize("granted, reason", [(True, FOUND), (False, "grant_refused")])
+def test_browser_check_with_unbooked_wanted_days_records_found(watcher, monkeypatch, granted, reason):
+    from appointment_watcher import watcher as watcher_module
+
+    class Browser:
+        @staticmethod
+        def open_appointment_page(*args, **kwargs):
+            pass
+
+        @staticmethod
+        def book_earliest(driver, is_wanted_month, notify, on_scan=None, **kwargs):
+            on_scan([CalendarMonth(2026, 11, [16])])
+            return None   # the booking failed
+
+    def stop(delay):
+        raise CheckDone()
+
+    outcomes = []
+    monkeypatch.setattr(watcher_module, "_browser", lambda: Browser)
+    for name in ("_sync_session", "record_page_stats", "select_location", "open_calendar"):
+        monkeypatch.setattr(watcher, name, lambda *args: None)
+    monkeypatch.setattr(watcher.coordinator, "acquire_booking", lambda key, ttl=120: granted)
+    monkeypatch.setattr(watcher.scheduler, "record", lambda outcome, requests=1: outcomes.append(outcome))
+    monkeypatch.setattr(watcher, "_wait", stop)
+    with pytest.raises(CheckDone):
+        watcher.check_visa_availability()
+    assert outcomes == [FOUND]
+    assert watcher._last_outcome == reason